@@ -0,0 +1,66 @@
+"""
+Compares "which caravans are free for these dates" answered by the occupancy
+calendar against one interval-index lookup per caravan.
+
+    python benchmarks/bench_availability.py --caravans 100000 --reservations 1000000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Reservation
+from src.repositories import OccupancyCalendar, ReservationRepository
+
+ORIGIN = date(2025, 1, 1)
+HORIZON_DAYS = 365
+
+def build_repository(caravans: int, reservations: int, seed: int = 0) -> ReservationRepository:
+    rng = random.Random(seed)
+    repo = ReservationRepository(occupancy_calendar=OccupancyCalendar(ORIGIN, HORIZON_DAYS))
+    batch = []
+    for _ in range(reservations):
+        start = ORIGIN + timedelta(rng.randrange(HORIZON_DAYS - 14))
+        batch.append(Reservation(
+            id=0, user_id=rng.randint(1, 50_000), caravan_id=rng.randint(1, caravans),
+            start_date=start, end_date=start + timedelta(rng.randint(1, 13)), price=100,
+        ))
+    repo.add_many(batch)
+    return repo
+
+def run(caravans: int, reservations: int, repeat: int) -> None:
+    started = time.perf_counter()
+    repo = build_repository(caravans, reservations)
+    print(f"\n{caravans:,} caravans, {reservations:,} reservations (built in {time.perf_counter() - started:.1f}s, best of {repeat})")
+    caravan_ids = list(range(1, caravans + 1))
+    rng = random.Random(1)
+    print(f"{'query':<24}{'per-caravan (ms)':>18}{'calendar (ms)':>16}{'speedup':>10}")
+    for length in (3, 14):
+        start = ORIGIN + timedelta(rng.randrange(HORIZON_DAYS - length))
+        end = start + timedelta(length - 1)
+        scan_time = calendar_time = float("inf")
+        for _ in range(repeat):
+            began = time.perf_counter()
+            expected = [
+                caravan_id for caravan_id in caravan_ids
+                if not repo.find_by_caravan_and_dates(caravan_id, start, end)
+            ]
+            scan_time = min(scan_time, time.perf_counter() - began)
+            began = time.perf_counter()
+            free = repo.find_free_caravans(caravan_ids, start, end)
+            calendar_time = min(calendar_time, time.perf_counter() - began)
+        assert free == expected
+        print(f"{f'free for {length} days':<24}{scan_time * 1000:>18.1f}{calendar_time * 1000:>16.1f}{scan_time / calendar_time:>9.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--caravans", type=int, default=100_000)
+    parser.add_argument("--reservations", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.caravans, args.reservations, args.repeat)
@@ -0,0 +1,72 @@
+"""
+Compares CaravanRepository.search on the row store and the columnar store.
+
+    python benchmarks/bench_caravan_search.py --sizes 100000 1000000
+"""
+import argparse
+import random
+import time
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan
+from src.repositories import CaravanRepository
+
+AMENITIES = ["wifi", "kitchen", "shower", "pets", "solar", "bike_rack", "heating", "tv"]
+
+QUERIES = {
+    "price band": dict(min_price=80, max_price=120),
+    "rating, sorted": dict(min_rating=4.5, sort_by_rating=True),
+    "price + rating + amenity": dict(max_price=150, min_rating=4.0, required_amenities=["pets"], sort_by_rating=True),
+    "all, sorted": dict(sort_by_rating=True),
+}
+
+def build_caravans(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        Caravan(
+            id=0, host_id=rng.randint(1, size // 10 + 1), name=f"Caravan {i}", capacity=rng.randint(1, 8),
+            location="", latitude=rng.uniform(33, 38), longitude=rng.uniform(126, 130),
+            amenities=rng.sample(AMENITIES, rng.randint(0, 4)),
+            price_per_day=round(rng.uniform(30, 400), 2), average_rating=round(rng.uniform(1, 5), 1),
+        )
+        for i in range(size)
+    ]
+
+def time_query(repo: CaravanRepository, filters: dict, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        repo.search(**filters)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def run(size: int, repeat: int) -> None:
+    caravans = build_caravans(size)
+    row_repo = CaravanRepository()
+    columnar_repo = CaravanRepository(columnar=True)
+    for caravan in caravans:
+        row_repo.add(caravan)
+        columnar_repo.add(caravan)
+
+    print(f"\n{size:,} caravans (best of {repeat})")
+    print(f"{'query':<28}{'row (ms)':>12}{'columnar (ms)':>16}{'speedup':>10}")
+    for name, filters in QUERIES.items():
+        assert row_repo.search(**filters) == columnar_repo.search(**filters)
+        row_time = time_query(row_repo, filters, repeat)
+        columnar_time = time_query(columnar_repo, filters, repeat)
+        print(f"{name:<28}{row_time * 1000:>12.1f}{columnar_time * 1000:>16.1f}{row_time / columnar_time:>9.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+if __name__ == "__main__":
+    main()
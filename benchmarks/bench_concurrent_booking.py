@@ -0,0 +1,94 @@
+"""
+Booking throughput as threads are added, with one lock for every caravan
+(lock_stripes=1) against per-caravan striped locks.
+
+Each booking's availability check is given `--latency` ms of blocking time,
+standing in for the round trip to a database, which is what lets bookings
+of different caravans overlap; pure in-memory work is serialized by the GIL
+either way.
+
+    python benchmarks/bench_concurrent_booking.py --bookings 2000 --latency 1
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan, User
+from src.repositories import CaravanRepository, PaymentRepository, ReservationRepository, UserRepository
+from src.services import PaymentService, ReservationService
+from src.validators import ReservationValidator
+from src.strategies import PercentageFee
+from src.observers import PaymentPublisher, ReservationPublisher
+from src.factories import ReservationFactory
+from src.exceptions import DuplicateReservationError
+
+class SlowReservationRepository(ReservationRepository):
+    def __init__(self, latency: float, lock_stripes: int):
+        super().__init__(lock_stripes=lock_stripes)
+        self._latency = latency
+
+    def find_by_caravan_and_dates(self, caravan_id, start_date, end_date):
+        time.sleep(self._latency)
+        return super().find_by_caravan_and_dates(caravan_id, start_date, end_date)
+
+def run_once(threads: int, bookings: int, caravans: int, latency: float, lock_stripes: int) -> float:
+    user_repo, caravan_repo, payment_repo = UserRepository(), CaravanRepository(), PaymentRepository()
+    reservation_repo = SlowReservationRepository(latency, lock_stripes)
+    payment_service = PaymentService(user_repo, payment_repo, reservation_repo, PaymentPublisher())
+    service = ReservationService(
+        reservation_repo, payment_service, ReservationValidator(user_repo, caravan_repo, reservation_repo),
+        ReservationPublisher(), ReservationFactory(),
+    )
+    caravan_ids = [
+        caravan_repo.add(Caravan(id=0, host_id=0, name=f"C{number}", capacity=2, location="")).id
+        for number in range(caravans)
+    ]
+    users = [
+        user_repo.add(User(id=0, name=f"U{number}", contact="", is_host=False, balance=1e12))
+        for number in range(threads)
+    ]
+    barrier = threading.Barrier(threads + 1)
+
+    def book(user: User, seed: int) -> None:
+        rng = random.Random(seed)
+        barrier.wait()
+        for _ in range(bookings // threads):
+            first_day = date(2025, 1, 1) + timedelta(rng.randrange(365))
+            try:
+                service.create_reservation(
+                    user.id, rng.choice(caravan_ids), first_day, first_day + timedelta(2), 100, fee_strategy=PercentageFee(10)
+                )
+            except DuplicateReservationError:
+                pass
+
+    workers = [threading.Thread(target=book, args=(user, seed)) for seed, user in enumerate(users)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return (bookings // threads * threads) / (time.perf_counter() - started)
+
+def run(bookings: int, caravans: int, latency_ms: float) -> None:
+    print(f"\n{bookings:,} bookings over {caravans} caravans, {latency_ms} ms per availability check (bookings/s)")
+    print(f"{'threads':>8}{'one lock':>12}{'striped':>12}{'speedup':>10}")
+    for threads in (1, 2, 4, 8, 16):
+        single = run_once(threads, bookings, caravans, latency_ms / 1000, lock_stripes=1)
+        striped = run_once(threads, bookings, caravans, latency_ms / 1000, lock_stripes=64)
+        print(f"{threads:>8}{single:>12.0f}{striped:>12.0f}{striped / single:>9.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--caravans", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=1.0, help="blocking ms per availability check")
+    args = parser.parse_args()
+    run(args.bookings, args.caravans, args.latency)
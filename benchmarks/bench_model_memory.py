@@ -0,0 +1,88 @@
+"""
+Measures the memory held per record by the slotted models, next to the same
+fields in a plain (__dict__-backed) dataclass.
+
+    python benchmarks/bench_model_memory.py --sizes 1000000 10000000
+    python benchmarks/bench_model_memory.py --sizes 1000000 --models Reservation
+"""
+import argparse
+import dataclasses
+import gc
+import time
+import tracemalloc
+from datetime import date, datetime
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Message, Payment, Reservation, Review
+
+FIRST_DAY = date(2024, 1, 1).toordinal()
+CREATED_AT = datetime(2024, 1, 1)
+RESERVATION_STATUSES = ["pending", "approved", "paid", "cancelled"]
+PAYMENT_METHODS = ["card", "bank_transfer"]
+
+# Each factory builds row i with fresh date objects, as a repository loaded from disk would hold.
+FACTORIES = {
+    "Reservation": lambda cls, i: cls(
+        id=i, user_id=i % 50_000, caravan_id=i % 20_000, start_date=date.fromordinal(FIRST_DAY + i % 700),
+        end_date=date.fromordinal(FIRST_DAY + i % 700 + 3), price=float(100 + i % 400),
+        status=RESERVATION_STATUSES[i % 4],
+    ),
+    "Payment": lambda cls, i: cls(
+        id=i, reservation_id=i, amount=float(100 + i % 400), payment_method=PAYMENT_METHODS[i % 2],
+        platform_fee=float(10 + i % 40), settled=i % 3 == 0, status="completed", created_at=CREATED_AT,
+    ),
+    "Review": lambda cls, i: cls(
+        id=i, reservation_id=i, rating=1 + i % 5, comment="", author_id=i % 50_000,
+        subject_id=i % 20_000, created_at=CREATED_AT,
+    ),
+    "Message": lambda cls, i: cls(
+        id=i, sender_id=i % 50_000, recipient_id=i % 20_000, content="", created_at=CREATED_AT,
+    ),
+}
+
+MODELS = {"Reservation": Reservation, "Payment": Payment, "Review": Review, "Message": Message}
+
+def dict_backed(model: type) -> type:
+    """
+    Returns a plain dataclass with the same fields as `model`, for comparison.
+    """
+    return dataclasses.make_dataclass(
+        f"Dict{model.__name__}",
+        [(f.name, f.type, f) for f in dataclasses.fields(model)],
+    )
+
+def bytes_per_record(cls: type, factory, size: int):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    records = [factory(cls, i) for i in range(size)]
+    elapsed = time.perf_counter() - started
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    gc.collect()
+    return allocated / size, elapsed
+
+def run(size: int, models) -> None:
+    print(f"\n{size:,} rows")
+    print(f"{'model':<14}{'dict (B/row)':>14}{'slots (B/row)':>15}{'saved':>8}{'slots total (MB)':>18}")
+    for name in models:
+        model, factory = MODELS[name], FACTORIES[name]
+        dict_size, _ = bytes_per_record(dict_backed(model), factory, size)
+        slots_size, _ = bytes_per_record(model, factory, size)
+        print(
+            f"{name:<14}{dict_size:>14.0f}{slots_size:>15.0f}{1 - slots_size / dict_size:>8.0%}"
+            f"{slots_size * size / 2**20:>18,.0f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=list(MODELS))
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.models)
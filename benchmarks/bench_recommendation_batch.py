@@ -0,0 +1,77 @@
+"""
+Precomputing everyone's recommendations with RecommendationBatchJob: a full
+run for each worker count, then an incremental refresh after `--changed`
+of the users booked again.
+
+Process workers only pay off with as many free cores; on a single core
+they add the cost of the pool.
+
+    python benchmarks/bench_recommendation_batch.py --caravans 100000 --users 100000 --workers 1 4
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+# Add src to path to allow imports
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Reservation, User
+from src.repositories import CaravanRepository, ReservationRepository, UserRepository
+from src.services.recommendation_batch import RecommendationBatchJob
+
+from bench_recommendations import build_caravans
+
+def build_repositories(caravans: int, users: int, seed: int = 3):
+    rng = random.Random(seed)
+    caravan_repo = CaravanRepository()
+    caravan_ids = [caravan.id for caravan in caravan_repo.add_many(build_caravans(caravans))]
+    user_repo = UserRepository()
+    user_ids = [user.id for user in user_repo.add_many(
+        User(id=0, name=f"User {number}", contact="", is_host=False) for number in range(users)
+    )]
+    reservation_repo = ReservationRepository()
+    reservation_repo.add_many(
+        Reservation(id=0, user_id=user_id, caravan_id=caravan_id, start_date=date(2025, 1, 1), end_date=date(2025, 1, 3), price=0)
+        for user_id in user_ids
+        for caravan_id in rng.sample(caravan_ids, rng.randint(0, 5))
+    )
+    return user_repo, caravan_repo, reservation_repo, user_ids, caravan_ids
+
+def run(caravans: int, users: int, worker_counts, changed: float, limit: int) -> None:
+    user_repo, caravan_repo, reservation_repo, user_ids, caravan_ids = build_repositories(caravans, users)
+    print(f"\n{caravans:,} caravans, {users:,} users, {len(reservation_repo.get_all()):,} stays, top {limit}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recommendations.npz")
+        for workers in worker_counts:
+            job = RecommendationBatchJob(user_repo, caravan_repo, reservation_repo, limit=limit, workers=workers)
+            started = time.perf_counter()
+            stats = job.run(path)
+            elapsed = time.perf_counter() - started
+            print(f"full run, {workers} worker(s): {elapsed:.1f} s, {stats['scored']:,} scored, "
+                  f"{os.path.getsize(path) / 2**20:.1f} MiB written")
+
+        rng = random.Random(4)
+        for user_id in rng.sample(user_ids, int(users * changed)):
+            reservation_repo.add(Reservation(
+                id=0, user_id=user_id, caravan_id=rng.choice(caravan_ids),
+                start_date=date(2025, 6, 1), end_date=date(2025, 6, 3), price=0,
+            ))
+        started = time.perf_counter()
+        stats = job.run(path, previous_path=path)
+        elapsed = time.perf_counter() - started
+        print(f"refresh after {changed:.0%} booked: {elapsed:.1f} s, {stats['scored']:,} scored, {stats['reused']:,} reused")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--caravans", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--changed", type=float, default=0.01, help="share of users with a new stay before the refresh")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    run(args.caravans, args.users, list(dict.fromkeys(args.workers)), args.changed, args.limit)
@@ -0,0 +1,111 @@
+"""
+Personalized recommendations: the filtering RecommendationService against
+the vectorized RecommendationEngine.
+
+The filtering path is timed per user on a sample, together with how often
+it finds nothing. The engine is timed on the scoring itself (histories to
+top-K rows, `--batch` users per matrix product) for `--users` users with
+1-5 stays each, and the time for `--target-users` is projected from it.
+
+    python benchmarks/bench_recommendations.py --caravans 100000 --users 20000
+    python benchmarks/bench_recommendations.py --caravans 100000 --users 1000000   # full run
+"""
+import argparse
+import random
+import time
+from datetime import date
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan, Reservation
+from src.repositories import CaravanRepository, ReservationRepository
+from src.services.recommendation_engine import CaravanEmbedding, RecommendationEngine, np
+from src.services.recommendation_service import RecommendationService
+
+AMENITIES = ["wifi", "kitchen", "shower", "pets", "solar", "bike_rack", "heating", "tv"]
+
+def build_caravans(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        Caravan(
+            id=0, host_id=rng.randint(1, size // 10 + 1), name=f"Caravan {i}", capacity=rng.randint(1, 8),
+            location=f"Region {rng.randrange(20)}", latitude=rng.uniform(33, 38), longitude=rng.uniform(126, 130),
+            amenities=rng.sample(AMENITIES, rng.randint(0, 4)),
+            price_per_day=round(rng.uniform(30, 400), 2), average_rating=round(rng.uniform(1, 5), 1),
+        )
+        for i in range(size)
+    ]
+
+def build_histories(users: int, caravans: int, seed: int = 1):
+    """Flat matrix rows of every user's stays, with each user's start offset."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, 6, size=users)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    return rng.integers(0, caravans, size=int(offsets[-1])), offsets
+
+def time_filtering(caravan_repo, sample_users: int, limit: int, seed: int = 2):
+    rng = random.Random(seed)
+    caravans = caravan_repo.get_all()
+    reservation_repo = ReservationRepository()
+    for user_id in range(1, sample_users + 1):
+        for caravan in rng.sample(caravans, rng.randint(1, 5)):
+            reservation_repo.add(Reservation(
+                id=0, user_id=user_id, caravan_id=caravan.id, start_date=date(2025, 1, 1), end_date=date(2025, 1, 3), price=0,
+            ))
+    filtering = RecommendationService(caravan_repo, reservation_repo)
+    engine = RecommendationEngine(caravan_repo, reservation_repo)
+    engine.refresh()
+
+    started = time.perf_counter()
+    empty = sum(not filtering.get_personalized_recommendations(user_id, limit) for user_id in range(1, sample_users + 1))
+    filtering_time = (time.perf_counter() - started) / sample_users
+    started = time.perf_counter()
+    engine_empty = sum(not engine.recommend(user_id, limit) for user_id in range(1, sample_users + 1))
+    engine_time = (time.perf_counter() - started) / sample_users
+    return filtering_time, empty / sample_users, engine_time, engine_empty / sample_users
+
+def time_scoring(embedding: CaravanEmbedding, users: int, limit: int, batch: int) -> float:
+    rows, offsets = build_histories(users, len(embedding))
+    started = time.perf_counter()
+    for start in range(0, users, batch):
+        histories = [rows[offsets[user]:offsets[user + 1]] for user in range(start, min(start + batch, users))]
+        embedding.top_k(embedding.queries(histories), limit, histories)
+    return time.perf_counter() - started
+
+def run(caravans: int, users: int, target_users: int, sample_users: int, limit: int, batch: int) -> None:
+    catalog = build_caravans(caravans)
+    caravan_repo = CaravanRepository()
+    caravan_repo.add_many(catalog)
+
+    started = time.perf_counter()
+    embedding = CaravanEmbedding(caravan_repo.get_all())
+    embed_time = time.perf_counter() - started
+    print(f"\n{caravans:,} caravans, top {limit}")
+    print(f"embedding: {embed_time * 1000:.0f} ms, {embedding.matrix.nbytes / 2**20:.1f} MiB ({embedding.matrix.shape[1]} features)")
+
+    filtering_time, filtering_empty, engine_time, engine_empty = time_filtering(caravan_repo, sample_users, limit)
+    print(f"\nper user, {sample_users} users through the services")
+    print(f"{'':<12}{'ms/user':>10}{'empty':>10}")
+    print(f"{'filtering':<12}{filtering_time * 1000:>10.2f}{filtering_empty:>10.0%}")
+    print(f"{'engine':<12}{engine_time * 1000:>10.2f}{engine_empty:>10.0%}")
+
+    scoring_time = time_scoring(embedding, users, limit, batch)
+    per_user = scoring_time / users
+    print(f"\nbatched scoring, {batch} users per matrix product")
+    print(f"{users:,} users: {scoring_time:.1f} s ({users / scoring_time:,.0f} users/s, {per_user * 1e6:.0f} us/user)")
+    if target_users != users:
+        print(f"projected for {target_users:,} users: {per_user * target_users / 60:.1f} min on one core")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--caravans", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20_000, help="users scored by the engine")
+    parser.add_argument("--target-users", type=int, default=1_000_000, help="users to project the engine's time for")
+    parser.add_argument("--sample-users", type=int, default=200, help="users timed through the services")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+    run(args.caravans, args.users, args.target_users, args.sample_users, args.limit, args.batch)
@@ -0,0 +1,61 @@
+"""
+Measures write throughput with the change log attached, and recovery time
+from a snapshot plus log tail, for an in-memory ReservationRepository.
+
+    python benchmarks/bench_recovery.py --rows 2000000 --tail 100000
+"""
+import argparse
+import tempfile
+import time
+from datetime import date
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Reservation
+from src.repositories import ReservationRepository, RepositoryPersistence
+
+def make_reservation(i: int) -> Reservation:
+    start = date(2024, 1, 1).toordinal() + (i // 1000) * 3
+    return Reservation(
+        id=0, user_id=i % 50_000, caravan_id=i % 1000,
+        start_date=date.fromordinal(start), end_date=date.fromordinal(start + 2), price=100.0,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--tail", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        repo = ReservationRepository()
+        persistence = RepositoryPersistence(repo, directory)
+        persistence.recover()
+
+        started = time.perf_counter()
+        for i in range(args.rows):
+            repo.add(make_reservation(i))
+        elapsed = time.perf_counter() - started
+        print(f"logged writes:    {args.rows:,} in {elapsed:.1f}s ({args.rows / elapsed:,.0f}/s)")
+
+        started = time.perf_counter()
+        persistence.snapshot()
+        print(f"snapshot:         {time.perf_counter() - started:.1f}s")
+
+        for i in range(args.tail):
+            repo.add(make_reservation(args.rows + i))
+        persistence.close()
+
+        recovered = ReservationRepository()
+        started = time.perf_counter()
+        persistence = RepositoryPersistence(recovered, directory)
+        replayed = persistence.recover()
+        elapsed = time.perf_counter() - started
+        print(f"recovery:         {len(recovered.get_all()):,} reservations ({replayed:,} replayed) in {elapsed:.1f}s")
+        persistence.close()
+
+if __name__ == "__main__":
+    main()
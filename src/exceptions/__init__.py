@@ -1,13 +1,17 @@
 from .custom_exceptions import (
     CaravanShareException,
+    ConcurrentUpdateError,
     DuplicateReservationError,
+    DuplicateUserError,
     InsufficientFundsError,
     NotFoundError,
 )
 
 __all__ = [
     "CaravanShareException",
+    "ConcurrentUpdateError",
     "DuplicateReservationError",
+    "DuplicateUserError",
     "InsufficientFundsError",
     "NotFoundError",
 ]
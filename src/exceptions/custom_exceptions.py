@@ -6,6 +6,14 @@ class DuplicateReservationError(CaravanShareException):
     """Raised when a reservation conflicts with an existing one."""
     pass
 
+class ConcurrentUpdateError(CaravanShareException):
+    """Raised when an update would overwrite a newer version of an item, or kept losing to other writers and gave up retrying."""
+    pass
+
+class DuplicateUserError(CaravanShareException):
+    """Raised when a user's name or contact is already taken by another user."""
+    pass
+
 class InsufficientFundsError(CaravanShareException):
     """Raised when a user has insufficient funds for a payment."""
     pass
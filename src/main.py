@@ -1,8 +1,11 @@
+import os
 from datetime import date
 from src.models import User, Caravan
 from src.repositories import (
     UserRepository, CaravanRepository, ReservationRepository, 
-    PaymentRepository, ReviewRepository, MessageRepository, SettlementRepository
+    PaymentRepository, ReviewRepository, MessageRepository, SettlementRepository,
+    SqliteDatabase, SqliteUserRepository, SqliteCaravanRepository, SqliteReservationRepository,
+    SqlitePaymentRepository, SqliteReviewRepository, SqliteMessageRepository, SqliteSettlementRepository,
 )
 from src.services import (
     ReservationService, PaymentService, ReviewService, MessageService, MapService, SettlementService
@@ -12,20 +15,36 @@ from src.strategies import PercentageDiscount, PercentageFee, FlexibleRefundPoli
 from src.observers import (
     ReservationPublisher, HostNotifier, PaymentPublisher, 
     GuestNotifier, ReviewPublisher, GuestReviewNotifier, HostReviewNotifier,
-    MessagePublisher, MessageNotifier
+    MessagePublisher, MessageNotifier, PayoutLedger
 )
 from src.factories import ReservationFactory
 from src.exceptions import DuplicateReservationError, InsufficientFundsError, NotFoundError
 
-def main():
+def create_repositories(backend: str = "memory", db_path: str = ":memory:"):
+    """
+    Returns (user, caravan, reservation, payment, review, message, settlement)
+    repositories for the "memory" or "sqlite" backend.
+    """
+    if backend == "memory":
+        return (
+            UserRepository(), CaravanRepository(), ReservationRepository(), PaymentRepository(),
+            ReviewRepository(), MessageRepository(), SettlementRepository(),
+        )
+    if backend == "sqlite":
+        db = SqliteDatabase(db_path)
+        return (
+            SqliteUserRepository(db), SqliteCaravanRepository(db), SqliteReservationRepository(db),
+            SqlitePaymentRepository(db), SqliteReviewRepository(db), SqliteMessageRepository(db),
+            SqliteSettlementRepository(db),
+        )
+    raise ValueError(f"Unknown repository backend: {backend}")
+
+def main(backend: str = os.environ.get("CARAVANSHARE_BACKEND", "memory")):
     # Initialize repositories
-    user_repo = UserRepository()
-    caravan_repo = CaravanRepository()
-    reservation_repo = ReservationRepository()
-    payment_repo = PaymentRepository()
-    review_repo = ReviewRepository()
-    message_repo = MessageRepository()
-    settlement_repo = SettlementRepository()
+    (
+        user_repo, caravan_repo, reservation_repo, payment_repo,
+        review_repo, message_repo, settlement_repo,
+    ) = create_repositories(backend, os.environ.get("CARAVANSHARE_DB", ":memory:"))
 
     # Initialize validators
     validator = ReservationValidator(user_repo, caravan_repo, reservation_repo)
@@ -38,6 +57,8 @@ def main():
     payment_publisher = PaymentPublisher()
     guest_payment_notifier = GuestNotifier(user_repo)
     payment_publisher.subscribe(guest_payment_notifier)
+    payout_ledger = PayoutLedger(reservation_repo, caravan_repo)
+    payment_publisher.subscribe(payout_ledger)
 
     review_publisher = ReviewPublisher()
     guest_review_notifier = GuestReviewNotifier(user_repo, reservation_repo)
@@ -60,7 +81,7 @@ def main():
     review_service = ReviewService(review_repo, review_publisher)
     message_service = MessageService(message_repo, user_repo, message_publisher)
     map_service = MapService(caravan_repo)
-    settlement_service = SettlementService(payment_repo, settlement_repo, user_repo)
+    settlement_service = SettlementService(payment_repo, settlement_repo, user_repo, payout_ledger)
 
     # Create some initial data
     host = user_repo.add(User(id=0, name="Host User", contact="host@example.com", is_host=True))
@@ -97,12 +118,15 @@ def main():
             fee_strategy=platform_fee_strategy,
         )
         print(f"Reservation created: {reservation_for_settlement}")
+        # Re-read users: persistent backends hand out copies, not the stored objects.
+        guest = user_repo.get_by_id(guest.id)
         print(f"Guest's balance after reservation: ${guest.balance}")
         
         # Simulate host settlement
         print(f"\nProcessing settlement for host {host.id}...")
         settlement = settlement_service.settle_for_host(host.id)
         print(f"Settlement processed: {settlement}")
+        host = user_repo.get_by_id(host.id)
         print(f"Host's balance after settlement: ${host.balance}")
         print(f"Payments after settlement: {payment_repo.get_all()}")
         print(f"Settlements: {settlement_repo.get_all()}")
@@ -112,6 +136,7 @@ def main():
         # To test different refund scenarios, change the date.today() in PaymentService
         # For this demo, let's assume it's within 3-7 days for a 50% refund.
         payment_service.refund_payment(reservation_for_settlement.id, refund_policy=FlexibleRefundPolicy())
+        guest = user_repo.get_by_id(guest.id)
         print(f"Guest's balance after refund: ${guest.balance}")
         print(f"Payments after refund: {payment_repo.get_all()}")
 
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)
 class Payment:
     id: int
     reservation_id: int
@@ -11,3 +11,5 @@ class Payment:
     settled: bool = False
     status: str = "completed"  # completed, refunded
     created_at: datetime = datetime.now()
+    # Bumped by every write; see compare_and_set on the repositories.
+    version: int = 0
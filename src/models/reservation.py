@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from datetime import date
 
-@dataclass
+@dataclass(slots=True)
 class Reservation:
     id: int
     user_id: int
@@ -10,3 +10,5 @@ class Reservation:
     end_date: date
     price: float
     status: str = "pending"  # pending, approved, rejected, paid, cancelled
+    # Bumped by every write; see compare_and_set on the repositories.
+    version: int = 0
@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List
 
-@dataclass
+@dataclass(slots=True)
 class Settlement:
     id: int
     host_id: int
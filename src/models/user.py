@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: int
     name: str
@@ -12,3 +12,5 @@ class User:
     # In a real application, this would be more complex
     # and involve password hashing and management.
     password_hash: Optional[str] = None
+    # Bumped by every write; see compare_and_set on the repositories.
+    version: int = 0
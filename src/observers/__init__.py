@@ -1,19 +1,34 @@
 from .observer import Publisher, Subscriber
-from .reservation_observers import ReservationPublisher, HostNotifier
-from .payment_observers import PaymentPublisher, GuestNotifier
+from .async_observer import AsyncPublisher, AsyncSubscriber
+from .dispatcher import ThreadPoolDispatcher
+from .notification_channel import NotificationChannel, ConsoleChannel, CoalescingChannel, URGENT_EVENTS
+from .reservation_observers import ReservationPublisher, AsyncReservationPublisher, HostNotifier
+from .payment_observers import PaymentPublisher, AsyncPaymentPublisher, GuestNotifier
 from .review_observers import ReviewPublisher, GuestReviewNotifier, HostReviewNotifier
-from .message_observers import MessagePublisher, MessageNotifier
+from .message_observers import MessagePublisher, AsyncMessagePublisher, MessageNotifier
+from .payout_ledger import PayoutLedger
 
 __all__ = [
     "Publisher", 
     "Subscriber", 
+    "AsyncPublisher",
+    "AsyncSubscriber",
+    "ThreadPoolDispatcher",
+    "NotificationChannel",
+    "ConsoleChannel",
+    "CoalescingChannel",
+    "URGENT_EVENTS",
     "ReservationPublisher", 
+    "AsyncReservationPublisher",
     "HostNotifier",
     "PaymentPublisher",
+    "AsyncPaymentPublisher",
     "GuestNotifier",
     "ReviewPublisher",
     "GuestReviewNotifier",
     "HostReviewNotifier",
     "MessagePublisher",
+    "AsyncMessagePublisher",
     "MessageNotifier",
+    "PayoutLedger",
 ]
@@ -0,0 +1,64 @@
+import asyncio
+from abc import ABC, abstractmethod
+from functools import partial
+from typing import Any, List, Optional, Sequence, Union
+from .dispatcher import ThreadPoolDispatcher
+from .observer import Subscriber
+
+class AsyncSubscriber(ABC):
+    @abstractmethod
+    async def update(self, publisher: 'AsyncPublisher', event: str, data: Any):
+        pass
+
+    async def update_many(self, publisher: 'AsyncPublisher', event: str, items: Sequence[Any]):
+        for data in items:
+            await self.update(publisher, event, data)
+
+class AsyncPublisher(ABC):
+    def __init__(self, dispatcher: Optional[ThreadPoolDispatcher] = None):
+        """
+        The asyncio counterpart of Publisher. AsyncSubscribers are awaited in
+        subscription order. Plain Subscribers, such as the notifiers, are
+        called directly unless a dispatcher is given, which keeps their
+        blocking work off the event loop.
+        """
+        self._subscribers: List[Union[Subscriber, AsyncSubscriber]] = []
+        self._dispatcher = dispatcher
+
+    def subscribe(self, subscriber: Union[Subscriber, AsyncSubscriber]):
+        if subscriber not in self._subscribers:
+            self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Union[Subscriber, AsyncSubscriber]):
+        self._subscribers.remove(subscriber)
+        if self._dispatcher is not None:
+            self._dispatcher.discard(subscriber, self)
+
+    async def notify(self, event: str, data: Any):
+        for subscriber in self._subscribers:
+            if isinstance(subscriber, AsyncSubscriber):
+                await subscriber.update(self, event, data)
+            elif self._dispatcher is None:
+                subscriber.update(self, event, data)
+            else:
+                self._dispatcher.dispatch(subscriber, partial(subscriber.update, self, event, data), self)
+
+    async def notify_many(self, event: str, items: Sequence[Any]):
+        if not items:
+            return
+        for subscriber in self._subscribers:
+            if isinstance(subscriber, AsyncSubscriber):
+                await subscriber.update_many(self, event, items)
+            elif self._dispatcher is None:
+                subscriber.update_many(self, event, items)
+            else:
+                self._dispatcher.dispatch(subscriber, partial(subscriber.update_many, self, event, list(items)), self)
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits, without blocking the loop, until the dispatcher has delivered
+        every queued event. Returns False on timeout.
+        """
+        if self._dispatcher is None:
+            return True
+        return await asyncio.get_running_loop().run_in_executor(None, self._dispatcher.flush, timeout)
@@ -0,0 +1,193 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class _Lane:
+    """
+    The pending deliveries of one subscriber, from every publisher sharing the
+    dispatcher. A lane is handed to at most one worker at a time, which is
+    what keeps each subscriber's events in order, and it stays the
+    subscriber's only lane until it is drained.
+    """
+    __slots__ = ("subscriber", "deliveries", "scheduled")
+
+    def __init__(self, subscriber: Any):
+        # Holding the subscriber keeps id(subscriber) from being reused while the lane exists.
+        self.subscriber = subscriber
+        # (enqueued_at, publisher, deliver)
+        self.deliveries: Deque[Tuple[float, Any, Callable[[], None]]] = deque()
+        self.scheduled = False
+
+class ThreadPoolDispatcher:
+    """
+    Delivers publisher events from a pool of worker threads, so a slow
+    subscriber no longer adds to the latency of the call that published.
+
+    - Ordering: each subscriber receives its events in publish order.
+    - Backpressure: at most `max_pending` events are queued in total; once
+      full, dispatch() blocks for up to `enqueue_timeout` seconds (forever
+      if None) and then drops the event.
+    - Isolation: a subscriber occupies at most one worker, may hold at most
+      `max_pending_per_subscriber` queued events (more are dropped), and
+      events that waited in the queue longer than `delivery_timeout` seconds
+      are expired instead of delivered, so a stalled subscriber cannot hold
+      up the others or the publishers.
+
+    `delivery_timeout` only limits queueing time: a call already running is
+    never interrupted, so a subscriber that hangs inside update() keeps its
+    worker until it returns. discard() drops what is queued for it meanwhile.
+
+    Subscriber exceptions are logged and counted, never raised to the publisher.
+    """
+    def __init__(
+        self,
+        workers: int = 4,
+        max_pending: int = 10_000,
+        max_pending_per_subscriber: int = 1_000,
+        enqueue_timeout: Optional[float] = None,
+        delivery_timeout: Optional[float] = None,
+        burst: int = 32,
+    ):
+        self._max_pending_per_subscriber = max(1, max_pending_per_subscriber)
+        self._enqueue_timeout = enqueue_timeout
+        self._delivery_timeout = delivery_timeout
+        # Deliveries a worker makes from one lane before letting other lanes run.
+        self._burst = max(1, burst)
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # {id(subscriber): lane}
+        self._lanes: Dict[int, _Lane] = {}
+        self._ready: "queue.SimpleQueue[Optional[_Lane]]" = queue.SimpleQueue()
+        self._pending = 0
+        self._closed = False
+        self._stats = {"delivered": 0, "failed": 0, "dropped": 0, "expired": 0}
+        self._workers = [
+            threading.Thread(target=self._run, name=f"notify-worker-{number}", daemon=True)
+            for number in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def dispatch(self, subscriber: Any, deliver: Callable[[], None], publisher: Any = None) -> bool:
+        """
+        Queues `deliver` on the subscriber's lane, on behalf of `publisher`.
+        Returns False if the event was dropped.
+        """
+        if not self._slots.acquire(timeout=self._enqueue_timeout):
+            with self._lock:
+                self._stats["dropped"] += 1
+            return False
+        with self._lock:
+            if self._closed:
+                self._slots.release()
+                raise RuntimeError("The dispatcher is closed.")
+            lane = self._lanes.get(id(subscriber))
+            if lane is None:
+                lane = self._lanes[id(subscriber)] = _Lane(subscriber)
+            if len(lane.deliveries) >= self._max_pending_per_subscriber:
+                self._stats["dropped"] += 1
+                self._slots.release()
+                return False
+            lane.deliveries.append((time.monotonic(), publisher, deliver))
+            self._pending += 1
+            if not lane.scheduled:
+                lane.scheduled = True
+                self._ready.put(lane)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            lane = self._ready.get()
+            if lane is None:
+                return
+            self._drain(lane)
+
+    def _drain(self, lane: _Lane) -> None:
+        for _ in range(self._burst):
+            with self._lock:
+                if not lane.deliveries:
+                    lane.scheduled = False
+                    # Forget drained lanes so short-lived subscribers do not pile up.
+                    if self._lanes.get(id(lane.subscriber)) is lane:
+                        del self._lanes[id(lane.subscriber)]
+                    return
+                enqueued_at, _, deliver = lane.deliveries.popleft()
+            outcome = self._deliver(enqueued_at, deliver)
+            with self._lock:
+                self._stats[outcome] += 1
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.notify_all()
+            self._slots.release()
+        # Still scheduled: go to the back of the line so other lanes get a worker.
+        self._ready.put(lane)
+
+    def _deliver(self, enqueued_at: float, deliver: Callable[[], None]) -> str:
+        if self._delivery_timeout is not None and time.monotonic() - enqueued_at > self._delivery_timeout:
+            return "expired"
+        try:
+            deliver()
+        except Exception:
+            logger.exception("Subscriber failed to handle an event")
+            return "failed"
+        return "delivered"
+
+    def discard(self, subscriber: Any, publisher: Any = None) -> int:
+        """
+        Drops the subscriber's queued events, only those queued by `publisher`
+        if one is given, as when it unsubscribes from that publisher. An event
+        already being delivered still runs to the end, and the lane is kept
+        until then, so events dispatched meanwhile still wait their turn.
+        Returns the number of events dropped.
+        """
+        with self._lock:
+            lane = self._lanes.get(id(subscriber))
+            if lane is None:
+                return 0
+            kept = [entry for entry in lane.deliveries if publisher is not None and entry[1] is not publisher]
+            dropped = len(lane.deliveries) - len(kept)
+            lane.deliveries = deque(kept)
+            self._stats["dropped"] += dropped
+            self._pending -= dropped
+            if self._pending == 0:
+                self._idle.notify_all()
+        for _ in range(dropped):
+            self._slots.release()
+        return dropped
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every queued event has been handled. Returns False on timeout.
+        Must not be called from a subscriber, which would wait on itself.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stops accepting events, drains the queue and stops the workers.
+        Returns False if the queue did not drain within `timeout`.
+        """
+        with self._lock:
+            self._closed = True
+        drained = self.flush(timeout)
+        for _ in self._workers:
+            self._ready.put(None)
+        if drained:
+            for worker in self._workers:
+                worker.join()
+        return drained
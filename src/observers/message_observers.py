@@ -1,14 +1,20 @@
-from typing import Any
+from typing import Any, Optional
 from .observer import Publisher, Subscriber
+from .async_observer import AsyncPublisher
+from .notification_channel import ConsoleChannel, NotificationChannel
 from src.models import Message, User
 from src.repositories import UserRepository
 
 class MessagePublisher(Publisher):
     pass
 
+class AsyncMessagePublisher(AsyncPublisher):
+    pass
+
 class MessageNotifier(Subscriber):
-    def __init__(self, user_repo: UserRepository):
+    def __init__(self, user_repo: UserRepository, channel: Optional[NotificationChannel] = None):
         self._user_repo = user_repo
+        self._channel = channel or ConsoleChannel()
 
     def update(self, publisher: Publisher, event: str, data: Any):
         if event == "message_sent":
@@ -16,8 +22,6 @@ class MessageNotifier(Subscriber):
             recipient = self._user_repo.get_by_id(message.recipient_id)
             sender = self._user_repo.get_by_id(message.sender_id)
             if recipient and sender:
-                print(f"\n--- NOTIFICATION ---")
-                print(f"To: {recipient.contact}")
-                print(f"Subject: New message from {sender.name}")
-                print(f"Message: {message.content}")
-                print(f"--- END NOTIFICATION ---")
+                self._channel.send(
+                    recipient.contact, f"New message from {sender.name}", f"Message: {message.content}", event
+                )
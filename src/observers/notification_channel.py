@@ -0,0 +1,152 @@
+import heapq
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+class NotificationChannel(ABC):
+    """
+    Where notifiers hand their notifications for delivery (email, SMS, push...).
+    """
+    @abstractmethod
+    def send(self, recipient: str, subject: str, body: str, event: str = ""):
+        pass
+
+class ConsoleChannel(NotificationChannel):
+    def send(self, recipient: str, subject: str, body: str, event: str = ""):
+        # In a real app, this would send an email, SMS, or push notification.
+        print(f"\n--- NOTIFICATION ---")
+        print(f"To: {recipient}")
+        print(f"Subject: {subject}")
+        print(body)
+        print(f"--- END NOTIFICATION ---")
+
+@dataclass
+class _Pending:
+    subject: str
+    body: str
+    event: str
+
+# Events a recipient should hear about right away rather than in the next digest.
+URGENT_EVENTS = frozenset({"reservation_cancelled", "reservation_rejected", "payment_refunded"})
+
+class CoalescingChannel(NotificationChannel):
+    """
+    Buffers notifications per recipient and sends them as one digest once the
+    recipient's window closes, so a busy host gets one message per window
+    instead of one per event. Events in `urgent_events` bypass the buffer.
+
+    A recipient's window opens with their first buffered notification. A
+    digest is also sent early when `max_items` notifications are waiting.
+    With `background=True` a daemon thread sends digests as windows close;
+    otherwise call flush_due() periodically. flush() sends everything now.
+    """
+    def __init__(
+        self,
+        channel: NotificationChannel,
+        window: float = 300.0,
+        urgent_events: Iterable[str] = URGENT_EVENTS,
+        max_items: int = 50,
+        clock: Callable[[], float] = time.monotonic,
+        background: bool = True,
+    ):
+        self._channel = channel
+        self._window = window
+        self._urgent_events: FrozenSet[str] = frozenset(urgent_events)
+        self._max_items = max(1, max_items)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # {recipient: pending notifications, oldest first}
+        self._buffers: Dict[str, List[_Pending]] = {}
+        # [(deadline, recipient)]; entries whose buffer was already sent are skipped.
+        self._deadlines: List[Tuple[float, str]] = []
+        self._opened_at: Dict[str, float] = {}
+        self._sent = {"immediate": 0, "digests": 0, "coalesced": 0}
+
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if background:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="digest-flusher", daemon=True)
+            self._flusher.start()
+
+    def send(self, recipient: str, subject: str, body: str, event: str = ""):
+        if event in self._urgent_events:
+            self._channel.send(recipient, subject, body, event)
+            with self._lock:
+                self._sent["immediate"] += 1
+            return
+
+        with self._lock:
+            buffer = self._buffers.get(recipient)
+            if buffer is None:
+                buffer = self._buffers[recipient] = []
+                opened_at = self._clock()
+                self._opened_at[recipient] = opened_at
+                heapq.heappush(self._deadlines, (opened_at + self._window, recipient))
+            buffer.append(_Pending(subject, body, event))
+            full = self._take(recipient) if len(buffer) >= self._max_items else None
+        if full:
+            self._send_digest(recipient, full)
+
+    def _take(self, recipient: str) -> List[_Pending]:
+        del self._opened_at[recipient]
+        return self._buffers.pop(recipient)
+
+    def flush_due(self) -> int:
+        """
+        Sends the digests whose window has closed. Returns how many were sent.
+        """
+        now = self._clock()
+        due = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, recipient = heapq.heappop(self._deadlines)
+                # Skip stale deadlines of buffers already sent early; a newer one may be open.
+                opened_at = self._opened_at.get(recipient)
+                if opened_at is not None and opened_at + self._window == deadline:
+                    due.append((recipient, self._take(recipient)))
+        for recipient, pending in due:
+            self._send_digest(recipient, pending)
+        return len(due)
+
+    def flush(self) -> int:
+        """
+        Sends every buffered notification now. Returns how many digests were sent.
+        """
+        with self._lock:
+            due = [(recipient, self._take(recipient)) for recipient in list(self._buffers)]
+            self._deadlines.clear()
+        for recipient, pending in due:
+            self._send_digest(recipient, pending)
+        return len(due)
+
+    def _send_digest(self, recipient: str, pending: List[_Pending]) -> None:
+        if len(pending) == 1:
+            # A lone notification goes out as it is.
+            only = pending[0]
+            self._channel.send(recipient, only.subject, only.body, only.event)
+        else:
+            body = "\n".join(f"- {item.subject}: {item.body}" for item in pending)
+            self._channel.send(recipient, f"You have {len(pending)} new updates", body, "digest")
+        with self._lock:
+            self._sent["digests"] += 1
+            self._sent["coalesced"] += len(pending)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        immediate: urgent sends; digests: sends for buffered notifications; coalesced: notifications they carried.
+        """
+        with self._lock:
+            return dict(self._sent)
+
+    def _flush_periodically(self) -> None:
+        interval = min(max(self._window / 4, 0.01), 1.0)
+        while not self._closed.wait(interval):
+            self.flush_due()
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
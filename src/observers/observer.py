@@ -1,14 +1,29 @@
 from abc import ABC, abstractmethod
-from typing import Any, List
+from functools import partial
+from typing import Any, List, Optional, Sequence
+from .dispatcher import ThreadPoolDispatcher
 
 class Subscriber(ABC):
     @abstractmethod
     def update(self, publisher: 'Publisher', event: str, data: Any):
         pass
 
+    def update_many(self, publisher: 'Publisher', event: str, items: Sequence[Any]):
+        """
+        Receives one event for a whole batch. Subscribers that can handle a
+        batch at once override this; by default each item is delivered alone.
+        """
+        for data in items:
+            self.update(publisher, event, data)
+
 class Publisher(ABC):
-    def __init__(self):
+    def __init__(self, dispatcher: Optional[ThreadPoolDispatcher] = None):
+        """
+        Subscribers are called synchronously inside notify() unless a
+        dispatcher is given, which delivers from its worker threads instead.
+        """
         self._subscribers: List[Subscriber] = []
+        self._dispatcher = dispatcher
 
     def subscribe(self, subscriber: Subscriber):
         if subscriber not in self._subscribers:
@@ -16,7 +31,29 @@ class Publisher(ABC):
 
     def unsubscribe(self, subscriber: Subscriber):
         self._subscribers.remove(subscriber)
+        if self._dispatcher is not None:
+            self._dispatcher.discard(subscriber, self)
 
     def notify(self, event: str, data: Any):
         for subscriber in self._subscribers:
-            subscriber.update(self, event, data)
+            if self._dispatcher is None:
+                subscriber.update(self, event, data)
+            else:
+                self._dispatcher.dispatch(subscriber, partial(subscriber.update, self, event, data), self)
+
+    def notify_many(self, event: str, items: Sequence[Any]):
+        if not items:
+            return
+        for subscriber in self._subscribers:
+            if self._dispatcher is None:
+                subscriber.update_many(self, event, items)
+            else:
+                self._dispatcher.dispatch(subscriber, partial(subscriber.update_many, self, event, list(items)), self)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the dispatcher has delivered every queued event. Returns False on timeout.
+        """
+        if self._dispatcher is None:
+            return True
+        return self._dispatcher.flush(timeout)
@@ -1,14 +1,20 @@
-from typing import Any
+from typing import Any, Optional
 from .observer import Publisher, Subscriber
+from .async_observer import AsyncPublisher
+from .notification_channel import ConsoleChannel, NotificationChannel
 from src.models import Payment, User
 from src.repositories import UserRepository
 
 class PaymentPublisher(Publisher):
     pass
 
+class AsyncPaymentPublisher(AsyncPublisher):
+    pass
+
 class GuestNotifier(Subscriber):
-    def __init__(self, user_repo: UserRepository):
+    def __init__(self, user_repo: UserRepository, channel: Optional[NotificationChannel] = None):
         self._user_repo = user_repo
+        self._channel = channel or ConsoleChannel()
 
     def get_guest(self, payment: Payment) -> User:
         # This is a simplification. In a real app, you'd get the user from the reservation.
@@ -32,9 +38,4 @@ class GuestNotifier(Subscriber):
 
         message = messages.get(event)
         if message:
-            # In a real app, this would send an email, SMS, or push notification.
-            print(f"\n--- NOTIFICATION ---")
-            print(f"To: {guest.contact}")
-            print(f"Subject: Payment Status Update")
-            print(message)
-            print(f"--- END NOTIFICATION ---")
+            self._channel.send(guest.contact, "Payment Status Update", message, event)
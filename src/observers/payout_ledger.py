@@ -0,0 +1,101 @@
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Sequence
+from .observer import Publisher, Subscriber
+from src.models import Payment
+from src.repositories import CaravanRepository, ReservationRepository
+
+logger = logging.getLogger(__name__)
+
+class PayoutLedger(Subscriber):
+    """
+    The unsettled payments owed to each host, kept up to date from payment
+    events: a completed payment is attributed to the host of the reserved
+    caravan, a refunded one is dropped. Settling a host then only touches
+    that host's pending payments.
+
+    Payments made before the ledger was subscribed can be loaded with
+    record(), e.g. from payment_repo.find_by_status("completed", settled=False).
+    """
+    def __init__(self, reservation_repo: ReservationRepository, caravan_repo: CaravanRepository):
+        self._reservation_repo = reservation_repo
+        self._caravan_repo = caravan_repo
+        self._lock = threading.Lock()
+        # {host_id: {payment_id: payment}}
+        self._pending: Dict[int, Dict[int, Payment]] = {}
+        # {payment_id: host_id}
+        self._hosts: Dict[int, int] = {}
+
+    def update(self, publisher: Publisher, event: str, data: Any):
+        self.update_many(publisher, event, [data])
+
+    def update_many(self, publisher: Publisher, event: str, items: Sequence[Any]):
+        if event == "payment_completed":
+            self.record(items)
+        elif event == "payment_refunded":
+            self.discard(payment.id for payment in items)
+
+    def record(self, payments: Iterable[Payment]) -> None:
+        """
+        Adds unsettled payments, resolving reservation -> caravan -> host once per batch.
+        """
+        payments = [payment for payment in payments if not payment.settled and payment.status == "completed"]
+        reservations = self._reservation_repo.get_many([payment.reservation_id for payment in payments])
+        caravan_ids = list({reservation.caravan_id for reservation in reservations if reservation is not None})
+        host_of_caravan = {
+            caravan.id: caravan.host_id for caravan in self._caravan_repo.get_many(caravan_ids) if caravan is not None
+        }
+        with self._lock:
+            for payment, reservation in zip(payments, reservations):
+                host_id = host_of_caravan.get(reservation.caravan_id) if reservation is not None else None
+                if host_id is None:
+                    logger.warning("Payment %s cannot be attributed to a host", payment.id)
+                    continue
+                self._pending.setdefault(host_id, {})[payment.id] = payment
+                self._hosts[payment.id] = host_id
+
+    def discard(self, payment_ids: Iterable[int]) -> None:
+        with self._lock:
+            for payment_id in payment_ids:
+                host_id = self._hosts.pop(payment_id, None)
+                if host_id is not None:
+                    pending = self._pending[host_id]
+                    del pending[payment_id]
+                    if not pending:
+                        del self._pending[host_id]
+
+    def pending(self, host_id: int) -> List[Payment]:
+        with self._lock:
+            return list(self._pending.get(host_id, {}).values())
+
+    def pending_hosts(self) -> List[int]:
+        with self._lock:
+            return list(self._pending)
+
+    def take(self, host_id: int) -> List[Payment]:
+        """
+        Removes and returns the host's pending payments, so that two
+        settlements running at once cannot both pay them out.
+        """
+        with self._lock:
+            pending = self._pending.pop(host_id, {})
+            for payment_id in pending:
+                del self._hosts[payment_id]
+        return list(pending.values())
+
+    def take_all(self) -> Dict[int, List[Payment]]:
+        with self._lock:
+            pending, self._pending, self._hosts = self._pending, {}, {}
+        return {host_id: list(payments.values()) for host_id, payments in pending.items()}
+
+    def restore(self, host_id: int, payments: Iterable[Payment]) -> None:
+        """
+        Puts back payments taken for a settlement that could not be completed.
+        """
+        with self._lock:
+            for payment in payments:
+                self._pending.setdefault(host_id, {})[payment.id] = payment
+                self._hosts[payment.id] = host_id
+
+    def total(self, host_id: int) -> float:
+        return sum(payment.amount - payment.platform_fee for payment in self.pending(host_id))
@@ -1,15 +1,24 @@
 from typing import Any, Optional
 from .observer import Publisher, Subscriber
+from .async_observer import AsyncPublisher
+from .notification_channel import ConsoleChannel, NotificationChannel
 from src.models import Reservation, Caravan, User
 from src.repositories import CaravanRepository, UserRepository
 
 class ReservationPublisher(Publisher):
     pass
 
+class AsyncReservationPublisher(AsyncPublisher):
+    pass
+
 class HostNotifier(Subscriber):
-    def __init__(self, user_repo: UserRepository, caravan_repo: CaravanRepository):
+    def __init__(
+        self, user_repo: UserRepository, caravan_repo: CaravanRepository,
+        channel: Optional[NotificationChannel] = None,
+    ):
         self._user_repo = user_repo
         self._caravan_repo = caravan_repo
+        self._channel = channel or ConsoleChannel()
 
     def _get_host(self, reservation: Reservation) -> Optional[User]:
         caravan = self._caravan_repo.get_by_id(reservation.caravan_id)
@@ -34,9 +43,4 @@ class HostNotifier(Subscriber):
 
         message = messages.get(event)
         if message:
-            # In a real app, this would send an email, SMS, or push notification.
-            print(f"\n--- NOTIFICATION ---")
-            print(f"To: {host.contact}")
-            print(f"Subject: Reservation Status Update")
-            print(message)
-            print(f"--- END NOTIFICATION ---")
+            self._channel.send(host.contact, "Reservation Status Update", message, event)
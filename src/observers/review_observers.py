@@ -1,5 +1,6 @@
-from typing import Any
+from typing import Any, Optional
 from .observer import Publisher, Subscriber
+from .notification_channel import ConsoleChannel, NotificationChannel
 from src.models import Review, Reservation, User
 from src.repositories import UserRepository, ReservationRepository
 
@@ -7,25 +8,32 @@ class ReviewPublisher(Publisher):
     pass
 
 class GuestReviewNotifier(Subscriber):
-    def __init__(self, user_repo: UserRepository, reservation_repo: ReservationRepository):
+    def __init__(
+        self, user_repo: UserRepository, reservation_repo: ReservationRepository,
+        channel: Optional[NotificationChannel] = None,
+    ):
         self._user_repo = user_repo
         self._reservation_repo = reservation_repo
+        self._channel = channel or ConsoleChannel()
 
     def update(self, publisher: Publisher, event: str, data: Any):
         if event == "review_requested":
             reservation: Reservation = data
             guest = self._user_repo.get_by_id(reservation.user_id)
             if guest:
-                print(f"\n--- NOTIFICATION ---")
-                print(f"To: {guest.contact}")
-                print(f"Subject: How was your trip?")
-                print(f"Please leave a review for your recent trip (Reservation ID: {reservation.id}).")
-                print(f"--- END NOTIFICATION ---")
+                self._channel.send(
+                    guest.contact, "How was your trip?",
+                    f"Please leave a review for your recent trip (Reservation ID: {reservation.id}).", event,
+                )
 
 class HostReviewNotifier(Subscriber):
-    def __init__(self, user_repo: UserRepository, reservation_repo: ReservationRepository):
+    def __init__(
+        self, user_repo: UserRepository, reservation_repo: ReservationRepository,
+        channel: Optional[NotificationChannel] = None,
+    ):
         self._user_repo = user_repo
         self._reservation_repo = reservation_repo
+        self._channel = channel or ConsoleChannel()
 
     def update(self, publisher: Publisher, event: str, data: Any):
         if event == "review_created":
@@ -35,9 +43,9 @@ class HostReviewNotifier(Subscriber):
                 # Assuming the review subject is the caravan, so the host should be notified.
                 host = self._user_repo.get_by_id(review.subject_id)
                 if host and host.is_host:
-                    print(f"\n--- NOTIFICATION ---")
-                    print(f"To: {host.contact}")
-                    print(f"Subject: You have a new review!")
-                    print(f"A new {review.rating}-star review has been submitted for your caravan for reservation {reservation.id}.")
-                    print(f"Comment: {review.comment}")
-                    print(f"--- END NOTIFICATION ---")
+                    self._channel.send(
+                        host.contact, "You have a new review!",
+                        f"A new {review.rating}-star review has been submitted for your caravan for reservation {reservation.id}.\n"
+                        f"Comment: {review.comment}",
+                        event,
+                    )
@@ -1,19 +1,48 @@
 from .base_repository import BaseRepository
 from .user_repository import UserRepository
-from .caravan_repository import CaravanRepository
+from .caravan_repository import CaravanRepository, SearchPlan
 from .reservation_repository import ReservationRepository
 from .payment_repository import PaymentRepository
 from .review_repository import ReviewRepository
 from .message_repository import MessageRepository
 from .settlement_repository import SettlementRepository
+from .occupancy_calendar import OccupancyCalendar
+from .persistence import ChangeLog, RepositoryPersistence
+from .async_repository import AsyncRepository, AsyncReservationRepository
+from .sqlite_database import SqliteDatabase
+from .sqlite_repositories import (
+    SqliteBaseRepository,
+    SqliteUserRepository,
+    SqliteCaravanRepository,
+    SqliteReservationRepository,
+    SqlitePaymentRepository,
+    SqliteReviewRepository,
+    SqliteMessageRepository,
+    SqliteSettlementRepository,
+)
 
 __all__ = [
     "BaseRepository",
     "UserRepository",
     "CaravanRepository",
+    "SearchPlan",
     "ReservationRepository",
     "PaymentRepository",
     "ReviewRepository",
     "MessageRepository",
     "SettlementRepository",
+    "OccupancyCalendar",
+    "ChangeLog",
+    "RepositoryPersistence",
+    "AsyncRepository",
+    "AsyncReservationRepository",
+    "SqliteDatabase",
+    "SqliteBaseRepository",
+    "SqliteUserRepository",
+    "SqliteCaravanRepository",
+    "SqliteReservationRepository",
+    "SqlitePaymentRepository",
+    "SqliteReviewRepository",
+    "SqliteMessageRepository",
+    "SqliteSettlementRepository",
 ]
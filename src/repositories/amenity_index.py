@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+class AmenityIndex:
+    """
+    Interns amenity names into integer ids and keeps, per caravan, a bitmask
+    of its amenities plus an inverted index from amenity to caravan ids.
+    """
+    def __init__(self):
+        # {amenity_name: amenity_id}
+        self._amenity_ids: Dict[str, int] = {}
+        self._amenity_names: List[str] = []
+        # {caravan_id: bitmask of amenity ids}
+        self._masks: Dict[int, int] = {}
+        # {amenity_id: {caravan_id}}
+        self._postings: Dict[int, Set[int]] = {}
+
+    def intern(self, amenity: str) -> int:
+        amenity_id = self._amenity_ids.get(amenity)
+        if amenity_id is None:
+            amenity_id = len(self._amenity_names)
+            self._amenity_ids[amenity] = amenity_id
+            self._amenity_names.append(amenity)
+        return amenity_id
+
+    def insert(self, caravan_id: int, amenities: Iterable[str]) -> None:
+        mask = 0
+        for amenity in amenities:
+            mask |= 1 << self.intern(amenity)
+        if self._masks.get(caravan_id) == mask:
+            return
+        self.remove(caravan_id)
+        self._masks[caravan_id] = mask
+        for amenity_id in self._bits(mask):
+            self._postings.setdefault(amenity_id, set()).add(caravan_id)
+
+    def remove(self, caravan_id: int) -> None:
+        mask = self._masks.pop(caravan_id, None)
+        if mask is None:
+            return
+        for amenity_id in self._bits(mask):
+            posting = self._postings[amenity_id]
+            posting.discard(caravan_id)
+            if not posting:
+                del self._postings[amenity_id]
+
+    def mask_of(self, amenities: Iterable[str]) -> Optional[int]:
+        """
+        Returns the bitmask of the given amenities, or None if one of them was never seen.
+        """
+        mask = 0
+        for amenity in amenities:
+            amenity_id = self._amenity_ids.get(amenity)
+            if amenity_id is None:
+                return None
+            mask |= 1 << amenity_id
+        return mask
+
+    def has_all(self, caravan_id: int, required_mask: int) -> bool:
+        return self._masks.get(caravan_id, 0) & required_mask == required_mask
+
+    def candidates(self, amenities: Iterable[str]) -> Set[int]:
+        """
+        Returns the ids of the caravans offering every given amenity,
+        intersecting the posting sets from the smallest one up.
+        """
+        required_mask = self.mask_of(amenities)
+        if required_mask is None:
+            return set()
+        postings = sorted(
+            (self._postings.get(amenity_id, set()) for amenity_id in self._bits(required_mask)), key=len
+        )
+        if not postings:
+            return set(self._masks)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def estimate(self, amenities: Iterable[str]) -> int:
+        """
+        Returns the size of the smallest posting among the given amenities,
+        an upper bound on len(candidates(amenities)).
+        """
+        required_mask = self.mask_of(amenities)
+        if required_mask is None:
+            return 0
+        sizes = [len(self._postings.get(amenity_id, ())) for amenity_id in self._bits(required_mask)]
+        return min(sizes) if sizes else len(self._masks)
+
+    @staticmethod
+    def _bits(mask: int) -> List[int]:
+        bits = []
+        while mask:
+            lowest = mask & -mask
+            bits.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        return bits
@@ -0,0 +1,95 @@
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, AsyncContextManager, Callable, Generic, Iterable, List, Optional, TypeVar
+from src.models import Reservation
+from .striped_lock import AsyncStripedLock
+
+T = TypeVar('T')
+
+class AsyncRepository(Generic[T]):
+    """
+    A thin adapter that exposes a synchronous repository's methods as
+    coroutines, for services running on an asyncio event loop. Besides the
+    methods below, every public method of the wrapped repository
+    (find_by_status, search, ...) is available as a coroutine taking the
+    same arguments.
+
+    It does not make the repository non-blocking. Without an `executor` each
+    call runs to completion on the loop, which is only acceptable for the
+    in-memory repositories, whose calls are short and never wait on I/O.
+    With an executor each call makes the same thread hop as
+    run_in_executor; that keeps a blocking backend such as SQLite off the
+    loop, nothing more. A truly non-blocking backend would have to
+    implement these coroutines over an async driver.
+    """
+    def __init__(self, repository: Any, executor: Optional[Executor] = None):
+        self._repository = repository
+        self._executor = executor
+
+    @property
+    def repository(self) -> Any:
+        return self._repository
+
+    async def _call(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self._executor is None:
+            return method(*args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(method, *args, **kwargs))
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self._repository, name) if not name.startswith('_') else None
+        if not callable(method):
+            raise AttributeError(f"{type(self).__name__} has no coroutine {name!r}")
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self._call(method, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+    async def get_by_id(self, item_id: int) -> Optional[T]:
+        return await self._call(self._repository.get_by_id, item_id)
+
+    async def get_all(self) -> List[T]:
+        return await self._call(self._repository.get_all)
+
+    async def get_many(self, item_ids: Iterable[int]) -> List[Optional[T]]:
+        return await self._call(self._repository.get_many, list(item_ids))
+
+    async def add(self, item: T) -> T:
+        return await self._call(self._repository.add, item)
+
+    async def add_many(self, items: Iterable[T]) -> List[T]:
+        return await self._call(self._repository.add_many, list(items))
+
+    async def update(self, item: T) -> None:
+        await self._call(self._repository.update, item)
+
+    async def update_many(self, items: Iterable[T]) -> None:
+        await self._call(self._repository.update_many, list(items))
+
+    async def compare_and_set(self, item: T, expected_version: int) -> bool:
+        return await self._call(self._repository.compare_and_set, item, expected_version)
+
+    async def delete(self, item_id: int) -> None:
+        await self._call(self._repository.delete, item_id)
+
+    async def delete_many(self, item_ids: Iterable[int]) -> None:
+        await self._call(self._repository.delete_many, list(item_ids))
+
+class AsyncReservationRepository(AsyncRepository[Reservation]):
+    def __init__(self, repository: Any, executor: Optional[Executor] = None, lock_stripes: int = 64):
+        """
+        Bookings made through this view are serialized per caravan with
+        asyncio locks; see lock_caravans.
+        """
+        super().__init__(repository, executor)
+        self._caravan_locks = AsyncStripedLock(lock_stripes)
+
+    def lock_caravans(self, caravan_ids: Iterable[int]) -> AsyncContextManager[None]:
+        """
+        The asyncio counterpart of ReservationRepository.lock_caravans: holds
+        the caravans' booking locks across awaits without blocking the loop.
+        It excludes other tasks booking through this view, not threads that
+        book through the wrapped repository directly.
+        """
+        return self._caravan_locks.hold(caravan_ids)
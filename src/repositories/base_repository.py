@@ -1,11 +1,21 @@
-from typing import Dict, TypeVar, Generic, Optional, List
+import threading
+from typing import Any, Dict, Iterable, TypeVar, Generic, Optional, List
+from src.exceptions import ConcurrentUpdateError
 
 T = TypeVar('T')
 
 class BaseRepository(Generic[T]):
+    # Whether the model has a version field, which every write bumps.
+    _versioned = False
+
     def __init__(self):
         self._data: Dict[int, T] = {}
         self._next_id = 1
+        # Guards every write as a whole: id allocation, the store, the index
+        # hooks and the change log, so concurrent writers never interleave.
+        self._lock = threading.RLock()
+        # Optional ChangeLog that records every write, see RepositoryPersistence.
+        self._change_log = None
 
     def get_by_id(self, item_id: int) -> Optional[T]:
         return self._data.get(item_id)
@@ -14,14 +24,179 @@ class BaseRepository(Generic[T]):
         return list(self._data.values())
 
     def add(self, item: T) -> T:
-        item.id = self._next_id
-        self._data[self._next_id] = item
-        self._next_id += 1
+        with self._lock:
+            item.id = self._allocate_ids(1)
+            self._data[item.id] = item
+            self._index(item)
+            if self._change_log is not None:
+                self._change_log.append("add", item)
         return item
 
     def update(self, item: T) -> None:
-        self._data[item.id] = item
+        """
+        Stores `item`, bumping its version if the model is versioned. Raises
+        ConcurrentUpdateError, storing nothing, if the stored item has a newer
+        version than `item`, i.e. `item` is a stale copy.
+        """
+        with self._lock:
+            if self._versioned:
+                self._check_versions([item])
+                item.version += 1
+            self._data[item.id] = item
+            self._index(item)
+            if self._change_log is not None:
+                self._change_log.append("update", item)
+
+    def compare_and_set(self, item: T, expected_version: int) -> bool:
+        """
+        Stores `item` only if the stored one is still at `expected_version`,
+        and bumps its version. Returns False, storing nothing, if another
+        write got there first. `item` must be a copy (dataclasses.replace):
+        changing the stored object in place would bypass the check.
+        """
+        if not self._versioned:
+            raise TypeError(f"{type(self).__name__} does not version its items.")
+        with self._lock:
+            current = self._data.get(item.id)
+            if current is None or current.version != expected_version:
+                return False
+            item.version = expected_version + 1
+            self._data[item.id] = item
+            self._index(item)
+            if self._change_log is not None:
+                self._change_log.append("update", item)
+        return True
 
     def delete(self, item_id: int) -> None:
-        if item_id in self._data:
-            del self._data[item_id]
+        with self._lock:
+            if item_id in self._data:
+                self._unindex(item_id)
+                del self._data[item_id]
+                if self._change_log is not None:
+                    self._change_log.append("delete", item_id)
+
+    def _check_versions(self, items: List[T]) -> None:
+        for item in items:
+            current = self._data.get(item.id)
+            if current is not None and current.version != item.version:
+                raise ConcurrentUpdateError(
+                    f"{type(item).__name__} {item.id} is at version {current.version}, "
+                    f"not {item.version}: it was changed by another write."
+                )
+
+    def _allocate_ids(self, count: int) -> int:
+        """
+        Reserves `count` consecutive ids and returns the first. Called with
+        the lock held by the write that stores the items.
+        """
+        first_id = self._next_id
+        self._next_id += count
+        return first_id
+
+    def get_many(self, item_ids: Iterable[int]) -> List[Optional[T]]:
+        """
+        Returns the items with the given ids, in the same order, with None for unknown ids.
+        """
+        return [self._data.get(item_id) for item_id in item_ids]
+
+    def add_many(self, items: Iterable[T]) -> List[T]:
+        """
+        Adds a batch of items, assigning their ids as one consecutive block.
+        Indexes are updated and the change log is written once for the batch.
+        """
+        items = list(items)
+        with self._lock:
+            first_id = self._allocate_ids(len(items))
+            for item_id, item in enumerate(items, first_id):
+                item.id = item_id
+                self._data[item_id] = item
+            self._index_many(items)
+            if self._change_log is not None and items:
+                self._change_log.append("add_many", items)
+        return items
+
+    def update_many(self, items: Iterable[T]) -> None:
+        """
+        Updates a batch of items as update does. A stale item fails the whole batch.
+        """
+        items = list(items)
+        with self._lock:
+            if self._versioned:
+                self._check_versions(items)
+            for item in items:
+                if self._versioned:
+                    item.version += 1
+                self._data[item.id] = item
+            self._index_many(items)
+            if self._change_log is not None and items:
+                self._change_log.append("update_many", items)
+
+    def delete_many(self, item_ids: Iterable[int]) -> None:
+        with self._lock:
+            item_ids = [item_id for item_id in dict.fromkeys(item_ids) if item_id in self._data]
+            self._unindex_many(item_ids)
+            for item_id in item_ids:
+                del self._data[item_id]
+            if self._change_log is not None and item_ids:
+                self._change_log.append("delete_many", item_ids)
+
+    def attach_change_log(self, change_log) -> None:
+        self._change_log = change_log
+
+    def apply_change(self, operation: str, payload: Any) -> None:
+        """
+        Re-applies a logged write during recovery, keeping the logged ids and
+        without logging it again.
+        """
+        if operation in ("add", "update", "delete"):
+            payload = [payload]
+        if operation in ("delete", "delete_many"):
+            item_ids = [item_id for item_id in payload if item_id in self._data]
+            self._unindex_many(item_ids)
+            for item_id in item_ids:
+                del self._data[item_id]
+            return
+        for item in payload:
+            self._data[item.id] = item
+            self._next_id = max(self._next_id, item.id + 1)
+        self._index_many(payload)
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        return {"items": list(self._data.values()), "next_id": self._next_id}
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """
+        Loads a snapshot into an empty repository and rebuilds its indexes.
+        """
+        for item in state["items"]:
+            self._data[item.id] = item
+        self._index_many(state["items"])
+        self._next_id = state["next_id"]
+
+    def _index(self, item: T) -> None:
+        """
+        Hook for subclasses that keep secondary indexes in sync with the store.
+        Called after an item is stored by add or update, so it must replace
+        any entry already indexed under the item's id.
+        """
+        pass
+
+    def _index_many(self, items: List[T]) -> None:
+        """
+        Indexes a stored batch. Subclasses override it where an index can
+        absorb a whole batch more cheaply than one item at a time.
+        """
+        for item in items:
+            self._index(item)
+
+    def _unindex(self, item_id: int) -> None:
+        """
+        Hook for subclasses to drop a deleted item from their secondary indexes.
+        Indexes track their own keys per id because callers usually mutate the
+        stored object in place before calling update.
+        """
+        pass
+
+    def _unindex_many(self, item_ids: List[int]) -> None:
+        for item_id in item_ids:
+            self._unindex(item_id)
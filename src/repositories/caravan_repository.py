@@ -1,9 +1,128 @@
+from dataclasses import dataclass, field
+from itertools import islice
 from math import radians, cos, sin, asin, sqrt
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from src.models.caravan import Caravan
+from .amenity_index import AmenityIndex
 from .base_repository import BaseRepository
+from .columnar_store import CaravanColumnStore
+from .ranking_index import RankingIndex
+from .search_cache import SearchCache
+from .spatial_index import GeoGridIndex
+
+@dataclass
+class SearchPlan:
+    """
+    How find_matching evaluates a query: the index that produces the
+    candidates, its estimated candidate count, and the remaining predicates
+    in the order they are checked.
+    """
+    driver: str
+    estimated_candidates: int
+    filters: List[str] = field(default_factory=list)
+
+# Cheapest predicate first when estimates tie.
+_FILTER_COST = {"price": 0, "rating": 1, "amenities": 2, "nearby": 3}
 
 class CaravanRepository(BaseRepository[Caravan]):
+    def __init__(self, cell_size_deg: float = 0.1, columnar: bool = False, search_cache_size: int = 0):
+        """
+        `columnar=True` keeps a NumPy copy of the numeric fields so that
+        search runs vectorized. It requires numpy.
+
+        `search_cache_size` > 0 keeps that many recent search, find_nearby
+        and find_matching results. Cached location queries are answered for
+        the coordinates rounded to 4 decimals (about 11 m).
+        """
+        super().__init__()
+        self._spatial_index = GeoGridIndex(cell_size_deg)
+        self._amenity_index = AmenityIndex()
+        self._rating_ranking = RankingIndex()
+        # {caravan_id: (host_id, average_rating)} as of the last add/update
+        self._host_keys: Dict[int, Tuple[int, float]] = {}
+        # {host_id: [caravan_count, rating_sum]}
+        self._host_totals: Dict[int, List[float]] = {}
+        self._host_ranking = RankingIndex()
+        self._columns: Optional[CaravanColumnStore] = CaravanColumnStore() if columnar else None
+        # Bumped by every write; cached results from an older version are stale.
+        self._version = 0
+        self._search_cache: Optional[SearchCache] = SearchCache(search_cache_size) if search_cache_size > 0 else None
+
+    def _index(self, caravan: Caravan) -> None:
+        self._version += 1
+        self._spatial_index.insert(caravan.id, caravan.latitude, caravan.longitude)
+        self._amenity_index.insert(caravan.id, caravan.amenities)
+        self._rating_ranking.insert(caravan.id, caravan.average_rating)
+        self._index_host_rating(caravan)
+        if self._columns is not None:
+            self._columns.upsert(caravan)
+
+    def _unindex(self, caravan_id: int) -> None:
+        self._version += 1
+        self._spatial_index.remove(caravan_id)
+        self._amenity_index.remove(caravan_id)
+        self._rating_ranking.remove(caravan_id)
+        self._unindex_host_rating(caravan_id)
+        if self._columns is not None:
+            self._columns.remove(caravan_id)
+
+    def _index_many(self, caravans: List[Caravan]) -> None:
+        self._version += 1
+        touched_hosts = set()
+        for caravan in caravans:
+            self._spatial_index.insert(caravan.id, caravan.latitude, caravan.longitude)
+            self._amenity_index.insert(caravan.id, caravan.amenities)
+            touched_hosts.update(self._move_host_rating(caravan))
+            if self._columns is not None:
+                self._columns.upsert(caravan)
+        # One re-sort per ranking for the whole batch.
+        self._rating_ranking.insert_many((caravan.id, caravan.average_rating) for caravan in caravans)
+        self._rerank_hosts(touched_hosts)
+
+    def _index_host_rating(self, caravan: Caravan) -> None:
+        self._rerank_hosts(self._move_host_rating(caravan))
+
+    def _unindex_host_rating(self, caravan_id: int) -> None:
+        host_id = self._drop_host_rating(caravan_id)
+        if host_id is not None:
+            self._rerank_hosts([host_id])
+
+    def _move_host_rating(self, caravan: Caravan) -> List[int]:
+        """
+        Moves the caravan's rating into its host's totals and returns the hosts whose totals changed.
+        """
+        keys = (caravan.host_id, caravan.average_rating)
+        if self._host_keys.get(caravan.id) == keys:
+            return []
+        old_host_id = self._drop_host_rating(caravan.id)
+        self._host_keys[caravan.id] = keys
+        totals = self._host_totals.setdefault(caravan.host_id, [0, 0.0])
+        totals[0] += 1
+        totals[1] += caravan.average_rating
+        return [caravan.host_id] if old_host_id is None else [caravan.host_id, old_host_id]
+
+    def _drop_host_rating(self, caravan_id: int) -> Optional[int]:
+        keys = self._host_keys.pop(caravan_id, None)
+        if keys is None:
+            return None
+        host_id, rating = keys
+        totals = self._host_totals[host_id]
+        totals[0] -= 1
+        totals[1] -= rating
+        if totals[0] == 0:
+            del self._host_totals[host_id]
+        return host_id
+
+    def _rerank_hosts(self, host_ids: Iterable[int]) -> None:
+        ranked = []
+        for host_id in host_ids:
+            totals = self._host_totals.get(host_id)
+            if totals is None:
+                self._host_ranking.remove(host_id)
+            else:
+                ranked.append((host_id, totals[1] / totals[0]))
+        self._host_ranking.insert_many(ranked)
+
     def _haversine(self, lat1, lon1, lat2, lon2):
         """
         Calculate the great circle distance in kilometers between two points 
@@ -20,16 +139,214 @@ class CaravanRepository(BaseRepository[Caravan]):
         r = 6371 # Radius of earth in kilometers.
         return c * r
 
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def search_cache_stats(self) -> Dict[str, float]:
+        if self._search_cache is None:
+            raise RuntimeError("This repository was created without a search cache.")
+        return self._search_cache.stats()
+
+    def _cached(self, key: tuple, compute: Callable[[], List[Caravan]]) -> List[Caravan]:
+        version = self._version
+        result = self._search_cache.get(key, version)
+        if result is None:
+            result = compute()
+            self._search_cache.put(key, version, result)
+        # Callers get their own list; the caravans are shared as they are without the cache.
+        return list(result)
+
     def find_nearby(self, latitude: float, longitude: float, radius: float) -> List[Caravan]:
         """
         Find caravans within a given radius (in kilometers).
+        Only caravans in grid cells overlapping the radius' bounding box are
+        checked, so the cost follows the size of the area, not the fleet.
         """
-        nearby_caravans = []
-        for caravan in self.get_all():
-            distance = self._haversine(latitude, longitude, caravan.latitude, caravan.longitude)
+        if self._search_cache is None:
+            return self._find_nearby(latitude, longitude, radius)
+        latitude, longitude, radius = self._search_cache.round_location(latitude, longitude, radius)
+        return self._cached(
+            ("nearby", latitude, longitude, radius), lambda: self._find_nearby(latitude, longitude, radius)
+        )
+
+    def _find_nearby(self, latitude: float, longitude: float, radius: float) -> List[Caravan]:
+        nearby_ids = []
+        for caravan_id, caravan_lat, caravan_lon in self._spatial_index.candidates(latitude, longitude, radius):
+            distance = self._haversine(latitude, longitude, caravan_lat, caravan_lon)
             if distance <= radius:
-                nearby_caravans.append(caravan)
-        return nearby_caravans
+                nearby_ids.append(caravan_id)
+        # Keep the insertion order get_all() would have produced.
+        nearby_ids.sort()
+        return [self._data[caravan_id] for caravan_id in nearby_ids]
+
+    def plan_search(
+        self,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius: Optional[float] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        required_amenities: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+    ) -> SearchPlan:
+        """
+        Estimates how many caravans each given predicate lets through, from
+        the indexes alone, and picks the most selective indexed predicate to
+        produce candidates. The others become filters, most selective first;
+        price has no index and is assumed to pass everything.
+        """
+        total = len(self._data)
+        estimates: Dict[str, int] = {}
+        if radius is not None:
+            estimates["nearby"] = self._spatial_index.estimate(latitude, longitude, radius)
+        if required_amenities:
+            estimates["amenities"] = self._amenity_index.estimate(required_amenities)
+        if min_rating is not None:
+            estimates["rating"] = self._rating_ranking.count_at_least(min_rating)
+
+        driver, estimated = "scan", total
+        for name, estimate in estimates.items():
+            if estimate < estimated:
+                driver, estimated = name, estimate
+        if min_price is not None or max_price is not None:
+            estimates["price"] = total
+        filters = sorted(
+            (name for name in estimates if name != driver),
+            key=lambda name: (estimates[name], _FILTER_COST[name]),
+        )
+        return SearchPlan(driver, estimated, filters)
+
+    def find_matching(
+        self,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius: Optional[float] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        required_amenities: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        sort_by_rating: bool = False,
+        available: Optional[Callable[[List[int]], Iterable[int]]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Caravan]:
+        """
+        Search combining a radius (km) around (latitude, longitude) with the
+        filters of search(), following plan_search(). Candidates flow through
+        the filters one at a time and stop once offset + limit are found.
+
+        `available` is an optional batch filter, applied last to chunks of
+        candidate ids and returning those to keep (e.g. free on some dates).
+        Results come in insertion order, or by rating then insertion order.
+        Queries with `available` are never cached.
+        """
+        if self._search_cache is not None and available is None:
+            if radius is not None:
+                latitude, longitude, radius = self._search_cache.round_location(latitude, longitude, radius)
+            amenities = self._search_cache.normalize_amenities(required_amenities)
+            key = (
+                "matching", latitude, longitude, radius, min_price, max_price, amenities, min_rating,
+                sort_by_rating, limit, offset,
+            )
+            return self._cached(key, lambda: self._find_matching(
+                latitude, longitude, radius, min_price, max_price, list(amenities), min_rating,
+                sort_by_rating, None, limit, offset,
+            ))
+        return self._find_matching(
+            latitude, longitude, radius, min_price, max_price, required_amenities, min_rating,
+            sort_by_rating, available, limit, offset,
+        )
+
+    def _find_matching(
+        self,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        radius: Optional[float],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        required_amenities: Optional[List[str]],
+        min_rating: Optional[float],
+        sort_by_rating: bool,
+        available: Optional[Callable[[List[int]], Iterable[int]]],
+        limit: Optional[int],
+        offset: int,
+    ) -> List[Caravan]:
+        plan = self.plan_search(
+            latitude, longitude, radius, min_price, max_price, required_amenities, min_rating
+        )
+        required_mask = self._amenity_index.mask_of(required_amenities) if required_amenities else 0
+        if required_mask is None:
+            return []
+
+        predicates: Dict[str, Callable[[Caravan], bool]] = {
+            "price": lambda caravan: (
+                (min_price is None or caravan.price_per_day >= min_price)
+                and (max_price is None or caravan.price_per_day <= max_price)
+            ),
+            "rating": lambda caravan: caravan.average_rating >= min_rating,
+            "amenities": lambda caravan: self._amenity_index.has_all(caravan.id, required_mask),
+            "nearby": lambda caravan: (
+                self._haversine(latitude, longitude, caravan.latitude, caravan.longitude) <= radius
+            ),
+        }
+        caravans: Iterator[Caravan] = (
+            self._data[caravan_id]
+            for caravan_id in self._candidate_ids(
+                plan.driver, latitude, longitude, radius, required_amenities, min_rating, sort_by_rating
+            )
+        )
+        for name in plan.filters:
+            caravans = filter(predicates[name], caravans)
+        if available is not None:
+            caravans = self._filter_in_chunks(caravans, available)
+        stop = None if limit is None else offset + limit
+        return list(islice(caravans, offset, stop))
+
+    def _candidate_ids(
+        self,
+        driver: str,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        radius: Optional[float],
+        required_amenities: Optional[List[str]],
+        min_rating: Optional[float],
+        sort_by_rating: bool,
+    ) -> Iterable[int]:
+        if driver == "rating" and sort_by_rating:
+            return self._rating_ranking.iter_ranked(min_rating)
+        if driver == "scan":
+            return self._rating_ranking.iter_ranked() if sort_by_rating else iter(list(self._data))
+        if driver == "rating":
+            ids = list(self._rating_ranking.iter_ranked(min_rating))
+        elif driver == "amenities":
+            ids = list(self._amenity_index.candidates(required_amenities))
+        else:
+            ids = [
+                caravan_id
+                for caravan_id, caravan_lat, caravan_lon in self._spatial_index.candidates(latitude, longitude, radius)
+                if self._haversine(latitude, longitude, caravan_lat, caravan_lon) <= radius
+            ]
+        # Only the candidate ids are sorted; the caravans themselves are still read lazily.
+        if sort_by_rating:
+            ids.sort(key=lambda caravan_id: (-self._data[caravan_id].average_rating, caravan_id))
+        else:
+            ids.sort()
+        return ids
+
+    @staticmethod
+    def _filter_in_chunks(
+        caravans: Iterator[Caravan], keep: Callable[[List[int]], Iterable[int]], chunk_size: int = 256
+    ) -> Iterator[Caravan]:
+        while True:
+            chunk = list(islice(caravans, chunk_size))
+            if not chunk:
+                return
+            by_id = {caravan.id: caravan for caravan in chunk}
+            kept = set(keep(list(by_id)))
+            for caravan in chunk:
+                if caravan.id in kept:
+                    yield caravan
 
     def search(
         self,
@@ -42,7 +359,33 @@ class CaravanRepository(BaseRepository[Caravan]):
         """
         Search caravans based on various filters.
         """
-        filtered_caravans = self.get_all()
+        if self._search_cache is not None:
+            amenities = self._search_cache.normalize_amenities(required_amenities)
+            key = ("search", min_price, max_price, amenities, min_rating, sort_by_rating)
+            return self._cached(
+                key, lambda: self._search(min_price, max_price, list(amenities), min_rating, sort_by_rating)
+            )
+        return self._search(min_price, max_price, required_amenities, min_rating, sort_by_rating)
+
+    def _search(
+        self,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        required_amenities: Optional[List[str]],
+        min_rating: Optional[float],
+        sort_by_rating: bool,
+    ) -> List[Caravan]:
+        if self._columns is not None:
+            return self._search_columnar(min_price, max_price, required_amenities, min_rating, sort_by_rating)
+
+        if required_amenities:
+            # Start from the caravans offering every amenity, in insertion order.
+            filtered_caravans = [
+                self._data[caravan_id]
+                for caravan_id in sorted(self._amenity_index.candidates(required_amenities))
+            ]
+        else:
+            filtered_caravans = self.get_all()
 
         if min_price is not None:
             filtered_caravans = [
@@ -52,11 +395,6 @@ class CaravanRepository(BaseRepository[Caravan]):
             filtered_caravans = [
                 caravan for caravan in filtered_caravans if caravan.price_per_day <= max_price
             ]
-        if required_amenities is not None:
-            filtered_caravans = [
-                caravan for caravan in filtered_caravans 
-                if all(amenity in caravan.amenities for amenity in required_amenities)
-            ]
         if min_rating is not None:
             filtered_caravans = [
                 caravan for caravan in filtered_caravans if caravan.average_rating >= min_rating
@@ -67,8 +405,31 @@ class CaravanRepository(BaseRepository[Caravan]):
             
         return filtered_caravans
 
+    def _search_columnar(
+        self,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        required_amenities: Optional[List[str]],
+        min_rating: Optional[float],
+        sort_by_rating: bool,
+    ) -> List[Caravan]:
+        candidate_ids = self._amenity_index.candidates(required_amenities) if required_amenities else None
+        return self._columns.select(
+            min_price=min_price,
+            max_price=max_price,
+            min_rating=min_rating,
+            sort_by_rating=sort_by_rating,
+            candidate_ids=candidate_ids,
+        )
+
     def get_popular_caravans(self, limit: int = 5) -> List[Caravan]:
         """
         Get a list of popular caravans, sorted by average rating.
         """
-        return self.search(sort_by_rating=True)[:limit]
+        return [self._data[caravan_id] for caravan_id in self._rating_ranking.top(limit)]
+
+    def get_popular_host_ids(self, limit: int = 5) -> List[int]:
+        """
+        Get the ids of popular hosts, sorted by the average rating of their caravans.
+        """
+        return self._host_ranking.top(limit)
@@ -0,0 +1,113 @@
+from typing import Collection, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only the columnar search needs it.
+    np = None
+
+from src.models.caravan import Caravan
+
+class CaravanColumnStore:
+    """
+    Struct-of-arrays copy of the numeric caravan fields, kept next to the
+    dataclass store so that search filters run as NumPy boolean masks.
+    Rows follow insertion order, matching the order of get_all().
+    """
+    _COLUMNS = ("_caravans", "_ids", "_alive", "_price_per_day", "_average_rating", "_capacity", "_latitude", "_longitude")
+
+    def __init__(self, initial_capacity: int = 1024):
+        if np is None:
+            raise ImportError("The columnar caravan store requires numpy.")
+        capacity = max(1, initial_capacity)
+        # Object column, so results are gathered without per-id dict lookups.
+        self._caravans = np.empty(capacity, dtype=object)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._price_per_day = np.zeros(capacity, dtype=np.float64)
+        self._average_rating = np.zeros(capacity, dtype=np.float64)
+        self._capacity = np.zeros(capacity, dtype=np.int64)
+        self._latitude = np.zeros(capacity, dtype=np.float64)
+        self._longitude = np.zeros(capacity, dtype=np.float64)
+        # {caravan_id: row}
+        self._rows: Dict[int, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _grow(self) -> None:
+        new_capacity = len(self._ids) * 2
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def _compact(self) -> None:
+        """
+        Drops the rows of deleted caravans once they make up half of the store.
+        """
+        live_rows = np.flatnonzero(self._alive[:self._size])
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            column[:len(live_rows)] = column[live_rows]
+            column[len(live_rows):self._size] = 0
+        self._size = len(live_rows)
+        self._rows = {int(caravan_id): row for row, caravan_id in enumerate(self._ids[:self._size])}
+
+    def upsert(self, caravan: Caravan) -> None:
+        row = self._rows.get(caravan.id)
+        if row is None:
+            if self._size == len(self._ids):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._rows[caravan.id] = row
+            self._ids[row] = caravan.id
+            self._alive[row] = True
+        self._caravans[row] = caravan
+        self._price_per_day[row] = caravan.price_per_day
+        self._average_rating[row] = caravan.average_rating
+        self._capacity[row] = caravan.capacity
+        self._latitude[row] = caravan.latitude
+        self._longitude[row] = caravan.longitude
+
+    def remove(self, caravan_id: int) -> None:
+        row = self._rows.pop(caravan_id, None)
+        if row is None:
+            return
+        self._alive[row] = False
+        self._caravans[row] = None
+        if len(self._rows) * 2 < self._size:
+            self._compact()
+
+    def select(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        sort_by_rating: bool = False,
+        candidate_ids: Optional[Collection[int]] = None,
+    ) -> List[Caravan]:
+        """
+        Returns the caravans passing every given filter, restricted to
+        `candidate_ids` when given. Sorting by rating is stable, so ties
+        keep insertion order.
+        """
+        size = self._size
+        if candidate_ids is None:
+            mask = self._alive[:size].copy()
+        else:
+            mask = np.zeros(size, dtype=bool)
+            mask[[self._rows[caravan_id] for caravan_id in candidate_ids if caravan_id in self._rows]] = True
+        if min_price is not None:
+            mask &= self._price_per_day[:size] >= min_price
+        if max_price is not None:
+            mask &= self._price_per_day[:size] <= max_price
+        if min_rating is not None:
+            mask &= self._average_rating[:size] >= min_rating
+
+        rows = np.flatnonzero(mask)
+        if sort_by_rating:
+            rows = rows[np.argsort(-self._average_rating[rows], kind="stable")]
+        return self._caravans[rows].tolist()
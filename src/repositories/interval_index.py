@@ -0,0 +1,106 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class IntervalIndex:
+    """
+    Keeps inclusive date intervals sorted by start date so that an overlap
+    query bisects straight to the intervals that can reach the query range.
+    """
+    def __init__(self):
+        # Sorted [(start_ordinal, item_id)]
+        self._starts: List[Tuple[int, int]] = []
+        # {item_id: (start_ordinal, end_ordinal)}
+        self._intervals: Dict[int, Tuple[int, int]] = {}
+        # {span: number of intervals of that length} and the distinct spans, sorted.
+        # The longest current span bounds how far before the query an
+        # overlapping interval can start, and shrinks again as long ones go.
+        self._span_counts: Dict[int, int] = {}
+        self._spans: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._intervals
+
+    def insert(self, item_id: int, start_date: date, end_date: date) -> None:
+        self.remove(item_id)
+        start, end = start_date.toordinal(), end_date.toordinal()
+        insort(self._starts, (start, item_id))
+        self._intervals[item_id] = (start, end)
+        self._count_span(end - start)
+
+    def insert_many(self, intervals: Iterable[Tuple[int, date, date]]) -> None:
+        """
+        Inserts (item_id, start_date, end_date) triples with a single re-sort.
+        """
+        intervals = list(intervals)
+        for item_id, _, _ in intervals:
+            self.remove(item_id)
+        for item_id, start_date, end_date in intervals:
+            start, end = start_date.toordinal(), end_date.toordinal()
+            self._starts.append((start, item_id))
+            self._intervals[item_id] = (start, end)
+            self._count_span(end - start)
+        self._starts.sort()
+
+    def remove(self, item_id: int) -> None:
+        interval = self._intervals.pop(item_id, None)
+        if interval is None:
+            return
+        position = bisect_left(self._starts, (interval[0], item_id))
+        del self._starts[position]
+        self._uncount_span(interval[1] - interval[0])
+
+    def _count_span(self, span: int) -> None:
+        count = self._span_counts.get(span, 0)
+        if not count:
+            insort(self._spans, span)
+        self._span_counts[span] = count + 1
+
+    def _uncount_span(self, span: int) -> None:
+        count = self._span_counts.pop(span)
+        if count > 1:
+            self._span_counts[span] = count - 1
+        else:
+            del self._spans[bisect_left(self._spans, span)]
+
+    @property
+    def max_span(self) -> int:
+        """
+        The longest interval currently indexed, in days past its start; 0 when empty.
+        """
+        return self._spans[-1] if self._spans else 0
+
+    def interval(self, item_id: int) -> Optional[Tuple[int, int]]:
+        """
+        Returns the item's interval as inclusive (start_ordinal, end_ordinal), or None.
+        """
+        return self._intervals.get(item_id)
+
+    def spans(self) -> List[Tuple[int, int]]:
+        """
+        Returns every interval as inclusive (start_ordinal, end_ordinal).
+        """
+        return list(self._intervals.values())
+
+    def overlapping(self, start_date: date, end_date: date) -> List[int]:
+        """
+        Returns the ids of intervals overlapping [start_date, end_date], ordered by start date.
+        """
+        return self._overlapping(start_date.toordinal(), end_date.toordinal())
+
+    def overlapping_spans(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Returns the intervals overlapping the inclusive day ordinals [start, end].
+        """
+        return [self._intervals[item_id] for item_id in self._overlapping(start, end)]
+
+    def _overlapping(self, start: int, end: int) -> List[int]:
+        low = bisect_left(self._starts, (start - self.max_span,))
+        high = bisect_right(self._starts, (end, float("inf")))
+        return [
+            item_id for _, item_id in self._starts[low:high]
+            if self._intervals[item_id][1] >= start
+        ]
@@ -0,0 +1,185 @@
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only the occupancy calendar needs it.
+    np = None
+
+class OccupancyCalendar:
+    """
+    One bit per day per caravan over a fixed horizon starting at `origin`,
+    packed eight days to a byte in a (caravans x days/8) matrix. A date-range
+    question for the whole fleet is a single AND over the matrix columns that
+    cover the range.
+
+    The owner rewrites only the days a booking change touches with
+    set_days(), from every booking still overlapping them, so overlapping
+    reservations never leave stale bits behind when one of them goes away.
+    set_occupied() replaces a whole row.
+    """
+    def __init__(self, origin: date, horizon_days: int = 365, initial_capacity: int = 1024):
+        if np is None:
+            raise ImportError("The occupancy calendar requires numpy.")
+        if horizon_days < 1:
+            raise ValueError("The horizon must span at least one day.")
+        self._origin = origin.toordinal()
+        self._horizon_days = horizon_days
+        self._bits = np.zeros((max(1, initial_capacity), (horizon_days + 7) // 8), dtype=np.uint8)
+        # {caravan_id: row}
+        self._rows: Dict[int, int] = {}
+        self._free_rows: List[int] = []
+
+    @property
+    def origin(self) -> date:
+        return date.fromordinal(self._origin)
+
+    @property
+    def last_day(self) -> date:
+        return date.fromordinal(self._origin + self._horizon_days - 1)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def reset(self, origin: date) -> None:
+        """
+        Rolls the horizon to start at `origin` and forgets every row; the owner re-fills them.
+        """
+        self._origin = origin.toordinal()
+        self._bits[:] = 0
+        self._rows.clear()
+        self._free_rows.clear()
+
+    def set_occupied(self, caravan_id: int, spans: Iterable[Tuple[int, int]]) -> None:
+        """
+        Replaces the caravan's row with the given inclusive (start, end) day
+        ordinals. Days outside the horizon are ignored.
+        """
+        days = np.zeros(self._bits.shape[1] * 8, dtype=bool)
+        for start, end in spans:
+            start, end = max(start - self._origin, 0), min(end - self._origin, self._horizon_days - 1)
+            if start <= end:
+                days[start:end + 1] = True
+        if not days.any():
+            self.remove(caravan_id)
+            return
+        row = self._rows.get(caravan_id)
+        if row is None:
+            row = self._allocate_row()
+            self._rows[caravan_id] = row
+        self._bits[row] = np.packbits(days, bitorder="little")
+
+    def set_days(self, caravan_id: int, start: int, end: int, spans: Iterable[Tuple[int, int]]) -> None:
+        """
+        Rewrites the caravan's days [start, end], inclusive day ordinals, from
+        the given inclusive (start, end) spans, which must include every span
+        overlapping them. Days outside the range or the horizon are untouched.
+        """
+        start, end = max(start - self._origin, 0), min(end - self._origin, self._horizon_days - 1)
+        if start > end:
+            return
+        first_byte, last_byte = start // 8, end // 8
+        offset = first_byte * 8
+        row = self._rows.get(caravan_id)
+        if row is None:
+            days = np.zeros((last_byte - first_byte + 1) * 8, dtype=bool)
+        else:
+            days = np.unpackbits(self._bits[row, first_byte:last_byte + 1], bitorder="little").astype(bool)
+        days[start - offset:end - offset + 1] = False
+        for span_start, span_end in spans:
+            span_start, span_end = max(span_start - self._origin, start), min(span_end - self._origin, end)
+            if span_start <= span_end:
+                days[span_start - offset:span_end - offset + 1] = True
+        packed = np.packbits(days, bitorder="little")
+        if row is None:
+            if not packed.any():
+                return
+            row = self._allocate_row()
+            self._rows[caravan_id] = row
+        self._bits[row, first_byte:last_byte + 1] = packed
+        if not packed.any() and not self._bits[row].any():
+            self.remove(caravan_id)
+
+    def _allocate_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        row = len(self._rows)
+        if row == len(self._bits):
+            grown = np.zeros((len(self._bits) * 2, self._bits.shape[1]), dtype=np.uint8)
+            grown[:row] = self._bits
+            self._bits = grown
+        return row
+
+    def remove(self, caravan_id: int) -> None:
+        row = self._rows.pop(caravan_id, None)
+        if row is not None:
+            self._bits[row] = 0
+            self._free_rows.append(row)
+
+    def _day_range(self, start_date: date, end_date: date) -> Tuple[int, int]:
+        start, end = start_date.toordinal() - self._origin, end_date.toordinal() - self._origin
+        if start > end:
+            raise ValueError("The start date must not be after the end date.")
+        if start < 0 or end >= self._horizon_days:
+            raise ValueError(f"Dates must fall within the calendar horizon {self.origin} to {self.last_day}.")
+        return start, end
+
+    def _range_mask(self, start: int, end: int):
+        """
+        Returns the packed bits of days [start, end] and the byte columns they cover.
+        """
+        first_byte, last_byte = start // 8, end // 8
+        days = np.zeros((last_byte - first_byte + 1) * 8, dtype=bool)
+        days[start - first_byte * 8:end - first_byte * 8 + 1] = True
+        return np.packbits(days, bitorder="little"), slice(first_byte, last_byte + 1)
+
+    def is_free(self, caravan_id: int, start_date: date, end_date: date) -> bool:
+        return bool(self.free_caravans([caravan_id], start_date, end_date))
+
+    def free_caravans(self, caravan_ids: Iterable[int], start_date: date, end_date: date) -> List[int]:
+        """
+        Returns, in the given order, the caravans free on every day of [start_date, end_date].
+        Caravans without any booking in the horizon are free.
+        """
+        caravan_ids = list(caravan_ids)
+        mask, columns = self._range_mask(*self._day_range(start_date, end_date))
+        rows = np.array([self._rows.get(caravan_id, -1) for caravan_id in caravan_ids], dtype=np.int64)
+        known = rows >= 0
+        busy = np.zeros(len(caravan_ids), dtype=bool)
+        busy[known] = (self._bits[rows[known], columns] & mask).any(axis=1)
+        return [caravan_id for caravan_id, taken in zip(caravan_ids, busy.tolist()) if not taken]
+
+    def free_windows(self, caravan_id: int, length_days: int, count: int, start_date: date) -> List[Tuple[date, date]]:
+        """
+        Returns up to `count` non-overlapping free windows of `length_days`
+        days, as inclusive (first_day, last_day), the earliest first, starting
+        no earlier than `start_date` and ending within the horizon.
+        """
+        if length_days < 1 or count < 1:
+            return []
+        start, _ = self._day_range(start_date, start_date)
+        row = self._rows.get(caravan_id)
+        if row is None:
+            busy = np.zeros(self._horizon_days, dtype=bool)
+        else:
+            busy = np.unpackbits(self._bits[row], bitorder="little")[:self._horizon_days].astype(bool)
+        busy = busy[start:]
+        if len(busy) < length_days:
+            return []
+        # busy_before[i] = busy days before i; a window at i is free if no busy day falls in [i, i + length).
+        busy_before = np.concatenate(([0], np.cumsum(busy)))
+        window_starts = np.flatnonzero(busy_before[length_days:] == busy_before[:-length_days])
+
+        windows = []
+        position = 0
+        while len(windows) < count:
+            index = np.searchsorted(window_starts, position)
+            if index == len(window_starts):
+                break
+            first = int(window_starts[index])
+            windows.append((
+                date.fromordinal(self._origin + start + first),
+                date.fromordinal(self._origin + start + first + length_days - 1),
+            ))
+            position = first + length_days
+        return windows
@@ -1,5 +1,54 @@
+from typing import Dict, List, Optional, Tuple
 from src.models.payment import Payment
 from src.repositories.base_repository import BaseRepository
 
 class PaymentRepository(BaseRepository[Payment]):
-    pass
+    _versioned = True
+
+    def __init__(self):
+        super().__init__()
+        # {payment_id: (reservation_id, status, settled)} as of the last add/update
+        self._index_keys: Dict[int, Tuple[int, str, bool]] = {}
+        # {reservation_id: {payment_id: payment}}
+        self._by_reservation: Dict[int, Dict[int, Payment]] = {}
+        # {(status, settled): {payment_id: payment}}
+        self._by_state: Dict[Tuple[str, bool], Dict[int, Payment]] = {}
+
+    def _index(self, payment: Payment) -> None:
+        self._unindex(payment.id)
+        state = (payment.status, bool(payment.settled))
+        self._index_keys[payment.id] = (payment.reservation_id, payment.status, bool(payment.settled))
+        self._by_reservation.setdefault(payment.reservation_id, {})[payment.id] = payment
+        self._by_state.setdefault(state, {})[payment.id] = payment
+
+    def _unindex(self, payment_id: int) -> None:
+        keys = self._index_keys.pop(payment_id, None)
+        if keys is None:
+            return
+        reservation_id, status, settled = keys
+        for index, key in ((self._by_reservation, reservation_id), (self._by_state, (status, settled))):
+            bucket = index[key]
+            del bucket[payment_id]
+            if not bucket:
+                del index[key]
+
+    def find_by_reservation_id(self, reservation_id: int, status: Optional[str] = None) -> List[Payment]:
+        """
+        Find the payments made for a reservation, optionally only those in the given status.
+        """
+        payments = self._by_reservation.get(reservation_id, {}).values()
+        if status is None:
+            return list(payments)
+        return [payment for payment in payments if payment.status == status]
+
+    def find_by_status(self, status: str, settled: Optional[bool] = None) -> List[Payment]:
+        """
+        Find the payments in the given status, optionally filtered by settlement state.
+        """
+        if settled is not None:
+            return list(self._by_state.get((status, settled), {}).values())
+        return [
+            payment
+            for settled_state in (False, True)
+            for payment in self._by_state.get((status, settled_state), {}).values()
+        ]
@@ -0,0 +1,206 @@
+import os
+import pickle
+import struct
+import threading
+import zlib
+from typing import Any, Iterator, Optional, Tuple
+
+# Record frame: payload length and CRC32, followed by the pickled (lsn, operation, payload).
+_FRAME = struct.Struct("<II")
+
+class ChangeLog:
+    """
+    Append-only log of repository writes.
+
+    Appends are buffered and written with a single fsync per group (group
+    commit): when `group_size` records are pending, when `group_interval`
+    seconds have passed, or on flush(). Every record carries a log sequence
+    number (lsn) and a checksum, so replay can skip what a snapshot already
+    holds and stop at a torn tail left by a crash.
+    """
+    def __init__(self, path: str, group_size: int = 256, group_interval: float = 0.05):
+        self._path = path
+        self._group_size = max(1, group_size)
+        self._group_interval = group_interval
+        self._lock = threading.Lock()
+        self._pending = bytearray()
+        self._pending_count = 0
+        self._last_lsn = 0
+        valid_end = 0
+        for valid_end, lsn, _, _ in self._read_records():
+            self._last_lsn = lsn
+        self._durable_lsn = self._last_lsn
+        self._file = open(path, "ab")
+        if self._file.tell() > valid_end:
+            # Cut a torn tail off, or new records would land behind it and never be replayed.
+            self._file.truncate(valid_end)
+
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if group_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="change-log-flusher", daemon=True)
+            self._flusher.start()
+
+    @property
+    def last_lsn(self) -> int:
+        return self._last_lsn
+
+    @property
+    def durable_lsn(self) -> int:
+        return self._durable_lsn
+
+    def advance_to(self, lsn: int) -> None:
+        """
+        Makes the next record's lsn follow `lsn`, e.g. after the log was truncated behind a snapshot.
+        """
+        with self._lock:
+            self._last_lsn = max(self._last_lsn, lsn)
+            self._durable_lsn = max(self._durable_lsn, lsn)
+
+    def append(self, operation: str, payload: Any) -> int:
+        """
+        Buffers one record and returns its lsn. The payload is pickled right
+        away, so later in-place changes to it are not captured.
+        """
+        with self._lock:
+            self._last_lsn += 1
+            data = pickle.dumps((self._last_lsn, operation, payload), protocol=pickle.HIGHEST_PROTOCOL)
+            self._pending += _FRAME.pack(len(data), zlib.crc32(data))
+            self._pending += data
+            self._pending_count += 1
+            lsn = self._last_lsn
+            if self._pending_count >= self._group_size:
+                self._write_pending()
+        return lsn
+
+    def flush(self) -> int:
+        """
+        Writes and fsyncs every buffered record. Returns the last durable lsn.
+        """
+        with self._lock:
+            self._write_pending()
+            return self._durable_lsn
+
+    def _write_pending(self) -> None:
+        if not self._pending:
+            return
+        self._file.write(self._pending)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = bytearray()
+        self._pending_count = 0
+        self._durable_lsn = self._last_lsn
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self._group_interval):
+            self.flush()
+
+    def replay(self, after_lsn: int = 0) -> Iterator[Tuple[int, str, Any]]:
+        """
+        Yields (lsn, operation, payload) for the durable records newer than `after_lsn`.
+        """
+        for _, lsn, operation, payload in self._read_records():
+            if lsn > after_lsn:
+                yield lsn, operation, payload
+
+    def _read_records(self) -> Iterator[Tuple[int, int, str, Any]]:
+        """
+        Yields (end_offset, lsn, operation, payload) for every intact record on disk.
+        """
+        if not os.path.exists(self._path):
+            return
+        with open(self._path, "rb") as log_file:
+            while True:
+                header = log_file.read(_FRAME.size)
+                if len(header) < _FRAME.size:
+                    return
+                length, checksum = _FRAME.unpack(header)
+                data = log_file.read(length)
+                if len(data) < length or zlib.crc32(data) != checksum:
+                    # Torn write at the tail: everything before it is intact.
+                    return
+                lsn, operation, payload = pickle.loads(data)
+                yield log_file.tell(), lsn, operation, payload
+
+    def truncate(self) -> None:
+        """
+        Drops every record, once a snapshot covering them is safely on disk.
+        """
+        with self._lock:
+            self._write_pending()
+            self._file.close()
+            self._file = open(self._path, "wb")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self._write_pending()
+            self._file.close()
+
+class RepositoryPersistence:
+    """
+    Makes an in-memory repository survive restarts with a change log plus
+    periodic compact snapshots. Recovery loads the latest snapshot and
+    replays only the log records written after it.
+
+        persistence = RepositoryPersistence(CaravanRepository(), "data/caravans")
+        persistence.recover()
+        ...
+        persistence.snapshot()
+    """
+    def __init__(self, repository, directory: str, group_size: int = 256, group_interval: float = 0.05):
+        os.makedirs(directory, exist_ok=True)
+        self._repository = repository
+        self._snapshot_path = os.path.join(directory, "snapshot.pickle")
+        self._change_log = ChangeLog(os.path.join(directory, "changes.log"), group_size, group_interval)
+
+    @property
+    def change_log(self) -> ChangeLog:
+        return self._change_log
+
+    def recover(self) -> int:
+        """
+        Loads the snapshot and replays the log tail into the (empty) repository,
+        then starts logging its writes. Returns the number of replayed records.
+        """
+        snapshot_lsn = 0
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, "rb") as snapshot_file:
+                snapshot_lsn, state = pickle.load(snapshot_file)
+            self._repository.restore_state(state)
+            self._change_log.advance_to(snapshot_lsn)
+
+        replayed = 0
+        for _, operation, payload in self._change_log.replay(after_lsn=snapshot_lsn):
+            self._repository.apply_change(operation, payload)
+            replayed += 1
+
+        self._repository.attach_change_log(self._change_log)
+        return replayed
+
+    def snapshot(self) -> int:
+        """
+        Writes a compact snapshot of the repository and truncates the log.
+        Holds the repository's write lock throughout, so no write can land
+        between the snapshot and the truncate and be lost from both; writes
+        wait meanwhile. Returns the lsn the snapshot covers.
+        """
+        with self._repository._lock:
+            lsn = self._change_log.flush()
+            temp_path = self._snapshot_path + ".tmp"
+            with open(temp_path, "wb") as snapshot_file:
+                pickle.dump((lsn, self._repository.snapshot_state()), snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            # Atomic swap: a crash leaves either the old or the new snapshot in place.
+            os.replace(temp_path, self._snapshot_path)
+            # Records up to lsn are covered; replay would skip them anyway if we crash before truncating.
+            self._change_log.truncate()
+        return lsn
+
+    def close(self) -> None:
+        self._change_log.close()
@@ -0,0 +1,57 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+class RankingIndex:
+    """
+    Keeps items sorted by descending score, ties broken by ascending id,
+    so the top K are read off the front of a list.
+    """
+    def __init__(self):
+        # Sorted [(-score, item_id)]
+        self._ranked: List[Tuple[float, int]] = []
+        # {item_id: score}
+        self._scores: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def insert(self, item_id: int, score: float) -> None:
+        if self._scores.get(item_id) == score:
+            return
+        self.remove(item_id)
+        self._scores[item_id] = score
+        insort(self._ranked, (-score, item_id))
+
+    def insert_many(self, scores: Iterable[Tuple[int, float]]) -> None:
+        """
+        Inserts (item_id, score) pairs with a single re-sort; later pairs win.
+        """
+        changed = {item_id: score for item_id, score in scores if self._scores.get(item_id) != score}
+        if not changed:
+            return
+        for item_id in changed:
+            self.remove(item_id)
+        for item_id, score in changed.items():
+            self._scores[item_id] = score
+            self._ranked.append((-score, item_id))
+        self._ranked.sort()
+
+    def remove(self, item_id: int) -> None:
+        score = self._scores.pop(item_id, None)
+        if score is None:
+            return
+        del self._ranked[bisect_left(self._ranked, (-score, item_id))]
+
+    def top(self, limit: int) -> List[int]:
+        return [item_id for _, item_id in self._ranked[:max(limit, 0)]]
+
+    def count_at_least(self, score: float) -> int:
+        return bisect_right(self._ranked, (-score, float("inf")))
+
+    def iter_ranked(self, min_score: Optional[float] = None) -> Iterator[int]:
+        """
+        Yields item ids from the highest score down, stopping below `min_score`.
+        """
+        end = len(self._ranked) if min_score is None else self.count_at_least(min_score)
+        for position in range(end):
+            yield self._ranked[position][1]
@@ -1,55 +1,428 @@
+import threading
 from datetime import date
-from typing import List, Dict, Optional
+from functools import wraps
+from typing import Any, ContextManager, Iterable, List, Dict, Optional, Tuple
 from src.models.reservation import Reservation
+from src.exceptions import ConcurrentUpdateError
+from .interval_index import IntervalIndex
+from .occupancy_calendar import OccupancyCalendar
+from .striped_lock import StripedLock
+
+# Reservations in these states no longer hold their dates.
+INACTIVE_STATUSES = frozenset({"cancelled", "rejected"})
+
+def _synchronized(method):
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return locked
 
 class ReservationRepository:
-    def __init__(self):
+    def __init__(self, occupancy_calendar: Optional[OccupancyCalendar] = None, lock_stripes: int = 64):
+        """
+        With an `occupancy_calendar`, every caravan's booked days are also kept
+        as a day bitmap, which answers find_free_caravans and find_free_windows.
+
+        Every method is thread-safe. A booking's check-then-insert spans two
+        calls, so callers make it atomic with lock_caravans().
+        """
         # {caravan_id: {reservation_id: reservation}}
         self._data: Dict[int, Dict[int, Reservation]] = {}
+        # {caravan_id: interval index of the caravan's active reservations}
+        self._availability: Dict[int, IntervalIndex] = {}
+        # {reservation_id: (caravan_id, user_id, status)} as of the last add/update
+        self._index_keys: Dict[int, Tuple[int, int, str]] = {}
+        # {user_id: {reservation_id: reservation}}
+        self._by_user: Dict[int, Dict[int, Reservation]] = {}
+        # {status: {reservation_id: reservation}}
+        self._by_status: Dict[str, Dict[int, Reservation]] = {}
         self._next_id = 1
+        # Optional ChangeLog that records every write, see RepositoryPersistence.
+        self._change_log = None
+        self._occupancy = occupancy_calendar
+        # Guards the structures above; held only for the duration of one call.
+        self._lock = threading.RLock()
+        self._caravan_locks = StripedLock(lock_stripes)
 
+    def lock_caravans(self, caravan_ids: Iterable[int]) -> ContextManager[None]:
+        """
+        Holds the given caravans' booking locks, so that checking their dates
+        and adding a reservation cannot interleave with another booking of the
+        same caravans. Bookings of other caravans mostly use other stripes and
+        proceed in parallel.
+        """
+        return self._caravan_locks.hold(caravan_ids)
+
+    @_synchronized
     def get_by_id(self, reservation_id: int) -> Optional[Reservation]:
-        for caravan_reservations in self._data.values():
-            if reservation_id in caravan_reservations:
-                return caravan_reservations[reservation_id]
-        return None
+        keys = self._index_keys.get(reservation_id)
+        if keys is None:
+            return None
+        return self._data[keys[0]][reservation_id]
 
+    @_synchronized
     def get_all(self) -> List[Reservation]:
         all_reservations = []
         for caravan_reservations in self._data.values():
             all_reservations.extend(caravan_reservations.values())
         return all_reservations
 
+    @_synchronized
+    def get_many(self, reservation_ids: Iterable[int]) -> List[Optional[Reservation]]:
+        """
+        Returns the reservations with the given ids, in the same order, with None for unknown ids.
+        """
+        return [self.get_by_id(reservation_id) for reservation_id in reservation_ids]
+
+    @_synchronized
     def add(self, reservation: Reservation) -> Reservation:
         reservation.id = self._next_id
-        
+        self._next_id += 1
+        self._store(reservation)
+        if self._change_log is not None:
+            self._change_log.append("add", reservation)
+        return reservation
+
+    def _store(self, reservation: Reservation) -> None:
         if reservation.caravan_id not in self._data:
             self._data[reservation.caravan_id] = {}
             
         self._data[reservation.caravan_id][reservation.id] = reservation
-        self._next_id += 1
-        return reservation
+        self._index_availability(reservation)
+        self._index_secondary(reservation)
+
+    @_synchronized
+    def add_many(self, reservations: Iterable[Reservation]) -> List[Reservation]:
+        """
+        Adds a batch of reservations, assigning their ids as one consecutive block.
+        Each caravan's interval index is rebuilt once for the batch.
+        """
+        reservations = list(reservations)
+        first_id = self._next_id
+        self._next_id += len(reservations)
+        for reservation_id, reservation in enumerate(reservations, first_id):
+            reservation.id = reservation_id
+        self._store_many(reservations)
+        if self._change_log is not None and reservations:
+            self._change_log.append("add_many", reservations)
+        return reservations
+
+    def _store_many(self, reservations: List[Reservation]) -> None:
+        active: Dict[int, List[Tuple[int, date, date]]] = {}
+        for reservation in reservations:
+            self._data.setdefault(reservation.caravan_id, {})[reservation.id] = reservation
+            self._index_secondary(reservation)
+            if reservation.status not in INACTIVE_STATUSES:
+                active.setdefault(reservation.caravan_id, []).append(
+                    (reservation.id, reservation.start_date, reservation.end_date)
+                )
+        # One sort per caravan instead of an insort per reservation.
+        for caravan_id, intervals in active.items():
+            index = self._availability.setdefault(caravan_id, IntervalIndex())
+            changed_days = self._spans_of(index, [reservation_id for reservation_id, _, _ in intervals])
+            index.insert_many(intervals)
+            changed_days += [(start.toordinal(), end.toordinal()) for _, start, end in intervals]
+            self._refresh_occupancy_days(caravan_id, changed_days)
 
+    @_synchronized
     def update(self, reservation: Reservation) -> None:
-        if reservation.caravan_id in self._data and reservation.id in self._data[reservation.caravan_id]:
-            self._data[reservation.caravan_id][reservation.id] = reservation
+        """
+        Stores `reservation` and bumps its version; unknown reservations are
+        ignored. Raises ConcurrentUpdateError, storing nothing, if the stored
+        reservation has a newer version, i.e. `reservation` is a stale copy.
+        """
+        if reservation.id not in self._index_keys:
+            return
+        self._check_versions([reservation])
+        reservation.version += 1
+        self._replace(reservation)
+        if self._change_log is not None:
+            self._change_log.append("update", reservation)
+
+    def _replace(self, reservation: Reservation) -> None:
+        keys = self._index_keys[reservation.id]
+        old_caravan_id = keys[0]
+        if old_caravan_id != reservation.caravan_id:
+            # The reservation moved to another caravan: release its old bucket and dates.
+            self._release(reservation.id, old_caravan_id)
+            self._data.setdefault(reservation.caravan_id, {})
+        self._data[reservation.caravan_id][reservation.id] = reservation
+        self._index_availability(reservation)
+        self._unindex_secondary(reservation.id)
+        self._index_secondary(reservation)
+
+    @_synchronized
+    def update_many(self, reservations: Iterable[Reservation]) -> None:
+        """
+        Updates a batch of reservations; unknown ones are ignored, as in update.
+        A stale reservation fails the whole batch.
+        """
+        reservations = [reservation for reservation in reservations if reservation.id in self._index_keys]
+        self._check_versions(reservations)
+        for reservation in reservations:
+            reservation.version += 1
+        self._replace_many(reservations)
+        if self._change_log is not None and reservations:
+            self._change_log.append("update_many", reservations)
+
+    def _check_versions(self, reservations: List[Reservation]) -> None:
+        for reservation in reservations:
+            current = self.get_by_id(reservation.id)
+            if current.version != reservation.version:
+                raise ConcurrentUpdateError(
+                    f"Reservation {reservation.id} is at version {current.version}, "
+                    f"not {reservation.version}: it was changed by another write."
+                )
+
+    def _replace_many(self, reservations: List[Reservation]) -> None:
+        active: Dict[int, List[Tuple[int, date, date]]] = {}
+        # {caravan_id: [(start_ordinal, end_ordinal)]} of the days whose occupancy may have changed
+        changed_days: Dict[int, List[Tuple[int, int]]] = {}
+        for reservation in reservations:
+            old_caravan_id = self._index_keys[reservation.id][0]
+            if old_caravan_id != reservation.caravan_id:
+                self._release(reservation.id, old_caravan_id)
+            self._data.setdefault(reservation.caravan_id, {})[reservation.id] = reservation
+            self._unindex_secondary(reservation.id)
+            self._index_secondary(reservation)
+            index = self._availability.get(reservation.caravan_id)
+            if index is not None:
+                changed_days.setdefault(reservation.caravan_id, []).extend(self._spans_of(index, [reservation.id]))
+            if reservation.status in INACTIVE_STATUSES:
+                if index is not None:
+                    index.remove(reservation.id)
+            else:
+                active.setdefault(reservation.caravan_id, []).append(
+                    (reservation.id, reservation.start_date, reservation.end_date)
+                )
+                changed_days.setdefault(reservation.caravan_id, []).append(
+                    (reservation.start_date.toordinal(), reservation.end_date.toordinal())
+                )
+        for caravan_id, intervals in active.items():
+            self._availability.setdefault(caravan_id, IntervalIndex()).insert_many(intervals)
+        for caravan_id, spans in changed_days.items():
+            self._refresh_occupancy_days(caravan_id, spans)
+
+    @_synchronized
+    def compare_and_set(self, reservation: Reservation, expected_version: int) -> bool:
+        """
+        Stores `reservation` only if the stored one is still at
+        `expected_version`, and bumps its version. Returns False, storing
+        nothing, if another write got there first. Pass a copy
+        (dataclasses.replace), not the stored object changed in place.
+        """
+        current = self.get_by_id(reservation.id)
+        if current is None or current.version != expected_version:
+            return False
+        reservation.version = expected_version + 1
+        self._replace(reservation)
+        if self._change_log is not None:
+            self._change_log.append("update", reservation)
+        return True
+
+    @_synchronized
+    def delete(self, reservation_id: int) -> None:
+        if reservation_id not in self._index_keys:
+            return
+        self._remove(reservation_id)
+        if self._change_log is not None:
+            self._change_log.append("delete", reservation_id)
+
+    @_synchronized
+    def delete_many(self, reservation_ids: Iterable[int]) -> None:
+        reservation_ids = [
+            reservation_id for reservation_id in dict.fromkeys(reservation_ids)
+            if reservation_id in self._index_keys
+        ]
+        for reservation_id in reservation_ids:
+            self._remove(reservation_id)
+        if self._change_log is not None and reservation_ids:
+            self._change_log.append("delete_many", reservation_ids)
+
+    def _remove(self, reservation_id: int) -> None:
+        self._release(reservation_id, self._index_keys[reservation_id][0])
+        self._unindex_secondary(reservation_id)
+
+    def _release(self, reservation_id: int, caravan_id: int) -> None:
+        """
+        Drops a reservation from a caravan's bucket and interval index.
+        """
+        del self._data[caravan_id][reservation_id]
+        index = self._availability.get(caravan_id)
+        if index is not None:
+            released = self._spans_of(index, [reservation_id])
+            index.remove(reservation_id)
+            self._refresh_occupancy_days(caravan_id, released)
 
+    def attach_change_log(self, change_log) -> None:
+        self._change_log = change_log
+
+    @_synchronized
+    def apply_change(self, operation: str, payload: Any) -> None:
+        """
+        Re-applies a logged write during recovery, keeping the logged ids and
+        without logging it again.
+        """
+        if operation == "add":
+            self._store(payload)
+            self._next_id = max(self._next_id, payload.id + 1)
+        elif operation == "add_many":
+            self._store_many(payload)
+            self._next_id = max([self._next_id] + [reservation.id + 1 for reservation in payload])
+        elif operation == "update" and payload.id in self._index_keys:
+            self._replace(payload)
+        elif operation == "update_many":
+            self._replace_many([reservation for reservation in payload if reservation.id in self._index_keys])
+        elif operation == "delete" and payload in self._index_keys:
+            self._remove(payload)
+        elif operation == "delete_many":
+            for reservation_id in payload:
+                if reservation_id in self._index_keys:
+                    self._remove(reservation_id)
+
+    @_synchronized
+    def snapshot_state(self) -> Dict[str, Any]:
+        return {"items": self.get_all(), "next_id": self._next_id}
+
+    @_synchronized
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """
+        Loads a snapshot into an empty repository and rebuilds its indexes.
+        """
+        self._store_many(state["items"])
+        self._next_id = state["next_id"]
+
+    def _index_secondary(self, reservation: Reservation) -> None:
+        self._index_keys[reservation.id] = (reservation.caravan_id, reservation.user_id, reservation.status)
+        self._by_user.setdefault(reservation.user_id, {})[reservation.id] = reservation
+        self._by_status.setdefault(reservation.status, {})[reservation.id] = reservation
+
+    def _unindex_secondary(self, reservation_id: int) -> None:
+        _, user_id, status = self._index_keys.pop(reservation_id)
+        for index, key in ((self._by_user, user_id), (self._by_status, status)):
+            bucket = index[key]
+            del bucket[reservation_id]
+            if not bucket:
+                del index[key]
+
+    def _index_availability(self, reservation: Reservation) -> None:
+        index = self._availability.get(reservation.caravan_id)
+        changed_days = self._spans_of(index, [reservation.id]) if index is not None else []
+        if reservation.status in INACTIVE_STATUSES:
+            if index is not None:
+                index.remove(reservation.id)
+        else:
+            if index is None:
+                index = self._availability[reservation.caravan_id] = IntervalIndex()
+            index.insert(reservation.id, reservation.start_date, reservation.end_date)
+            span = (reservation.start_date.toordinal(), reservation.end_date.toordinal())
+            # Same days still taken, e.g. a status change from pending to paid: nothing to redraw.
+            changed_days = [] if changed_days == [span] else changed_days + [span]
+        self._refresh_occupancy_days(reservation.caravan_id, changed_days)
+
+    @staticmethod
+    def _spans_of(index: IntervalIndex, reservation_ids: Iterable[int]) -> List[Tuple[int, int]]:
+        """
+        The day spans the given reservations currently hold in `index`.
+        """
+        return [span for span in map(index.interval, reservation_ids) if span is not None]
+
+    def _refresh_occupancy_days(self, caravan_id: int, spans: Iterable[Tuple[int, int]]) -> None:
+        """
+        Redraws the caravan's calendar over the given day spans, from the
+        active reservations still overlapping each, so a write costs the
+        length of its own days rather than the caravan's whole history.
+        """
+        if self._occupancy is None:
+            return
+        index = self._availability.get(caravan_id)
+        for start, end in spans:
+            self._occupancy.set_days(caravan_id, start, end, index.overlapping_spans(start, end) if index is not None else [])
+
+    def _refresh_occupancy(self, caravan_ids: Iterable[int]) -> None:
+        """
+        Rewrites the calendar rows of the given caravans from their interval indexes.
+        """
+        if self._occupancy is None:
+            return
+        for caravan_id in caravan_ids:
+            index = self._availability.get(caravan_id)
+            self._occupancy.set_occupied(caravan_id, index.spans() if index is not None else [])
+
+    @_synchronized
+    def advance_occupancy(self, origin: date) -> None:
+        """
+        Rolls the occupancy calendar's horizon forward to start at `origin`.
+        """
+        self._calendar_or_fail().reset(origin)
+        self._refresh_occupancy(list(self._availability))
+
+    def _calendar_or_fail(self) -> OccupancyCalendar:
+        if self._occupancy is None:
+            raise RuntimeError("This repository was created without an occupancy calendar.")
+        return self._occupancy
+
+    @_synchronized
+    def find_free_caravans(self, caravan_ids: Iterable[int], start_date: date, end_date: date) -> List[int]:
+        """
+        Returns, in the given order, the caravans with no active reservation on
+        any day of [start_date, end_date], checked for all of them at once.
+        """
+        return self._calendar_or_fail().free_caravans(caravan_ids, start_date, end_date)
+
+    @_synchronized
+    def filter_available(self, caravan_ids: Iterable[int], start_date: date, end_date: date) -> List[int]:
+        """
+        Returns, in the given order, the caravans with no active reservation
+        overlapping [start_date, end_date]. Uses the occupancy calendar when
+        the dates fall within its horizon, the interval indexes otherwise.
+        """
+        calendar = self._occupancy
+        if calendar is not None and calendar.origin <= start_date <= end_date <= calendar.last_day:
+            return calendar.free_caravans(caravan_ids, start_date, end_date)
+        return [
+            caravan_id for caravan_id in caravan_ids
+            if not self.find_by_caravan_and_dates(caravan_id, start_date, end_date)
+        ]
+
+    @_synchronized
+    def find_free_windows(
+        self, caravan_id: int, length_days: int, count: int, start_date: Optional[date] = None
+    ) -> List[Tuple[date, date]]:
+        """
+        Returns the caravan's next `count` non-overlapping free windows of
+        `length_days` days as inclusive (first_day, last_day), from `start_date`
+        (the calendar's first day by default).
+        """
+        calendar = self._calendar_or_fail()
+        return calendar.free_windows(caravan_id, length_days, count, start_date or calendar.origin)
+
+    @_synchronized
     def find_by_caravan_and_dates(self, caravan_id: int, start_date: date, end_date: date) -> List[Reservation]:
-        reservations = []
-        caravan_reservations = self._data.get(caravan_id, {})
-        for reservation in caravan_reservations.values():
-            # Check for overlapping dates
-            if (start_date <= reservation.end_date) and (end_date >= reservation.start_date):
-                reservations.append(reservation)
-        return reservations
+        """
+        Find the active reservations of a caravan overlapping the given dates.
+        Cancelled and rejected reservations do not block dates.
+        """
+        index = self._availability.get(caravan_id)
+        if index is None:
+            return []
+        caravan_reservations = self._data[caravan_id]
+        return [
+            caravan_reservations[reservation_id]
+            for reservation_id in index.overlapping(start_date, end_date)
+        ]
 
+    @_synchronized
     def find_by_user_id(self, user_id: int) -> List[Reservation]:
         """
         Find all reservations made by a specific user.
         """
-        user_reservations = []
-        for caravan_reservations in self._data.values():
-            for reservation in caravan_reservations.values():
-                if reservation.user_id == user_id:
-                    user_reservations.append(reservation)
-        return user_reservations
+        return list(self._by_user.get(user_id, {}).values())
+
+    @_synchronized
+    def find_by_status(self, status: str) -> List[Reservation]:
+        """
+        Find all reservations currently in the given status.
+        """
+        return list(self._by_status.get(status, {}).values())
@@ -1,10 +1,81 @@
-from typing import List
+from typing import Dict, List, Tuple
 from src.models.review import Review
 from .base_repository import BaseRepository
 
 class ReviewRepository(BaseRepository[Review]):
+    def __init__(self):
+        super().__init__()
+        # {review_id: (author_id, subject_id, rating)} as of the last add/update
+        self._index_keys: Dict[int, Tuple[int, int, int]] = {}
+        # {author_id: {review_id: review}}
+        self._by_author: Dict[int, Dict[int, Review]] = {}
+        # {subject_id: {review_id: review}}
+        self._by_subject: Dict[int, Dict[int, Review]] = {}
+        # {author_id: [review_count, rating_sum]}
+        self._author_totals: Dict[int, List[int]] = {}
+        # {subject_id: [review_count, rating_sum]}
+        self._subject_totals: Dict[int, List[int]] = {}
+
+    def _index(self, review: Review) -> None:
+        if review.id in self._index_keys:
+            self._unindex(review.id)
+        self._index_keys[review.id] = (review.author_id, review.subject_id, review.rating)
+        for index, totals, key in (
+            (self._by_author, self._author_totals, review.author_id),
+            (self._by_subject, self._subject_totals, review.subject_id),
+        ):
+            index.setdefault(key, {})[review.id] = review
+            running = totals.setdefault(key, [0, 0])
+            running[0] += 1
+            running[1] += review.rating
+
+    def _unindex(self, review_id: int) -> None:
+        keys = self._index_keys.pop(review_id, None)
+        if keys is None:
+            return
+        author_id, subject_id, rating = keys
+        for index, totals, key in (
+            (self._by_author, self._author_totals, author_id),
+            (self._by_subject, self._subject_totals, subject_id),
+        ):
+            bucket = index[key]
+            del bucket[review_id]
+            if not bucket:
+                del index[key]
+                del totals[key]
+            else:
+                totals[key][0] -= 1
+                totals[key][1] -= rating
+
     def find_by_author_id(self, author_id: int) -> List[Review]:
         """
         Find all reviews written by a specific user.
         """
-        return [review for review in self.get_all() if review.author_id == author_id]
+        return list(self._by_author.get(author_id, {}).values())
+
+    def find_by_subject_id(self, subject_id: int) -> List[Review]:
+        """
+        Find all reviews about a specific user or caravan.
+        """
+        return list(self._by_subject.get(subject_id, {}).values())
+
+    def get_author_rating_summary(self, author_id: int) -> Tuple[int, int]:
+        """
+        Returns (review_count, rating_sum) of the reviews written by a user.
+        """
+        count, rating_sum = self._author_totals.get(author_id, (0, 0))
+        return count, rating_sum
+
+    def get_subject_rating_summary(self, subject_id: int) -> Tuple[int, int]:
+        """
+        Returns (review_count, rating_sum) of the reviews about a user or caravan.
+        """
+        count, rating_sum = self._subject_totals.get(subject_id, (0, 0))
+        return count, rating_sum
+
+    def get_average_rating_for_subject(self, subject_id: int) -> float:
+        """
+        Returns the average rating of a user or caravan, or 0.0 if it has no reviews.
+        """
+        count, rating_sum = self.get_subject_rating_summary(subject_id)
+        return rating_sum / count if count else 0.0
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+class SearchCache:
+    """
+    A least-recently-used cache of search results, each stored with the
+    repository version it was computed at. A lookup at any other version is
+    a miss, so a write only has to bump the version to invalidate everything.
+
+    Keys are built from normalized parameters: coordinates and radii rounded
+    to `coordinate_precision` decimals and amenities sorted, so equivalent
+    queries share an entry.
+    """
+    def __init__(self, capacity: int = 1024, coordinate_precision: int = 4):
+        if capacity < 1:
+            raise ValueError("The cache must hold at least one entry.")
+        self._capacity = capacity
+        self._precision = coordinate_precision
+        self._lock = threading.Lock()
+        # {key: (version, result)}, least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[int, List[Any]]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def round_location(self, latitude: float, longitude: float, radius: float) -> Tuple[float, float, float]:
+        return round(latitude, self._precision), round(longitude, self._precision), round(radius, self._precision)
+
+    @staticmethod
+    def normalize_amenities(amenities: Optional[Iterable[str]]) -> Tuple[str, ...]:
+        return tuple(sorted(set(amenities))) if amenities else ()
+
+    def get(self, key: Hashable, version: int) -> Optional[List[Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry[0] != version:
+                del self._entries[key]
+                self._stats["stale"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: int, result: List[Any]) -> None:
+        with self._lock:
+            self._entries[key] = (version, result)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        hits, misses (stale included), stale: entries dropped because the
+        repository changed, evictions, size and hit_rate.
+        """
+        with self._lock:
+            stats: Dict[str, float] = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
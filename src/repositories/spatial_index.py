@@ -0,0 +1,127 @@
+from math import asin, cos, degrees, floor, radians, sin, pi
+from typing import Dict, Iterator, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371
+
+Cell = Tuple[int, int]
+
+def bounding_box(
+    latitude: float, longitude: float, radius: float
+) -> Tuple[float, float, Optional[Tuple[float, float]]]:
+    """
+    Returns (min_lat, max_lat, lon_range) enclosing a circle of `radius` km.
+    lon_range is None when the circle spans every longitude (pole or huge radius);
+    otherwise its bounds may fall outside [-180, 180] when it crosses the antimeridian.
+    """
+    angular = radius / EARTH_RADIUS_KM
+    if angular >= pi:
+        return -90.0, 90.0, None
+
+    delta_lat = degrees(angular)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None
+
+    ratio = sin(angular) / cos(radians(latitude))
+    if ratio >= 1:
+        return min_lat, max_lat, None
+    delta_lon = degrees(asin(ratio))
+    return min_lat, max_lat, (longitude - delta_lon, longitude + delta_lon)
+
+class GeoGridIndex:
+    """
+    Buckets points into fixed-size latitude/longitude cells so that a radius
+    query only visits the cells overlapping the query's bounding box.
+    """
+    def __init__(self, cell_size_deg: float = 0.1):
+        if cell_size_deg <= 0:
+            raise ValueError("Cell size must be positive.")
+        # Snap the size so a whole number of cells wraps around the antimeridian.
+        self._lon_cells = max(1, round(360 / cell_size_deg))
+        self._cell_size = 360 / self._lon_cells
+        # {cell: {item_id: (latitude, longitude)}}
+        self._cells: Dict[Cell, Dict[int, Tuple[float, float]]] = {}
+        # {item_id: cell}
+        self._positions: Dict[int, Cell] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _cell_of(self, latitude: float, longitude: float) -> Cell:
+        return (
+            int(floor((latitude + 90) / self._cell_size)),
+            int(floor((longitude + 180) / self._cell_size)) % self._lon_cells,
+        )
+
+    def insert(self, item_id: int, latitude: float, longitude: float) -> None:
+        self.remove(item_id)
+        cell = self._cell_of(latitude, longitude)
+        self._cells.setdefault(cell, {})[item_id] = (latitude, longitude)
+        self._positions[item_id] = cell
+
+    def remove(self, item_id: int) -> None:
+        cell = self._positions.pop(item_id, None)
+        if cell is None:
+            return
+        bucket = self._cells[cell]
+        del bucket[item_id]
+        if not bucket:
+            del self._cells[cell]
+
+    def _covering_cells(self, latitude: float, longitude: float, radius: float) -> Tuple[List[Cell], float, float]:
+        """
+        Returns the populated-or-not cells overlapping the query circle's
+        bounding box, with the box's latitude bounds.
+        """
+        min_lat, max_lat, lon_range = bounding_box(latitude, longitude, radius)
+        min_row = int(floor((min_lat + 90) / self._cell_size))
+        max_row = int(floor((max_lat + 90) / self._cell_size))
+
+        if lon_range is None:
+            columns = None
+            num_columns = self._lon_cells
+        else:
+            first = int(floor((lon_range[0] + 180) / self._cell_size))
+            last = int(floor((lon_range[1] + 180) / self._cell_size))
+            num_columns = min(last - first + 1, self._lon_cells)
+            columns = {column % self._lon_cells for column in range(first, first + num_columns)}
+
+        num_cells = (max_row - min_row + 1) * num_columns
+        if num_cells > len(self._cells):
+            # Sparse index: scanning the populated cells is cheaper than the box.
+            cells = [
+                cell for cell in self._cells
+                if min_row <= cell[0] <= max_row and (columns is None or cell[1] in columns)
+            ]
+        else:
+            column_list: List[int] = list(columns) if columns is not None else list(range(self._lon_cells))
+            cells = [(row, column) for row in range(min_row, max_row + 1) for column in column_list]
+        return cells, min_lat, max_lat
+
+    def estimate(self, latitude: float, longitude: float, radius: float) -> int:
+        """
+        Returns how many points share a cell with the query's bounding box,
+        an upper bound on the points candidates() yields.
+        """
+        if radius < 0 or not self._cells:
+            return 0
+        cells, _, _ = self._covering_cells(latitude, longitude, radius)
+        return sum(len(self._cells.get(cell, ())) for cell in cells)
+
+    def candidates(self, latitude: float, longitude: float, radius: float) -> Iterator[Tuple[int, float, float]]:
+        """
+        Yields (item_id, latitude, longitude) for every point inside the
+        bounding box of the query circle. Callers still apply an exact
+        distance check, the box only prunes.
+        """
+        if radius < 0 or not self._cells:
+            return
+
+        cells, min_lat, max_lat = self._covering_cells(latitude, longitude, radius)
+        for cell in cells:
+            bucket = self._cells.get(cell)
+            if not bucket:
+                continue
+            for item_id, (item_lat, item_lon) in bucket.items():
+                if min_lat <= item_lat <= max_lat:
+                    yield item_id, item_lat, item_lon
@@ -0,0 +1,212 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    contact TEXT NOT NULL,
+    is_host INTEGER NOT NULL,
+    balance REAL NOT NULL,
+    is_trusted_reviewer INTEGER NOT NULL,
+    password_hash TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_users_name ON users (name) WHERE name <> '';
+CREATE UNIQUE INDEX IF NOT EXISTS ux_users_contact ON users (contact) WHERE contact <> '';
+
+CREATE TABLE IF NOT EXISTS caravans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    host_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    capacity INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    amenities TEXT NOT NULL,
+    photos TEXT NOT NULL,
+    price_per_day REAL NOT NULL,
+    average_rating REAL NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_caravans_location ON caravans (latitude, longitude);
+CREATE INDEX IF NOT EXISTS ix_caravans_price ON caravans (price_per_day);
+CREATE INDEX IF NOT EXISTS ix_caravans_rating ON caravans (average_rating DESC, id);
+CREATE INDEX IF NOT EXISTS ix_caravans_host ON caravans (host_id);
+
+CREATE TABLE IF NOT EXISTS caravan_amenities (
+    amenity TEXT NOT NULL,
+    caravan_id INTEGER NOT NULL,
+    PRIMARY KEY (amenity, caravan_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_caravan_amenities_caravan ON caravan_amenities (caravan_id);
+
+CREATE TABLE IF NOT EXISTS reservations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    caravan_id INTEGER NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    price REAL NOT NULL,
+    status TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_reservations_caravan_dates ON reservations (caravan_id, start_date, end_date);
+CREATE INDEX IF NOT EXISTS ix_reservations_user ON reservations (user_id);
+CREATE INDEX IF NOT EXISTS ix_reservations_status ON reservations (status);
+
+CREATE TABLE IF NOT EXISTS payments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    reservation_id INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    payment_method TEXT NOT NULL,
+    platform_fee REAL NOT NULL,
+    settled INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_payments_reservation ON payments (reservation_id);
+CREATE INDEX IF NOT EXISTS ix_payments_state ON payments (status, settled);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    reservation_id INTEGER NOT NULL,
+    rating INTEGER NOT NULL,
+    comment TEXT NOT NULL,
+    author_id INTEGER NOT NULL,
+    subject_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_reviews_author ON reviews (author_id);
+CREATE INDEX IF NOT EXISTS ix_reviews_subject ON reviews (subject_id);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sender_id INTEGER NOT NULL,
+    recipient_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_messages_recipient ON messages (recipient_id);
+
+CREATE TABLE IF NOT EXISTS settlements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    host_id INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    payment_ids TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_settlements_host ON settlements (host_id);
+"""
+
+# Columns added after the first release, as (table, column, definition). Databases
+# created before them get the columns when they are opened.
+MIGRATIONS = (
+    ("users", "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("reservations", "version", "INTEGER NOT NULL DEFAULT 0"),
+    ("payments", "version", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+class SqliteDatabase:
+    """
+    A pool of SQLite connections shared by the SQLite repositories.
+
+    Statements are parameterized constants, so each pooled connection keeps
+    them prepared in its statement cache. Writes issued inside `transaction()`
+    share one connection and commit together.
+    """
+    def __init__(self, path: str = ":memory:", pool_size: int = 4, timeout: float = 30.0):
+        self._path = path
+        self._timeout = timeout
+        # Every connection to ":memory:" opens a separate database, so share a single one.
+        self._pool_size = 1 if path == ":memory:" else max(1, pool_size)
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._connections: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+
+        with self.connection() as connection:
+            connection.executescript(SCHEMA)
+            for table, column, definition in MIGRATIONS:
+                columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are opened explicitly by transaction().
+        connection = sqlite3.connect(
+            self._path,
+            timeout=self._timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        if self._path != ":memory:":
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if len(self._connections) < self._pool_size:
+                connection = self._connect()
+                self._connections.append(connection)
+                return connection
+        return self._pool.get(timeout=self._timeout)
+
+    def _release(self, connection: sqlite3.Connection) -> None:
+        self._pool.put(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Yields the connection of the current thread's open transaction, or a pooled one.
+        """
+        current = getattr(self._local, "connection", None)
+        if current is not None:
+            yield current
+            return
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Runs the enclosed statements in a single transaction. Nested calls
+        join the outermost transaction, so repository calls can be batched.
+        """
+        current = getattr(self._local, "connection", None)
+        if current is not None:
+            yield current
+            return
+        connection = self._acquire()
+        self._local.connection = connection
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            self._local.connection = None
+            self._release(connection)
+
+    def close(self) -> None:
+        with self._pool_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+            self._pool = queue.LifoQueue()
@@ -0,0 +1,762 @@
+import json
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Callable, ContextManager, Dict, Generic, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from src.exceptions import ConcurrentUpdateError, DuplicateUserError
+from src.models import Caravan, Message, Payment, Reservation, Review, Settlement, User
+from .caravan_repository import _FILTER_COST, CaravanRepository, SearchPlan
+from .reservation_repository import INACTIVE_STATUSES
+from .spatial_index import bounding_box
+from .sqlite_database import SqliteDatabase
+from .striped_lock import StripedLock
+
+T = TypeVar('T')
+
+class SqliteBaseRepository(Generic[T]):
+    """
+    The BaseRepository API backed by one SQLite table. Subclasses name the
+    table and its columns (without id) and map rows to and from the model.
+    """
+    _table = ""
+    _columns: Tuple[str, ...] = ()
+    # Whether the model has a version field, stored as the last column and bumped by every write.
+    _versioned = False
+
+    def __init__(self, db: SqliteDatabase):
+        self._db = db
+        columns = ", ".join(self._columns)
+        placeholders = ", ".join("?" for _ in self._columns)
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in self._columns)
+        self._select_sql = f"SELECT id, {columns} FROM {self._table}"
+        self._insert_sql = f"INSERT INTO {self._table} ({columns}) VALUES ({placeholders})"
+        self._upsert_sql = (
+            f"INSERT INTO {self._table} (id, {columns}) VALUES (?, {placeholders}) "
+            f"ON CONFLICT (id) DO UPDATE SET {assignments}"
+        )
+        if self._versioned:
+            # The bumped version only replaces the one it was bumped from; a stale write changes no row.
+            self._upsert_sql += f" WHERE {self._table}.version = excluded.version - 1"
+        self._delete_sql = f"DELETE FROM {self._table} WHERE id = ?"
+        self._insert_with_id_sql = f"INSERT INTO {self._table} (id, {columns}) VALUES (?, {placeholders})"
+        self._compare_and_set_sql = (
+            f"UPDATE {self._table} SET {', '.join(f'{column} = ?' for column in self._columns)} "
+            "WHERE id = ? AND version = ?"
+        )
+
+    def _to_row(self, item: T) -> tuple:
+        raise NotImplementedError
+
+    def _from_row(self, row: Sequence) -> T:
+        raise NotImplementedError
+
+    def _after_write(self, connection: sqlite3.Connection, item: T) -> None:
+        """
+        Hook for subclasses that keep side tables in sync, run in the write's transaction.
+        """
+        pass
+
+    def _after_write_many(self, connection: sqlite3.Connection, items: List[T]) -> None:
+        for item in items:
+            self._after_write(connection, item)
+
+    def _before_delete(self, connection: sqlite3.Connection, item_id: int) -> None:
+        pass
+
+    def _query(self, where: str = "", params: Iterable = ()) -> List[T]:
+        with self._db.connection() as connection:
+            rows = connection.execute(f"{self._select_sql} {where}", tuple(params)).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def get_by_id(self, item_id: int) -> Optional[T]:
+        items = self._query("WHERE id = ?", (item_id,))
+        return items[0] if items else None
+
+    def get_all(self) -> List[T]:
+        return self._query("ORDER BY id")
+
+    def add(self, item: T) -> T:
+        with self._db.transaction() as connection:
+            cursor = connection.execute(self._insert_sql, self._to_row(item))
+            item.id = cursor.lastrowid
+            self._after_write(connection, item)
+        return item
+
+    def update(self, item: T) -> None:
+        """
+        Writes `item`, bumping its version if the model is versioned. Raises
+        ConcurrentUpdateError, writing nothing, if the stored row has a newer
+        version than `item`.
+        """
+        if self._versioned:
+            item.version += 1
+        try:
+            with self._db.transaction() as connection:
+                cursor = connection.execute(self._upsert_sql, (item.id, *self._to_row(item)))
+                if self._versioned and cursor.rowcount != 1:
+                    raise ConcurrentUpdateError(
+                        f"{type(item).__name__} {item.id} was changed by another write since version {item.version - 1}."
+                    )
+                self._after_write(connection, item)
+        except Exception:
+            if self._versioned:
+                item.version -= 1
+            raise
+
+    def compare_and_set(self, item: T, expected_version: int) -> bool:
+        """
+        Writes `item` only if the stored row is still at `expected_version`,
+        and bumps its version. Returns False, writing nothing, otherwise.
+        """
+        if not self._versioned:
+            raise TypeError(f"{type(self).__name__} does not version its items.")
+        item.version = expected_version + 1
+        with self._db.transaction() as connection:
+            cursor = connection.execute(self._compare_and_set_sql, (*self._to_row(item), item.id, expected_version))
+            if cursor.rowcount == 1:
+                self._after_write(connection, item)
+        if cursor.rowcount != 1:
+            item.version = expected_version
+            return False
+        return True
+
+    def delete(self, item_id: int) -> None:
+        with self._db.transaction() as connection:
+            self._before_delete(connection, item_id)
+            connection.execute(self._delete_sql, (item_id,))
+
+    def get_many(self, item_ids: Iterable[int]) -> List[Optional[T]]:
+        """
+        Returns the items with the given ids, in the same order, with None for unknown ids.
+        """
+        item_ids = list(item_ids)
+        found = {}
+        # Stay well below SQLite's limit on bound parameters.
+        for offset in range(0, len(item_ids), 500):
+            chunk = item_ids[offset:offset + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            for item in self._query(f"WHERE id IN ({placeholders})", chunk):
+                found[item.id] = item
+        return [found.get(item_id) for item_id in item_ids]
+
+    def add_many(self, items: Iterable[T]) -> List[T]:
+        """
+        Adds a batch of items in one transaction. The write lock taken by the
+        transaction lets the ids be reserved as one block up front.
+        """
+        items = list(items)
+        if not items:
+            return items
+        with self._db.transaction() as connection:
+            row = connection.execute(
+                f"SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM {self._table} "
+                "UNION ALL SELECT seq FROM sqlite_sequence WHERE name = ?)",
+                (self._table,),
+            ).fetchone()
+            first_id = (row[0] or 0) + 1
+            for item_id, item in enumerate(items, first_id):
+                item.id = item_id
+            connection.executemany(self._insert_with_id_sql, [(item.id, *self._to_row(item)) for item in items])
+            self._after_write_many(connection, items)
+        return items
+
+    def update_many(self, items: Iterable[T]) -> None:
+        """
+        Writes a batch of items as update does. A stale item fails the whole batch.
+        """
+        items = list(items)
+        if self._versioned:
+            for item in items:
+                item.version += 1
+        try:
+            with self._db.transaction() as connection:
+                cursor = connection.executemany(self._upsert_sql, [(item.id, *self._to_row(item)) for item in items])
+                if self._versioned and cursor.rowcount != len(items):
+                    raise ConcurrentUpdateError(f"A {self._table} row of the batch was changed by another write.")
+                self._after_write_many(connection, items)
+        except Exception:
+            if self._versioned:
+                for item in items:
+                    item.version -= 1
+            raise
+
+    def delete_many(self, item_ids: Iterable[int]) -> None:
+        item_ids = list(item_ids)
+        with self._db.transaction() as connection:
+            for item_id in item_ids:
+                self._before_delete(connection, item_id)
+            connection.executemany(self._delete_sql, [(item_id,) for item_id in item_ids])
+
+class SqliteUserRepository(SqliteBaseRepository[User]):
+    _table = "users"
+    _columns = ("name", "contact", "is_host", "balance", "is_trusted_reviewer", "password_hash", "version")
+    _versioned = True
+
+    def _to_row(self, user: User) -> tuple:
+        return (
+            user.name, user.contact, int(user.is_host), user.balance, int(user.is_trusted_reviewer),
+            user.password_hash, user.version,
+        )
+
+    def _from_row(self, row: Sequence) -> User:
+        return User(
+            id=row[0], name=row[1], contact=row[2], is_host=bool(row[3]), balance=row[4],
+            is_trusted_reviewer=bool(row[5]), password_hash=row[6], version=row[7],
+        )
+
+    def add(self, user: User) -> User:
+        try:
+            return super().add(user)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateUserError(f"A user with the same name or contact already exists: {e}") from e
+
+    def update(self, user: User) -> None:
+        try:
+            super().update(user)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateUserError(f"A user with the same name or contact already exists: {e}") from e
+
+    def add_many(self, users: Iterable[User]) -> List[User]:
+        try:
+            return super().add_many(users)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateUserError(f"A user with the same name or contact already exists: {e}") from e
+
+    def update_many(self, users: Iterable[User]) -> None:
+        try:
+            super().update_many(users)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateUserError(f"A user with the same name or contact already exists: {e}") from e
+
+    def compare_and_set(self, user: User, expected_version: int) -> bool:
+        try:
+            return super().compare_and_set(user, expected_version)
+        except sqlite3.IntegrityError as e:
+            user.version = expected_version
+            raise DuplicateUserError(f"A user with the same name or contact already exists: {e}") from e
+
+    def find_by_name(self, name: str) -> Optional[User]:
+        users = self._query("WHERE name = ? AND name <> ''", (name,))
+        return users[0] if users else None
+
+    def find_by_contact(self, contact: str) -> Optional[User]:
+        users = self._query("WHERE contact = ? AND contact <> ''", (contact,))
+        return users[0] if users else None
+
+class SqliteCaravanRepository(SqliteBaseRepository[Caravan]):
+    _table = "caravans"
+    _columns = (
+        "host_id", "name", "capacity", "location", "latitude", "longitude",
+        "amenities", "photos", "price_per_day", "average_rating", "status",
+    )
+
+    # Same great-circle formula and availability chunking as the in-memory repository.
+    _haversine = CaravanRepository._haversine
+    _filter_in_chunks = staticmethod(CaravanRepository._filter_in_chunks)
+    # The predicate each index answers, as SearchPlan names it.
+    _INDEX_DRIVERS = {
+        "ix_caravans_location": "nearby",
+        "ix_caravans_price": "price",
+        "ix_caravans_rating": "rating",
+        # The amenity subquery hands SQLite a list of ids to look up.
+        "INTEGER PRIMARY KEY": "amenities",
+    }
+
+    def _to_row(self, caravan: Caravan) -> tuple:
+        return (
+            caravan.host_id, caravan.name, caravan.capacity, caravan.location, caravan.latitude, caravan.longitude,
+            json.dumps(caravan.amenities), json.dumps(caravan.photos), caravan.price_per_day,
+            caravan.average_rating, caravan.status,
+        )
+
+    def _from_row(self, row: Sequence) -> Caravan:
+        return Caravan(
+            id=row[0], host_id=row[1], name=row[2], capacity=row[3], location=row[4], latitude=row[5],
+            longitude=row[6], amenities=json.loads(row[7]), photos=json.loads(row[8]), price_per_day=row[9],
+            average_rating=row[10], status=sys.intern(row[11]),
+        )
+
+    def _after_write(self, connection: sqlite3.Connection, caravan: Caravan) -> None:
+        connection.execute("DELETE FROM caravan_amenities WHERE caravan_id = ?", (caravan.id,))
+        connection.executemany(
+            "INSERT INTO caravan_amenities (amenity, caravan_id) VALUES (?, ?)",
+            [(amenity, caravan.id) for amenity in set(caravan.amenities)],
+        )
+
+    def _after_write_many(self, connection: sqlite3.Connection, caravans: List[Caravan]) -> None:
+        connection.executemany(
+            "DELETE FROM caravan_amenities WHERE caravan_id = ?", [(caravan.id,) for caravan in caravans]
+        )
+        connection.executemany(
+            "INSERT INTO caravan_amenities (amenity, caravan_id) VALUES (?, ?)",
+            [(amenity, caravan.id) for caravan in caravans for amenity in set(caravan.amenities)],
+        )
+
+    def _before_delete(self, connection: sqlite3.Connection, caravan_id: int) -> None:
+        connection.execute("DELETE FROM caravan_amenities WHERE caravan_id = ?", (caravan_id,))
+
+    def find_nearby(self, latitude: float, longitude: float, radius: float) -> List[Caravan]:
+        """
+        Find caravans within a given radius (in kilometers).
+        The bounding box is answered by the location index, then checked exactly.
+        """
+        if radius < 0:
+            return []
+        where, params = self._bounding_box_condition(latitude, longitude, radius)
+        candidates = self._query(f"WHERE {where} ORDER BY id", params)
+        return [
+            caravan for caravan in candidates
+            if self._haversine(latitude, longitude, caravan.latitude, caravan.longitude) <= radius
+        ]
+
+    @staticmethod
+    def _bounding_box_condition(latitude: float, longitude: float, radius: float) -> Tuple[str, List[float]]:
+        """
+        The share of a radius search the location index answers: the
+        circle's bounding box, split in two across the antimeridian.
+        """
+        min_lat, max_lat, lon_range = bounding_box(latitude, longitude, radius)
+        where = "latitude BETWEEN ? AND ?"
+        params: List[float] = [min_lat, max_lat]
+        if lon_range is not None:
+            min_lon, max_lon = lon_range
+            if min_lon < -180:
+                where += " AND (longitude >= ? OR longitude <= ?)"
+                params += [min_lon + 360, max_lon]
+            elif max_lon > 180:
+                where += " AND (longitude >= ? OR longitude <= ?)"
+                params += [min_lon, max_lon - 360]
+            else:
+                where += " AND longitude BETWEEN ? AND ?"
+                params += [min_lon, max_lon]
+        return where, params
+
+    def _conditions(
+        self,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        radius: Optional[float],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        required_amenities: Optional[List[str]],
+        min_rating: Optional[float],
+    ) -> Dict[str, Tuple[str, List]]:
+        """
+        The SQL condition and parameters of each given filter, by its
+        SearchPlan name. "nearby" is only the bounding box of the radius.
+        """
+        conditions: Dict[str, Tuple[str, List]] = {}
+        if radius is not None:
+            conditions["nearby"] = self._bounding_box_condition(latitude, longitude, radius)
+        if min_price is not None or max_price is not None:
+            bounds = [("price_per_day >= ?", min_price), ("price_per_day <= ?", max_price)]
+            conditions["price"] = (
+                " AND ".join(condition for condition, value in bounds if value is not None),
+                [value for _, value in bounds if value is not None],
+            )
+        if required_amenities:
+            amenities = sorted(set(required_amenities))
+            placeholders = ", ".join("?" for _ in amenities)
+            conditions["amenities"] = (
+                f"id IN (SELECT caravan_id FROM caravan_amenities WHERE amenity IN ({placeholders}) "
+                "GROUP BY caravan_id HAVING COUNT(*) = ?)",
+                [*amenities, len(amenities)],
+            )
+        if min_rating is not None:
+            conditions["rating"] = ("average_rating >= ?", [min_rating])
+        return conditions
+
+    @staticmethod
+    def _where(conditions: Iterable[Tuple[str, List]]) -> Tuple[str, List]:
+        conditions = list(conditions)
+        if not conditions:
+            return "", []
+        return (
+            "WHERE " + " AND ".join(f"({condition})" for condition, _ in conditions),
+            [param for _, params in conditions for param in params],
+        )
+
+    def search(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        required_amenities: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        sort_by_rating: bool = False,
+    ) -> List[Caravan]:
+        """
+        Search caravans based on various filters.
+        """
+        where, params = self._where(
+            self._conditions(None, None, None, min_price, max_price, required_amenities, min_rating).values()
+        )
+        order = "ORDER BY average_rating DESC, id" if sort_by_rating else "ORDER BY id"
+        return self._query(f"{where} {order}", params)
+
+    def plan_search(
+        self,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius: Optional[float] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        required_amenities: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+    ) -> SearchPlan:
+        """
+        The plan SQLite picks for find_matching's query, read from EXPLAIN
+        QUERY PLAN: the filter whose index produces the candidates ("scan"
+        if none does), how many rows that index yields, and the other
+        filters, cheapest first, which SQLite checks on each candidate.
+        """
+        conditions = self._conditions(latitude, longitude, radius, min_price, max_price, required_amenities, min_rating)
+        where, params = self._where(conditions.values())
+        with self._db.connection() as connection:
+            details = [
+                row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN SELECT id FROM caravans {where} ORDER BY id", params)
+            ]
+            driver = next(
+                (
+                    name for detail in details if detail.startswith("SEARCH caravans ")
+                    for index, name in self._INDEX_DRIVERS.items() if index in detail and name in conditions
+                ),
+                "scan",
+            )
+            driver_where, driver_params = self._where([conditions[driver]] if driver != "scan" else [])
+            estimated, = connection.execute(f"SELECT COUNT(*) FROM caravans {driver_where}", driver_params).fetchone()
+        filters = sorted((name for name in conditions if name != driver), key=_FILTER_COST.__getitem__)
+        return SearchPlan(driver, estimated, filters)
+
+    def find_matching(
+        self,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius: Optional[float] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        required_amenities: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        sort_by_rating: bool = False,
+        available: Optional[Callable[[List[int]], Iterable[int]]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Caravan]:
+        """
+        CaravanRepository.find_matching in one query: the filters and the
+        radius' bounding box make up the WHERE clause, and the rows it
+        returns are checked for the exact distance, then `available`.
+        Reading stops once offset + limit are found.
+        """
+        if radius is not None and radius < 0:
+            return []
+        conditions = self._conditions(latitude, longitude, radius, min_price, max_price, required_amenities, min_rating)
+        caravans = self._iter_rows(list(conditions.values()), sort_by_rating)
+        if radius is not None:
+            caravans = (
+                caravan for caravan in caravans
+                if self._haversine(latitude, longitude, caravan.latitude, caravan.longitude) <= radius
+            )
+        if available is not None:
+            caravans = self._filter_in_chunks(caravans, available)
+        stop = None if limit is None else offset + limit
+        return list(islice(caravans, offset, stop))
+
+    def _iter_rows(self, conditions: List[Tuple[str, List]], sort_by_rating: bool, page_size: int = 256) -> Iterator[Caravan]:
+        """
+        The matching caravans in id order, or by rating then id, read a page
+        at a time after the last row seen, so no connection is held while
+        the caller works through a page (an availability check needs one).
+        """
+        order = "ORDER BY average_rating DESC, id" if sort_by_rating else "ORDER BY id"
+        last: Optional[Caravan] = None
+        while True:
+            page_conditions = list(conditions)
+            if last is not None and sort_by_rating:
+                page_conditions.append((
+                    "average_rating < ? OR (average_rating = ? AND id > ?)",
+                    [last.average_rating, last.average_rating, last.id],
+                ))
+            elif last is not None:
+                page_conditions.append(("id > ?", [last.id]))
+            where, params = self._where(page_conditions)
+            page = self._query(f"{where} {order} LIMIT ?", [*params, page_size])
+            yield from page
+            if len(page) < page_size:
+                return
+            last = page[-1]
+
+    def get_popular_caravans(self, limit: int = 5) -> List[Caravan]:
+        """
+        Get a list of popular caravans, sorted by average rating.
+        """
+        return self._query("ORDER BY average_rating DESC, id LIMIT ?", (max(limit, 0),))
+
+    def get_popular_host_ids(self, limit: int = 5) -> List[int]:
+        """
+        Get the ids of popular hosts, sorted by the average rating of their caravans.
+        """
+        with self._db.connection() as connection:
+            rows = connection.execute(
+                "SELECT host_id FROM caravans GROUP BY host_id ORDER BY AVG(average_rating) DESC, host_id LIMIT ?",
+                (max(limit, 0),),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+class SqliteReservationRepository(SqliteBaseRepository[Reservation]):
+    _table = "reservations"
+    _columns = ("user_id", "caravan_id", "start_date", "end_date", "price", "status", "version")
+    _versioned = True
+
+    def __init__(self, db: SqliteDatabase, lock_stripes: int = 64):
+        super().__init__(db)
+        self._exists_sql = "SELECT 1 FROM reservations WHERE id = ?"
+        self._inactive = tuple(sorted(INACTIVE_STATUSES))
+        self._caravan_locks = StripedLock(lock_stripes)
+
+    def lock_caravans(self, caravan_ids: Iterable[int]) -> ContextManager[None]:
+        """
+        Serializes bookings of the given caravans within this process. Other
+        processes writing the same database are not covered.
+        """
+        return self._caravan_locks.hold(caravan_ids)
+
+    def _to_row(self, reservation: Reservation) -> tuple:
+        return (
+            reservation.user_id, reservation.caravan_id, reservation.start_date.isoformat(),
+            reservation.end_date.isoformat(), reservation.price, reservation.status, reservation.version,
+        )
+
+    def _from_row(self, row: Sequence) -> Reservation:
+        return Reservation(
+            id=row[0], user_id=row[1], caravan_id=row[2], start_date=date.fromisoformat(row[3]),
+            end_date=date.fromisoformat(row[4]), price=row[5], status=sys.intern(row[6]), version=row[7],
+        )
+
+    def update(self, reservation: Reservation) -> None:
+        self.update_many([reservation])
+
+    def update_many(self, reservations: Iterable[Reservation]) -> None:
+        """
+        Like the in-memory repository, unknown reservations are ignored and
+        keep their version, and a stale reservation fails the whole batch.
+        """
+        reservations = list(reservations)
+        written = []
+        try:
+            with self._db.transaction() as connection:
+                for reservation in reservations:
+                    reservation.version += 1
+                    cursor = connection.execute(
+                        self._compare_and_set_sql,
+                        (*self._to_row(reservation), reservation.id, reservation.version - 1),
+                    )
+                    if cursor.rowcount == 1:
+                        written.append(reservation)
+                        continue
+                    reservation.version -= 1
+                    if connection.execute(self._exists_sql, (reservation.id,)).fetchone() is not None:
+                        raise ConcurrentUpdateError(
+                            f"Reservation {reservation.id} was changed by another write since version {reservation.version}."
+                        )
+        except Exception:
+            for reservation in written:
+                reservation.version -= 1
+            raise
+
+    def find_by_caravan_and_dates(self, caravan_id: int, start_date: date, end_date: date) -> List[Reservation]:
+        """
+        Find the active reservations of a caravan overlapping the given dates.
+        Cancelled and rejected reservations do not block dates.
+        """
+        placeholders = ", ".join("?" for _ in self._inactive)
+        return self._query(
+            f"WHERE caravan_id = ? AND start_date <= ? AND end_date >= ? AND status NOT IN ({placeholders}) "
+            "ORDER BY start_date, id",
+            (caravan_id, end_date.isoformat(), start_date.isoformat(), *self._inactive),
+        )
+
+    def filter_available(self, caravan_ids: Iterable[int], start_date: date, end_date: date) -> List[int]:
+        """
+        Returns, in the given order, the caravans with no active reservation
+        overlapping [start_date, end_date], one query per 500 caravans.
+        """
+        caravan_ids = list(caravan_ids)
+        inactive = ", ".join("?" for _ in self._inactive)
+        busy = set()
+        with self._db.connection() as connection:
+            for offset in range(0, len(caravan_ids), 500):
+                chunk = caravan_ids[offset:offset + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = connection.execute(
+                    f"SELECT DISTINCT caravan_id FROM {self._table} WHERE caravan_id IN ({placeholders}) "
+                    f"AND start_date <= ? AND end_date >= ? AND status NOT IN ({inactive})",
+                    (*chunk, end_date.isoformat(), start_date.isoformat(), *self._inactive),
+                )
+                busy.update(caravan_id for caravan_id, in rows)
+        return [caravan_id for caravan_id in caravan_ids if caravan_id not in busy]
+
+    def find_free_caravans(self, caravan_ids: Iterable[int], start_date: date, end_date: date) -> List[int]:
+        """
+        Returns, in the given order, the caravans with no active reservation on
+        any day of [start_date, end_date]. The reservation index answers this
+        for any dates, so no occupancy calendar is needed.
+        """
+        return self.filter_available(caravan_ids, start_date, end_date)
+
+    def find_free_windows(
+        self, caravan_id: int, length_days: int, count: int, start_date: Optional[date] = None
+    ) -> List[Tuple[date, date]]:
+        """
+        Returns the caravan's next `count` non-overlapping free windows of
+        `length_days` days as inclusive (first_day, last_day), from `start_date`
+        (today by default), taking the earliest window each time. Without a
+        calendar horizon, the days after the last booking are all free.
+        """
+        if length_days < 1 or count < 1:
+            return []
+        day = start_date or date.today()
+        length = timedelta(days=length_days)
+        placeholders = ", ".join("?" for _ in self._inactive)
+        booked = self._query(
+            f"WHERE caravan_id = ? AND end_date >= ? AND status NOT IN ({placeholders}) ORDER BY start_date, id",
+            (caravan_id, day.isoformat(), *self._inactive),
+        )
+        windows: List[Tuple[date, date]] = []
+        for reservation in [*booked, None]:
+            while len(windows) < count and (reservation is None or day + length <= reservation.start_date):
+                windows.append((day, day + length - timedelta(days=1)))
+                day += length
+            if len(windows) == count:
+                break
+            day = max(day, reservation.end_date + timedelta(days=1))
+        return windows
+
+    def find_by_user_id(self, user_id: int) -> List[Reservation]:
+        """
+        Find all reservations made by a specific user.
+        """
+        return self._query("WHERE user_id = ? ORDER BY id", (user_id,))
+
+    def find_by_status(self, status: str) -> List[Reservation]:
+        """
+        Find all reservations currently in the given status.
+        """
+        return self._query("WHERE status = ? ORDER BY id", (status,))
+
+class SqlitePaymentRepository(SqliteBaseRepository[Payment]):
+    _table = "payments"
+    _columns = (
+        "reservation_id", "amount", "payment_method", "platform_fee", "settled", "status", "created_at", "version",
+    )
+    _versioned = True
+
+    def _to_row(self, payment: Payment) -> tuple:
+        return (
+            payment.reservation_id, payment.amount, payment.payment_method, payment.platform_fee,
+            int(payment.settled), payment.status, payment.created_at.isoformat(), payment.version,
+        )
+
+    def _from_row(self, row: Sequence) -> Payment:
+        return Payment(
+            id=row[0], reservation_id=row[1], amount=row[2], payment_method=sys.intern(row[3]),
+            platform_fee=row[4], settled=bool(row[5]), status=sys.intern(row[6]),
+            created_at=datetime.fromisoformat(row[7]), version=row[8],
+        )
+
+    def find_by_reservation_id(self, reservation_id: int, status: Optional[str] = None) -> List[Payment]:
+        """
+        Find the payments made for a reservation, optionally only those in the given status.
+        """
+        if status is None:
+            return self._query("WHERE reservation_id = ? ORDER BY id", (reservation_id,))
+        return self._query("WHERE reservation_id = ? AND status = ? ORDER BY id", (reservation_id, status))
+
+    def find_by_status(self, status: str, settled: Optional[bool] = None) -> List[Payment]:
+        """
+        Find the payments in the given status, optionally filtered by settlement state.
+        """
+        if settled is None:
+            return self._query("WHERE status = ? ORDER BY settled, id", (status,))
+        return self._query("WHERE status = ? AND settled = ? ORDER BY id", (status, int(settled)))
+
+class SqliteReviewRepository(SqliteBaseRepository[Review]):
+    _table = "reviews"
+    _columns = ("reservation_id", "rating", "comment", "author_id", "subject_id", "created_at")
+
+    def _to_row(self, review: Review) -> tuple:
+        return (
+            review.reservation_id, review.rating, review.comment, review.author_id, review.subject_id,
+            review.created_at.isoformat(),
+        )
+
+    def _from_row(self, row: Sequence) -> Review:
+        return Review(
+            id=row[0], reservation_id=row[1], rating=row[2], comment=row[3], author_id=row[4],
+            subject_id=row[5], created_at=datetime.fromisoformat(row[6]),
+        )
+
+    def _summary(self, column: str, value: int) -> Tuple[int, int]:
+        with self._db.connection() as connection:
+            count, rating_sum = connection.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(rating), 0) FROM reviews WHERE {column} = ?", (value,)
+            ).fetchone()
+        return count, rating_sum
+
+    def find_by_author_id(self, author_id: int) -> List[Review]:
+        """
+        Find all reviews written by a specific user.
+        """
+        return self._query("WHERE author_id = ? ORDER BY id", (author_id,))
+
+    def find_by_subject_id(self, subject_id: int) -> List[Review]:
+        """
+        Find all reviews about a specific user or caravan.
+        """
+        return self._query("WHERE subject_id = ? ORDER BY id", (subject_id,))
+
+    def get_author_rating_summary(self, author_id: int) -> Tuple[int, int]:
+        """
+        Returns (review_count, rating_sum) of the reviews written by a user.
+        """
+        return self._summary("author_id", author_id)
+
+    def get_subject_rating_summary(self, subject_id: int) -> Tuple[int, int]:
+        """
+        Returns (review_count, rating_sum) of the reviews about a user or caravan.
+        """
+        return self._summary("subject_id", subject_id)
+
+    def get_average_rating_for_subject(self, subject_id: int) -> float:
+        """
+        Returns the average rating of a user or caravan, or 0.0 if it has no reviews.
+        """
+        count, rating_sum = self.get_subject_rating_summary(subject_id)
+        return rating_sum / count if count else 0.0
+
+class SqliteMessageRepository(SqliteBaseRepository[Message]):
+    _table = "messages"
+    _columns = ("sender_id", "recipient_id", "content", "created_at")
+
+    def _to_row(self, message: Message) -> tuple:
+        return (message.sender_id, message.recipient_id, message.content, message.created_at.isoformat())
+
+    def _from_row(self, row: Sequence) -> Message:
+        return Message(
+            id=row[0], sender_id=row[1], recipient_id=row[2], content=row[3],
+            created_at=datetime.fromisoformat(row[4]),
+        )
+
+class SqliteSettlementRepository(SqliteBaseRepository[Settlement]):
+    _table = "settlements"
+    _columns = ("host_id", "amount", "payment_ids", "created_at")
+
+    def _to_row(self, settlement: Settlement) -> tuple:
+        return (settlement.host_id, settlement.amount, json.dumps(settlement.payment_ids), settlement.created_at.isoformat())
+
+    def _from_row(self, row: Sequence) -> Settlement:
+        return Settlement(
+            id=row[0], host_id=row[1], amount=row[2], payment_ids=json.loads(row[3]),
+            created_at=datetime.fromisoformat(row[4]),
+        )
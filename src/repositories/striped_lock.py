@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Hashable, Iterable, Iterator, List
+
+class StripedLock:
+    """
+    A fixed set of locks shared by hashing keys onto them, so operations on
+    different keys usually run in parallel while those on the same key are
+    serialized, without keeping one lock per key.
+
+    hold() takes the stripes of several keys in ascending stripe order, so
+    two callers locking overlapping key sets cannot deadlock. The stripes
+    are reentrant: a thread may lock a key it already holds.
+    """
+    def __init__(self, stripes: int = 64):
+        if stripes < 1:
+            raise ValueError("A striped lock needs at least one stripe.")
+        self._stripes = [threading.RLock() for _ in range(stripes)]
+
+    def __len__(self) -> int:
+        return len(self._stripes)
+
+    def stripe_of(self, key: Hashable) -> int:
+        return hash(key) % len(self._stripes)
+
+    def stripes_for(self, keys: Iterable[Hashable]) -> List[int]:
+        """
+        The stripes covering `keys`, in the order they must be acquired.
+        """
+        return sorted({self.stripe_of(key) for key in keys})
+
+    @contextmanager
+    def hold(self, keys: Iterable[Hashable]) -> Iterator[None]:
+        stripes = self.stripes_for(keys)
+        acquired = []
+        try:
+            for stripe in stripes:
+                self._stripes[stripe].acquire()
+                acquired.append(stripe)
+            yield
+        finally:
+            for stripe in reversed(acquired):
+                self._stripes[stripe].release()
+
+class AsyncStripedLock(StripedLock):
+    """
+    The same striping with asyncio locks, for coroutines sharing an event
+    loop: waiting for a stripe suspends the task instead of blocking the
+    loop. Unlike the threaded stripes these are not reentrant, and they do
+    not exclude threads that use the repository directly.
+    """
+    def __init__(self, stripes: int = 64):
+        if stripes < 1:
+            raise ValueError("A striped lock needs at least one stripe.")
+        self._stripes = [asyncio.Lock() for _ in range(stripes)]
+
+    @asynccontextmanager
+    async def hold(self, keys: Iterable[Hashable]) -> AsyncIterator[None]:
+        stripes = self.stripes_for(keys)
+        acquired = []
+        try:
+            for stripe in stripes:
+                await self._stripes[stripe].acquire()
+                acquired.append(stripe)
+            yield
+        finally:
+            for stripe in reversed(acquired):
+                self._stripes[stripe].release()
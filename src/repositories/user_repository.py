@@ -1,10 +1,97 @@
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from src.models.user import User
+from src.exceptions import DuplicateUserError
 from .base_repository import BaseRepository
 
 class UserRepository(BaseRepository[User]):
+    _versioned = True
+
+    def __init__(self):
+        super().__init__()
+        # Unique indexes; empty names and contacts are not indexed.
+        self._by_name: Dict[str, int] = {}
+        self._by_contact: Dict[str, int] = {}
+        # {user_id: (name, contact)} as of the last add/update
+        self._index_keys: Dict[int, Tuple[str, str]] = {}
+
+    def add(self, user: User) -> User:
+        with self._lock:
+            self._check_unique(user, user_id=None)
+            return super().add(user)
+
+    def update(self, user: User) -> None:
+        with self._lock:
+            self._check_unique(user, user_id=user.id)
+            super().update(user)
+
+    def compare_and_set(self, user: User, expected_version: int) -> bool:
+        with self._lock:
+            self._check_unique(user, user_id=user.id)
+            return super().compare_and_set(user, expected_version)
+
+    def add_many(self, users: Iterable[User]) -> List[User]:
+        users = list(users)
+        with self._lock:
+            self._check_unique_many(users, existing=False)
+            return super().add_many(users)
+
+    def update_many(self, users: Iterable[User]) -> None:
+        users = list(users)
+        with self._lock:
+            self._check_unique_many(users, existing=True)
+            super().update_many(users)
+
+    def _check_unique_many(self, users: List[User], existing: bool) -> None:
+        """
+        Checks a whole batch before any of it is stored, including clashes within the batch.
+        """
+        batch_names: Dict[str, User] = {}
+        batch_contacts: Dict[str, User] = {}
+        for user in users:
+            self._check_unique(user, user_id=user.id if existing else None)
+            for batch_index, field, value in (
+                (batch_names, "name", user.name),
+                (batch_contacts, "contact", user.contact),
+            ):
+                if value and batch_index.setdefault(value, user) is not user:
+                    raise DuplicateUserError(f"A user with {field} '{value}' already exists.")
+
+    def _check_unique(self, user: User, user_id: Optional[int]) -> None:
+        """
+        Raises DuplicateUserError if another user already holds the name or contact.
+        Checked before anything is stored, so a rejected write leaves the repository untouched,
+        and under the write's lock, so no other write can take the name or contact in between.
+        """
+        for index, field, value in (
+            (self._by_name, "name", user.name),
+            (self._by_contact, "contact", user.contact),
+        ):
+            owner_id = index.get(value) if value else None
+            if owner_id is not None and owner_id != user_id:
+                raise DuplicateUserError(f"A user with {field} '{value}' already exists.")
+
+    def _index(self, user: User) -> None:
+        self._unindex(user.id)
+        self._index_keys[user.id] = (user.name, user.contact)
+        if user.name:
+            self._by_name[user.name] = user.id
+        if user.contact:
+            self._by_contact[user.contact] = user.id
+
+    def _unindex(self, user_id: int) -> None:
+        keys = self._index_keys.pop(user_id, None)
+        if keys is None:
+            return
+        name, contact = keys
+        if name:
+            del self._by_name[name]
+        if contact:
+            del self._by_contact[contact]
+
     def find_by_name(self, name: str) -> Optional[User]:
-        for user in self.get_all():
-            if user.name == name:
-                return user
-        return None
+        user_id = self._by_name.get(name)
+        return self._data[user_id] if user_id is not None else None
+
+    def find_by_contact(self, contact: str) -> Optional[User]:
+        user_id = self._by_contact.get(contact)
+        return self._data[user_id] if user_id is not None else None
@@ -1,15 +1,25 @@
-from .reservation_service import ReservationService
+from .reservation_service import ReservationService, ReservationRequest, ReservationResult
 from .payment_service import PaymentService
 from .review_service import ReviewService
 from .message_service import MessageService
 from .map_service import MapService
 from .settlement_service import SettlementService
+from .search_service import SearchService
+from .async_reservation_service import AsyncReservationService
+from .async_payment_service import AsyncPaymentService
+from .async_message_service import AsyncMessageService
 
 __all__ = [
     "ReservationService", 
+    "ReservationRequest",
+    "ReservationResult",
     "PaymentService", 
     "ReviewService", 
     "MessageService",
     "MapService",
     "SettlementService",
+    "SearchService",
+    "AsyncReservationService",
+    "AsyncPaymentService",
+    "AsyncMessageService",
 ]
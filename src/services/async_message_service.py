@@ -0,0 +1,33 @@
+from src.models import Message
+from src.repositories import AsyncRepository
+from src.observers import AsyncMessagePublisher
+from src.exceptions import NotFoundError
+
+class AsyncMessageService:
+    def __init__(
+        self,
+        message_repo: AsyncRepository,
+        user_repo: AsyncRepository,
+        publisher: AsyncMessagePublisher
+    ):
+        self._message_repo = message_repo
+        self._user_repo = user_repo
+        self._publisher = publisher
+
+    async def send_message(self, sender_id: int, recipient_id: int, content: str) -> Message:
+        sender, recipient = await self._user_repo.get_many([sender_id, recipient_id])
+        if not sender:
+            raise NotFoundError("Sender", sender_id)
+        if not recipient:
+            raise NotFoundError("Recipient", recipient_id)
+
+        new_message = Message(
+            id=0, # Set by repo
+            sender_id=sender_id,
+            recipient_id=recipient_id,
+            content=content,
+        )
+
+        created_message = await self._message_repo.add(new_message)
+        await self._publisher.notify("message_sent", created_message)
+        return created_message
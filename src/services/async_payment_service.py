@@ -0,0 +1,100 @@
+from datetime import date
+from typing import Callable, List, Optional, Sequence, Tuple
+from src.models import User, Payment
+from src.repositories import AsyncRepository, AsyncReservationRepository
+from src.exceptions import NotFoundError
+from src.observers import AsyncPaymentPublisher
+from src.strategies import FeeStrategy, RefundPolicy, FlexibleRefundPolicy
+from .optimistic import update_with_retry_async
+from .payment_service import PaymentService, batch_totals, mark_refunded, new_payments
+
+class AsyncPaymentService:
+    """
+    PaymentService for asyncio callers, over awaitable repositories. The
+    charging and refund rules are payment_service's own; this class only
+    adds the awaits.
+    """
+    def __init__(
+        self,
+        user_repo: AsyncRepository,
+        payment_repo: AsyncRepository,
+        reservation_repo: AsyncReservationRepository,
+        publisher: AsyncPaymentPublisher,
+    ):
+        self._user_repo = user_repo
+        self._payment_repo = payment_repo
+        self._reservation_repo = reservation_repo
+        self._publisher = publisher
+
+    async def process_payment(
+        self,
+        user: User,
+        reservation_id: int,
+        amount: float,
+        fee_strategy: FeeStrategy,
+        payment_method: str = "balance"
+    ) -> Payment:
+        await self._apply_to_balance(user, self._debit(amount))
+        new_payment, = new_payments([(user, reservation_id, amount)], fee_strategy, payment_method)
+        created_payment = await self._payment_repo.add(new_payment)
+        await self._publisher.notify("payment_completed", created_payment)
+        return created_payment
+
+    async def process_payments(
+        self,
+        charges: Sequence[Tuple[User, int, float]],
+        fee_strategy: FeeStrategy,
+        payment_method: str = "balance"
+    ) -> List[Payment]:
+        """
+        See PaymentService.process_payments.
+        """
+        users, totals = batch_totals(charges)
+
+        debited: List[int] = []
+        try:
+            for user_id, total in totals.items():
+                await self._apply_to_balance(users[user_id], self._debit(total))
+                debited.append(user_id)
+        except Exception:
+            for user_id in debited:
+                await self._apply_to_balance(users[user_id], self._credit(totals[user_id]))
+            raise
+
+        created_payments = await self._payment_repo.add_many(new_payments(charges, fee_strategy, payment_method))
+        await self._publisher.notify_many("payment_completed", created_payments)
+        return created_payments
+
+    async def refund_payment(self, reservation_id: int, refund_policy: Optional[RefundPolicy] = None) -> None:
+        completed_payments = await self._payment_repo.find_by_reservation_id(reservation_id, status="completed")
+        if not completed_payments:
+            raise NotFoundError("Completed payment for reservation", reservation_id)
+        payment_to_refund = completed_payments[0]
+
+        reservation = await self._reservation_repo.get_by_id(reservation_id)
+        if not reservation:
+            raise NotFoundError("Reservation", reservation_id)
+
+        user = await self._user_repo.get_by_id(reservation.user_id)
+        if not user:
+            raise NotFoundError("User", reservation.user_id)
+
+        refund_amount = (refund_policy or FlexibleRefundPolicy()).calculate_refund_amount(
+            payment_to_refund.amount,
+            reservation.start_date,
+            date.today() # Assuming today is the cancellation date
+        )
+
+        refunded_payment = await update_with_retry_async(
+            self._payment_repo, payment_to_refund.id, mark_refunded(reservation_id), "Payment"
+        )
+        await self._apply_to_balance(user, self._credit(refund_amount))
+
+        await self._publisher.notify("payment_refunded", refunded_payment)
+
+    async def _apply_to_balance(self, user: User, change: Callable[[User], None]) -> None:
+        updated = await update_with_retry_async(self._user_repo, user.id, change, "User")
+        user.balance, user.version = updated.balance, updated.version
+
+    _debit = staticmethod(PaymentService._debit)
+    _credit = staticmethod(PaymentService._credit)
@@ -0,0 +1,148 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+from src.models import Reservation
+from src.repositories import AsyncReservationRepository
+from src.validators import AsyncReservationValidator
+from src.strategies import DiscountStrategy, FeeStrategy
+from src.observers import AsyncReservationPublisher
+from src.factories import ReservationFactory
+from .async_payment_service import AsyncPaymentService
+from .optimistic import set_status, update_with_retry_async
+from src.exceptions import CaravanShareException, ConcurrentUpdateError
+from .reservation_service import (
+    ReservationRequest, ReservationResult, accept_requests, bookings_by_user, final_price, group_requests, split_paid,
+)
+
+class AsyncReservationService:
+    """
+    ReservationService for asyncio callers: the same validation, pricing
+    strategies and factory over awaitable repositories, so one event loop
+    can serve many bookings without a thread per request. The booking rules
+    are the module-level helpers of reservation_service; this class only
+    adds the awaits.
+    """
+    def __init__(
+        self,
+        reservation_repo: AsyncReservationRepository,
+        payment_service: AsyncPaymentService,
+        validator: AsyncReservationValidator,
+        publisher: AsyncReservationPublisher,
+        factory: ReservationFactory,
+    ):
+        self._reservation_repo = reservation_repo
+        self._payment_service = payment_service
+        self._validator = validator
+        self._publisher = publisher
+        self._factory = factory
+
+    async def create_reservation(
+        self, user_id: int, caravan_id: int, start_date: date, end_date: date, price: float,
+        discount_strategy: Optional[DiscountStrategy] = None,
+        fee_strategy: Optional[FeeStrategy] = None
+    ) -> Reservation:
+        user = await self._validator.validate_user_exists(user_id)
+        await self._validator.validate_caravan_exists(caravan_id)
+        price = final_price(price, discount_strategy)
+
+        # Other tasks may run at every await, so the dates are checked and
+        # claimed under the caravan's lock, as in the threaded service.
+        async with self._reservation_repo.lock_caravans([caravan_id]):
+            await self._validator.validate_no_duplicate_reservations(caravan_id, start_date, end_date)
+            created_reservation = await self._reservation_repo.add(self._factory.create_reservation(
+                user_id=user_id,
+                caravan_id=caravan_id,
+                start_date=start_date,
+                end_date=end_date,
+                price=price,
+            ))
+
+        try:
+            await self._payment_service.process_payment(
+                user=user,
+                reservation_id=created_reservation.id,
+                amount=price,
+                fee_strategy=fee_strategy
+            )
+        except Exception:
+            await self._reservation_repo.delete(created_reservation.id)
+            raise
+
+        created_reservation = await self._transition(created_reservation.id, "paid")
+
+        await self._publisher.notify("reservation_created", created_reservation)
+        return created_reservation
+
+    async def create_reservations(
+        self, requests: Iterable[ReservationRequest], fee_strategy: Optional[FeeStrategy] = None
+    ) -> List[ReservationResult]:
+        """
+        See ReservationService.create_reservations.
+        """
+        requests = list(requests)
+        results = [ReservationResult(request) for request in requests]
+        users = await self._validator.find_existing_users(request.user_id for request in requests)
+        caravans = await self._validator.find_existing_caravans(request.caravan_id for request in requests)
+        date_ranges = group_requests(results, users, caravans)
+
+        async with self._reservation_repo.lock_caravans(date_ranges):
+            taken_dates = {
+                caravan_id: await self._validator.find_taken_dates(caravan_id, ranges)
+                for caravan_id, ranges in date_ranges.items()
+            }
+            accepted = accept_requests(results, users, taken_dates, self._factory)
+            if not accepted:
+                return results
+            created_reservations = await self._reservation_repo.add_many(reservation for _, reservation in accepted)
+
+        payment_errors: Dict[int, CaravanShareException] = {}
+        for user_id, bookings in bookings_by_user(created_reservations).items():
+            try:
+                await self._payment_service.process_payments(
+                    [(users[user_id], reservation.id, reservation.price) for reservation in bookings],
+                    fee_strategy=fee_strategy,
+                )
+            except CaravanShareException as error:
+                payment_errors[user_id] = error
+
+        paid, unpaid_ids = split_paid(accepted, created_reservations, payment_errors)
+        if unpaid_ids:
+            await self._reservation_repo.delete_many(unpaid_ids)
+        if paid:
+            paid_reservations = await self._store_paid([reservation for _, reservation in paid])
+            for (result, _), reservation in zip(paid, paid_reservations):
+                result.reservation = reservation
+            await self._publisher.notify_many("reservation_created", paid_reservations)
+        return results
+
+    async def _store_paid(self, reservations: List[Reservation]) -> List[Reservation]:
+        """
+        See ReservationService._store_paid.
+        """
+        try:
+            await self._reservation_repo.update_many(reservations)
+            return reservations
+        except ConcurrentUpdateError:
+            return [await self._transition(reservation.id, "paid") for reservation in reservations]
+
+    async def _transition(self, reservation_id: int, status: str) -> Reservation:
+        return await update_with_retry_async(self._reservation_repo, reservation_id, set_status(status), "Reservation")
+
+    async def approve_reservation(self, reservation_id: int) -> Reservation:
+        reservation = await self._transition(reservation_id, "approved")
+        await self._publisher.notify("reservation_approved", reservation)
+        return reservation
+
+    async def reject_reservation(self, reservation_id: int) -> Reservation:
+        reservation = await self._transition(reservation_id, "rejected")
+        await self._publisher.notify("reservation_rejected", reservation)
+        return reservation
+
+    async def cancel_reservation(self, reservation_id: int) -> Reservation:
+        reservation = await self._transition(reservation_id, "cancelled")
+        await self._publisher.notify("reservation_cancelled", reservation)
+        return reservation
+
+    async def complete_reservation(self, reservation_id: int) -> Reservation:
+        reservation = await self._transition(reservation_id, "completed")
+        await self._publisher.notify("review_requested", reservation)
+        return reservation
@@ -0,0 +1,57 @@
+from dataclasses import replace
+from typing import Callable, TypeVar
+from src.exceptions import ConcurrentUpdateError, NotFoundError
+
+T = TypeVar('T')
+
+DEFAULT_ATTEMPTS = 10
+
+def update_with_retry(
+    repo,
+    item_id: int,
+    change: Callable[[T], None],
+    entity_name: str,
+    attempts: int = DEFAULT_ATTEMPTS,
+) -> T:
+    """
+    Reads the item, applies `change` to a copy and writes it back with
+    compare_and_set, starting over from a fresh read whenever another write
+    got in between. Returns the stored copy.
+
+    `change` may run several times and must only depend on the item it is
+    given; it can raise (e.g. InsufficientFundsError) to abort the update.
+    """
+    for _ in range(max(1, attempts)):
+        current = repo.get_by_id(item_id)
+        if current is None:
+            raise NotFoundError(entity_name, item_id)
+        candidate = replace(current)
+        change(candidate)
+        if repo.compare_and_set(candidate, current.version):
+            return candidate
+    raise ConcurrentUpdateError(f"{entity_name} {item_id} kept changing; gave up after {attempts} attempts.")
+
+async def update_with_retry_async(
+    repo,
+    item_id: int,
+    change: Callable[[T], None],
+    entity_name: str,
+    attempts: int = DEFAULT_ATTEMPTS,
+) -> T:
+    """
+    update_with_retry for an AsyncRepository.
+    """
+    for _ in range(max(1, attempts)):
+        current = await repo.get_by_id(item_id)
+        if current is None:
+            raise NotFoundError(entity_name, item_id)
+        candidate = replace(current)
+        change(candidate)
+        if await repo.compare_and_set(candidate, current.version):
+            return candidate
+    raise ConcurrentUpdateError(f"{entity_name} {item_id} kept changing; gave up after {attempts} attempts.")
+
+def set_status(status: str) -> Callable[[object], None]:
+    def change(item) -> None:
+        item.status = status
+    return change
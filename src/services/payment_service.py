@@ -1,10 +1,49 @@
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 from datetime import date
 from src.models import User, Payment
 from src.repositories import UserRepository, PaymentRepository, ReservationRepository
 from src.exceptions import InsufficientFundsError, NotFoundError
 from src.observers import PaymentPublisher
 from src.strategies import FeeStrategy, RefundPolicy, FlexibleRefundPolicy
+from .optimistic import update_with_retry
+
+def batch_totals(charges: Sequence[Tuple[User, int, float]]) -> Tuple[Dict[int, User], Dict[int, float]]:
+    """
+    Sums a batch of (user, reservation_id, amount) charges per user. Returns
+    the users and their totals by id, and raises InsufficientFundsError if
+    any user is short.
+    """
+    totals: Dict[int, float] = {}
+    users: Dict[int, User] = {}
+    for user, _, amount in charges:
+        users[user.id] = user
+        totals[user.id] = totals.get(user.id, 0.0) + amount
+    for user_id, total in totals.items():
+        if users[user_id].balance < total:
+            raise InsufficientFundsError("User has insufficient funds.")
+    return users, totals
+
+def new_payments(
+    charges: Sequence[Tuple[User, int, float]], fee_strategy: FeeStrategy, payment_method: str
+) -> List[Payment]:
+    return [
+        Payment(
+            id=0, # The repository will assign an ID
+            reservation_id=reservation_id,
+            amount=amount,
+            payment_method=payment_method,
+            platform_fee=fee_strategy.calculate_fee(amount),
+        )
+        for _, reservation_id, amount in charges
+    ]
+
+def mark_refunded(reservation_id: int) -> Callable[[Payment], None]:
+    def change(payment: Payment) -> None:
+        # Another refund of the same payment may have won the race.
+        if payment.status != "completed":
+            raise NotFoundError("Completed payment for reservation", reservation_id)
+        payment.status = "refunded"
+    return change
 
 class PaymentService:
     def __init__(
@@ -27,34 +66,45 @@ class PaymentService:
         fee_strategy: FeeStrategy,
         payment_method: str = "balance"
     ) -> Payment:
-        if user.balance < amount:
-            raise InsufficientFundsError("User has insufficient funds.")
-        
-        user.balance -= amount
-        self._user_repo.update(user)
-
-        platform_fee = fee_strategy.calculate_fee(amount)
-
-        new_payment = Payment(
-            id=0, # The repository will assign an ID
-            reservation_id=reservation_id,
-            amount=amount,
-            payment_method=payment_method,
-            platform_fee=platform_fee,
-        )
-        
+        self._apply_to_balance(user, self._debit(amount))
+        new_payment, = new_payments([(user, reservation_id, amount)], fee_strategy, payment_method)
         created_payment = self._payment_repo.add(new_payment)
         self._publisher.notify("payment_completed", created_payment)
         return created_payment
 
+    def process_payments(
+        self,
+        charges: Sequence[Tuple[User, int, float]],
+        fee_strategy: FeeStrategy,
+        payment_method: str = "balance"
+    ) -> List[Payment]:
+        """
+        Charges a batch of (user, reservation_id, amount). Each user's balance is
+        debited once for the sum of their charges, and all payments are stored
+        and announced as one batch. Nothing is charged if any user is short.
+        """
+        users, totals = batch_totals(charges)
+
+        debited: List[int] = []
+        try:
+            for user_id, total in totals.items():
+                self._apply_to_balance(users[user_id], self._debit(total))
+                debited.append(user_id)
+        except Exception:
+            # A balance changed since the check above: give back what was already taken.
+            for user_id in debited:
+                self._apply_to_balance(users[user_id], self._credit(totals[user_id]))
+            raise
+
+        created_payments = self._payment_repo.add_many(new_payments(charges, fee_strategy, payment_method))
+        self._publisher.notify_many("payment_completed", created_payments)
+        return created_payments
+
     def refund_payment(self, reservation_id: int, refund_policy: Optional[RefundPolicy] = None) -> None:
         # In a real app, you'd have more complex logic to find the correct payment.
-        # Here, we'll just find the first payment for the reservation.
-        payment_to_refund = None
-        for p in self._payment_repo.get_all():
-            if p.reservation_id == reservation_id and p.status == "completed":
-                payment_to_refund = p
-                break
+        # Here, we'll just take the first completed payment for the reservation.
+        completed_payments = self._payment_repo.find_by_reservation_id(reservation_id, status="completed")
+        payment_to_refund = completed_payments[0] if completed_payments else None
         
         if not payment_to_refund:
             raise NotFoundError("Completed payment for reservation", reservation_id)
@@ -76,10 +126,32 @@ class PaymentService:
             date.today() # Assuming today is the cancellation date
         )
 
-        user.balance += refund_amount
-        self._user_repo.update(user)
+        refunded_payment = update_with_retry(
+            self._payment_repo, payment_to_refund.id, mark_refunded(reservation_id), "Payment"
+        )
+        self._apply_to_balance(user, self._credit(refund_amount))
+
+        self._publisher.notify("payment_refunded", refunded_payment)
+
+    def _apply_to_balance(self, user: User, change: Callable[[User], None]) -> None:
+        """
+        Applies `change` to the stored user with compare-and-set retries, so
+        concurrent payments of the same user never overwrite each other, and
+        copies the result onto `user`.
+        """
+        updated = update_with_retry(self._user_repo, user.id, change, "User")
+        user.balance, user.version = updated.balance, updated.version
 
-        payment_to_refund.status = "refunded"
-        self._payment_repo.update(payment_to_refund)
+    @staticmethod
+    def _debit(amount: float) -> Callable[[User], None]:
+        def debit(user: User) -> None:
+            if user.balance < amount:
+                raise InsufficientFundsError("User has insufficient funds.")
+            user.balance -= amount
+        return debit
 
-        self._publisher.notify("payment_refunded", payment_to_refund)
+    @staticmethod
+    def _credit(amount: float) -> Callable[[User], None]:
+        def credit(user: User) -> None:
+            user.balance += amount
+        return credit
@@ -0,0 +1,370 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only the recommendation engine needs it.
+    np = None
+
+from src.repositories import CaravanRepository, ReservationRepository, UserRepository
+from src.repositories.reservation_repository import INACTIVE_STATUSES
+from .recommendation_engine import CaravanEmbedding
+
+def _narrowest(ids: "np.ndarray") -> "np.ndarray":
+    """
+    The ids as int32 when they fit, which halves the file.
+    """
+    if not ids.size or int(ids.max()) <= np.iinfo(np.int32).max:
+        return ids.astype(np.int32)
+    return ids
+
+class PrecomputedRecommendations:
+    """
+    Every user's top caravan ids as written by RecommendationBatchJob: one
+    row of `limit` ids per user, padded with -1, in a NumPy .npz file.
+
+    Each user also keeps a fingerprint of their stays, and each caravan a
+    digest of the matrix row it was scored with, next to a digest of the
+    scoring settings. That is what lets the next run rescore only the users
+    whose stays changed or whom a changed caravan can affect.
+    """
+    def __init__(
+        self,
+        user_ids: "np.ndarray",
+        caravan_ids: "np.ndarray",
+        fingerprints: "np.ndarray",
+        catalog_ids: "np.ndarray",
+        row_digests: "np.ndarray",
+        settings_digest: bytes,
+    ):
+        self.user_ids = user_ids
+        self.caravan_ids = caravan_ids
+        self.fingerprints = fingerprints
+        self.catalog_ids = catalog_ids
+        self.row_digests = row_digests
+        self.settings_digest = settings_digest
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def limit(self) -> int:
+        return self.caravan_ids.shape[1]
+
+    def for_user(self, user_id: int) -> List[int]:
+        position = int(np.searchsorted(self.user_ids, user_id))
+        if position == len(self.user_ids) or self.user_ids[position] != user_id:
+            return []
+        return [int(caravan_id) for caravan_id in self.caravan_ids[position] if caravan_id >= 0]
+
+    def save(self, path: str) -> None:
+        # Write next to the old file and swap, so readers never see half a file.
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as output:
+            np.savez(
+                output,
+                user_ids=self.user_ids,
+                caravan_ids=_narrowest(self.caravan_ids),
+                fingerprints=self.fingerprints,
+                catalog_ids=self.catalog_ids,
+                row_digests=self.row_digests,
+                settings_digest=np.frombuffer(self.settings_digest, dtype=np.uint8),
+            )
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PrecomputedRecommendations":
+        with np.load(path) as data:
+            return cls(
+                data["user_ids"], data["caravan_ids"], data["fingerprints"],
+                data["catalog_ids"], data["row_digests"], data["settings_digest"].tobytes(),
+            )
+
+class SharedEmbedding:
+    """
+    One copy of a CaravanEmbedding's arrays in shared memory. Worker
+    processes attach to it by `handle` instead of each unpickling their own
+    copy of the catalog.
+    """
+    def __init__(self, embedding: CaravanEmbedding):
+        layout = []
+        size = 0
+        for name, array in embedding.arrays().items():
+            size = -(-size // 64) * 64
+            layout.append((name, array.dtype.str, array.shape, size))
+            size += array.nbytes
+        self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for (name, dtype, shape, offset), array in zip(layout, embedding.arrays().values()):
+            np.ndarray(shape, dtype, buffer=self._memory.buf, offset=offset)[...] = array
+        self.handle = (self._memory.name, layout, embedding.amenities)
+
+    @staticmethod
+    def attach(handle) -> Tuple[shared_memory.SharedMemory, CaravanEmbedding]:
+        """
+        Maps the shared arrays into this process. The returned memory must be
+        kept referenced for as long as the embedding is used.
+        """
+        name, layout, amenities = handle
+        # Pool workers share the creating process's resource tracker, which
+        # removes the block once, when SharedEmbedding.close() unlinks it.
+        memory = shared_memory.SharedMemory(name=name)
+        arrays = {
+            field: np.ndarray(shape, dtype, buffer=memory.buf, offset=offset)
+            for field, dtype, shape, offset in layout
+        }
+        return memory, CaravanEmbedding.from_arrays(arrays, amenities)
+
+    def close(self) -> None:
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self) -> "SharedEmbedding":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def _mix(values: "np.ndarray") -> "np.ndarray":
+    """
+    The splitmix64 finalizer, applied to each uint64 value.
+    """
+    mixed = values + np.uint64(0x9E3779B97F4A7C15)
+    mixed = (mixed ^ (mixed >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    mixed = (mixed ^ (mixed >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return mixed ^ (mixed >> np.uint64(31))
+
+def stay_fingerprints(caravan_ids: "np.ndarray", user_positions: "np.ndarray", users: int) -> "np.ndarray":
+    """
+    An order-independent 64-bit hash of each user's stays: the sum of a
+    mixed hash of every stayed caravan id. 0 for users without stays.
+    """
+    fingerprints = np.zeros(users, dtype=np.uint64)
+    np.add.at(fingerprints, user_positions, _mix(caravan_ids.astype(np.uint64)))
+    return fingerprints
+
+def row_digests(matrix: "np.ndarray") -> "np.ndarray":
+    """
+    A 64-bit hash of each row of a float32 matrix, bit for bit.
+    """
+    digests = np.zeros(len(matrix), dtype=np.uint64)
+    for column in np.ascontiguousarray(matrix, dtype=np.float32).view(np.uint32).T:
+        digests = _mix(digests ^ column.astype(np.uint64))
+    return digests
+
+def top_caravans(
+    embedding: CaravanEmbedding, rows: "np.ndarray", offsets: "np.ndarray",
+    limit: int, exclude_visited: bool, batch_size: int,
+) -> "np.ndarray":
+    """
+    The best `limit` caravan ids for each user of a partition, whose stays
+    are `rows[offsets[i]:offsets[i + 1]]`, padded with -1.
+    """
+    users = len(offsets) - 1
+    best_ids = np.full((users, limit), -1, dtype=np.int64)
+    for start in range(0, users, batch_size):
+        end = min(start + batch_size, users)
+        histories = [rows[offsets[user]:offsets[user + 1]] for user in range(start, end)]
+        best, _ = embedding.top_k(embedding.queries(histories), limit, histories if exclude_visited else None)
+        found = best >= 0
+        best_ids[start:end, :best.shape[1]][found] = embedding.ids[best[found]]
+    return best_ids
+
+# Set in each worker process by _attach_worker.
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+_worker_embedding: Optional[CaravanEmbedding] = None
+
+def _attach_worker(handle) -> None:
+    global _worker_memory, _worker_embedding
+    _worker_memory, _worker_embedding = SharedEmbedding.attach(handle)
+
+def _score_in_worker(rows: "np.ndarray", offsets: "np.ndarray", limit: int, exclude_visited: bool, batch_size: int) -> "np.ndarray":
+    return top_caravans(_worker_embedding, rows, offsets, limit, exclude_visited, batch_size)
+
+class RecommendationBatchJob:
+    """
+    Precomputes every user's recommendations, as RecommendationEngine would
+    give them, into a PrecomputedRecommendations file for offline use such
+    as the weekly "caravans you'll love" email.
+
+    Reservations are read in one pass instead of once per user, and users
+    are scored in partitions of `partition_size` on a pool of `workers`
+    processes sharing one copy of the catalog.
+
+    Every run still reads all reservations and embeds the whole catalog,
+    which is cheap next to scoring. Given the previous file, a user is only
+    rescored if their stays changed, if they stayed at or were recommended a
+    caravan whose row changed or went away, or if a changed caravan now
+    beats their last recommendation. Rows are scaled over the catalog, so a
+    change that moves a price, position or capacity extreme or adds an
+    amenity changes every row and rescores everyone.
+    """
+    def __init__(
+        self,
+        user_repo: UserRepository,
+        caravan_repo: CaravanRepository,
+        reservation_repo: ReservationRepository,
+        limit: int = 10,
+        workers: int = 1,
+        partition_size: int = 10_000,
+        batch_size: int = 256,
+        exclude_visited: bool = True,
+        **weights: float,
+    ):
+        if np is None:
+            raise ImportError("The recommendation batch job requires numpy.")
+        self._user_repo = user_repo
+        self._caravan_repo = caravan_repo
+        self._reservation_repo = reservation_repo
+        self._limit = max(1, limit)
+        self._workers = max(1, workers)
+        self._partition_size = max(1, partition_size)
+        self._batch_size = max(1, batch_size)
+        self._exclude_visited = exclude_visited
+        self._weights = weights
+
+    def run(self, path: str, previous_path: Optional[str] = None) -> Dict[str, int]:
+        """
+        Writes the recommendations to `path`, reusing those in `previous_path`
+        (which may be `path` itself) that are still current. Returns counts
+        of the users written, scored and reused.
+        """
+        embedding = CaravanEmbedding(self._caravan_repo.get_all(), **self._weights)
+        digests = row_digests(embedding.matrix)
+        settings = self._settings_digest(embedding)
+        # Users without stays always get the current popular caravans; they are never scored.
+        popular = np.full(self._limit, -1, dtype=np.int64)
+        popular_ids = [caravan.id for caravan in self._caravan_repo.get_popular_caravans(self._limit)]
+        popular[:len(popular_ids)] = popular_ids
+
+        user_ids = np.array(sorted(user.id for user in self._user_repo.get_all()), dtype=np.int64)
+        rows, offsets, fingerprints = self._stays(embedding, user_ids)
+        caravan_ids = np.empty((len(user_ids), self._limit), dtype=np.int64)
+        caravan_ids[:] = popular
+
+        stale = np.diff(offsets) > 0
+        previous = None
+        if previous_path is not None and os.path.exists(previous_path):
+            previous = PrecomputedRecommendations.load(previous_path)
+        reused = 0
+        if (previous is not None and len(previous) and previous.settings_digest == settings
+                and previous.limit == self._limit):
+            current, positions = self._still_current(embedding, digests, rows, offsets, user_ids, fingerprints, previous)
+            current &= stale
+            caravan_ids[current] = previous.caravan_ids[positions[current]]
+            reused = int(current.sum())
+            stale &= ~current
+
+        scored_positions = np.flatnonzero(stale)
+        for partition, best in zip(*self._score(embedding, rows, offsets, scored_positions)):
+            caravan_ids[partition] = best
+
+        PrecomputedRecommendations(user_ids, caravan_ids, fingerprints, embedding.ids, digests, settings).save(path)
+        return {"users": len(user_ids), "scored": len(scored_positions), "reused": reused}
+
+    def _settings_digest(self, embedding: CaravanEmbedding) -> bytes:
+        """
+        Identifies what the rows were scored with besides the rows themselves.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update("\0".join(embedding.amenities).encode())
+        digest.update(embedding.arrays()["weights"].tobytes())
+        digest.update(bytes([self._exclude_visited]))
+        return digest.digest()
+
+    def _still_current(
+        self, embedding: CaravanEmbedding, digests: "np.ndarray", rows: "np.ndarray", offsets: "np.ndarray",
+        user_ids: "np.ndarray", fingerprints: "np.ndarray", previous: PrecomputedRecommendations,
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Which users' rows in `previous` are what scoring them again would
+        give, and where each user is in `previous`.
+        """
+        positions = np.clip(np.searchsorted(previous.user_ids, user_ids), 0, len(previous) - 1)
+        current = (previous.user_ids[positions] == user_ids) & (previous.fingerprints[positions] == fingerprints)
+
+        order = np.argsort(previous.catalog_ids, kind="stable")
+        known_ids, known_digests = previous.catalog_ids[order], previous.row_digests[order]
+        changed = np.ones(len(embedding), dtype=bool)
+        if len(known_ids):
+            found = np.clip(np.searchsorted(known_ids, embedding.ids), 0, len(known_ids) - 1)
+            changed = (known_ids[found] != embedding.ids) | (known_digests[found] != digests)
+        removed = np.setdiff1d(known_ids, embedding.ids)
+        if not changed.any() and not len(removed):
+            return current, positions
+
+        # Users whose query moved, or whose list names a caravan that changed or went away.
+        stay_users = np.repeat(np.arange(len(user_ids)), np.diff(offsets))
+        current &= np.bincount(stay_users, weights=changed[rows], minlength=len(user_ids)) == 0
+        best = previous.caravan_ids[positions]
+        current &= ~np.isin(best, np.concatenate((embedding.ids[changed], removed))).any(axis=1)
+        if not changed.any():
+            return current, positions
+        # A short list holds every caravan the user may get, so any new one belongs in it.
+        current &= (best >= 0).all(axis=1)
+
+        # The rest keep their list unless a changed caravan scores at least
+        # as well as its last entry; the margin absorbs float rounding.
+        changed_matrix = embedding.matrix[changed]
+        candidates = np.flatnonzero(current & (offsets[1:] > offsets[:-1]))
+        for start in range(0, len(candidates), self._batch_size):
+            batch = candidates[start:start + self._batch_size]
+            queries = embedding.queries([rows[offsets[user]:offsets[user + 1]] for user in batch])
+            last_rows = embedding.rows_of(best[batch, -1].tolist())
+            threshold = np.einsum("ij,ij->i", queries, embedding.matrix[last_rows])
+            beaten = (queries @ changed_matrix.T).max(axis=1) >= threshold - 1e-5
+            current[batch[beaten]] = False
+        return current, positions
+
+    def _stays(self, embedding: CaravanEmbedding, user_ids: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """
+        Every user's stays as matrix rows, grouped by user in reservation
+        order: user i stayed at rows[offsets[i]:offsets[i + 1]]. Also
+        returns each user's stay fingerprint. Cancelled and rejected
+        reservations are not stays.
+        """
+        reservations = [
+            reservation for reservation in self._reservation_repo.get_all()
+            if reservation.status not in INACTIVE_STATUSES
+        ]
+        stay_users = np.fromiter((reservation.user_id for reservation in reservations), dtype=np.int64, count=len(reservations))
+        stay_caravans = np.fromiter((reservation.caravan_id for reservation in reservations), dtype=np.int64, count=len(reservations))
+        stay_rows = np.fromiter(
+            (embedding.rows.get(caravan_id, -1) for caravan_id in stay_caravans.tolist()), dtype=np.int64, count=len(reservations)
+        )
+        positions = np.searchsorted(user_ids, stay_users)
+        known = (stay_rows >= 0) & (positions < len(user_ids))
+        known[known] = user_ids[positions[known]] == stay_users[known]
+        positions, stay_rows, stay_caravans = positions[known], stay_rows[known], stay_caravans[known]
+
+        order = np.argsort(positions, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(positions, minlength=len(user_ids)))))
+        return stay_rows[order], offsets, stay_fingerprints(stay_caravans, positions, len(user_ids))
+
+    def _score(
+        self, embedding: CaravanEmbedding, rows: "np.ndarray", offsets: "np.ndarray", positions: "np.ndarray"
+    ) -> Tuple[List["np.ndarray"], List["np.ndarray"]]:
+        """
+        Scores the users at `positions` in partitions. Returns the partitions
+        and, in the same order, their best caravan ids.
+        """
+        partitions = [positions[start:start + self._partition_size] for start in range(0, len(positions), self._partition_size)]
+        tasks = []
+        for partition in partitions:
+            lengths = offsets[partition + 1] - offsets[partition]
+            partition_rows = np.concatenate([rows[offsets[user]:offsets[user + 1]] for user in partition])
+            tasks.append((partition_rows, np.concatenate(([0], np.cumsum(lengths)))))
+
+        arguments = (self._limit, self._exclude_visited, self._batch_size)
+        if self._workers == 1 or len(tasks) <= 1:
+            return partitions, [top_caravans(embedding, *task, *arguments) for task in tasks]
+        with SharedEmbedding(embedding) as shared:
+            with ProcessPoolExecutor(
+                max_workers=min(self._workers, len(tasks)), initializer=_attach_worker, initargs=(shared.handle,)
+            ) as executor:
+                futures = [executor.submit(_score_in_worker, *task, *arguments) for task in tasks]
+                return partitions, [future.result() for future in futures]
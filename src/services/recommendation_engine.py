@@ -0,0 +1,230 @@
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only the recommendation engine needs it.
+    np = None
+
+from src.models import Caravan
+from src.repositories import CaravanRepository, ReservationRepository
+from src.repositories.reservation_repository import INACTIVE_STATUSES
+
+class CaravanEmbedding:
+    """
+    The catalog as one float32 matrix, built so that a single matrix-vector
+    product scores every caravan for a user:
+
+        score = amenity_weight * cosine(amenities, preferred amenities)
+              - sum over price, location and capacity of weight * (value - preferred value) ** 2
+              + rating_weight * rating / 5
+
+    Prices (on a log scale), positions and capacities are scaled to about
+    [0, 1] over the catalog. Expanding the squares leaves one term per
+    caravan, which goes into the last column, and one per user, which does
+    not change the ranking and is dropped.
+
+    The arrays are read-only once built and can be shared between processes.
+    """
+    def __init__(
+        self,
+        caravans: Sequence[Caravan],
+        amenity_weight: float = 1.0,
+        price_weight: float = 1.0,
+        location_weight: float = 1.0,
+        capacity_weight: float = 0.5,
+        rating_weight: float = 0.1,
+    ):
+        if np is None:
+            raise ImportError("The recommendation engine requires numpy.")
+        self.ids = np.fromiter((caravan.id for caravan in caravans), dtype=np.int64, count=len(caravans))
+        self.rows: Dict[int, int] = {int(caravan_id): row for row, caravan_id in enumerate(self.ids)}
+        self.amenities = sorted({amenity for caravan in caravans for amenity in caravan.amenities})
+        self._weights = np.array([price_weight, location_weight, location_weight, capacity_weight], dtype=np.float32)
+        self._amenity_weight = amenity_weight
+
+        columns = {amenity: column for column, amenity in enumerate(self.amenities)}
+        # Raw features, from which both the matrix and the user profiles are built.
+        self.amenity_flags = np.zeros((len(caravans), len(self.amenities)), dtype=np.float32)
+        for row, caravan in enumerate(caravans):
+            self.amenity_flags[row, [columns[amenity] for amenity in set(caravan.amenities)]] = 1.0
+        self.numeric = self._scaled_numeric(caravans)
+
+        norms = np.linalg.norm(self.amenity_flags, axis=1, keepdims=True)
+        unit_amenities = np.divide(self.amenity_flags, norms, out=np.zeros_like(self.amenity_flags), where=norms > 0)
+        ratings = np.fromiter((caravan.average_rating for caravan in caravans), dtype=np.float32, count=len(caravans))
+        constant = rating_weight * ratings / 5.0 - (self.numeric ** 2) @ self._weights
+        self.matrix = np.ascontiguousarray(np.hstack([unit_amenities, self.numeric, constant[:, None]]), dtype=np.float32)
+
+    @staticmethod
+    def _scaled_numeric(caravans: Sequence[Caravan]) -> "np.ndarray":
+        """
+        Columns: log price, east-west and north-south position, capacity.
+        """
+        raw = np.array(
+            [(math.log1p(max(caravan.price_per_day, 0.0)), caravan.longitude, caravan.latitude, caravan.capacity)
+             for caravan in caravans],
+            dtype=np.float64,
+        ).reshape(len(caravans), 4)
+        if not len(raw):
+            return raw.astype(np.float32)
+        low, high = raw.min(axis=0), raw.max(axis=0)
+        span = np.where(high > low, high - low, 1.0)
+        # Both position axes share one scale so that distances stay round;
+        # a degree of longitude shrinks with latitude.
+        shrink = math.cos(math.radians((high[2] + low[2]) / 2))
+        span[1] = span[2] = max((high[1] - low[1]) * shrink, high[2] - low[2]) or 1.0
+        scaled = (raw - low) / span
+        scaled[:, 1] *= shrink
+        return scaled.astype(np.float32)
+
+    def arrays(self) -> Dict[str, "np.ndarray"]:
+        """
+        Everything the embedding is made of, for from_arrays.
+        """
+        return {
+            "ids": self.ids,
+            "amenity_flags": self.amenity_flags,
+            "numeric": self.numeric,
+            "matrix": self.matrix,
+            "weights": np.concatenate(([self._amenity_weight], self._weights)).astype(np.float32),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, "np.ndarray"], amenities: Sequence[str]) -> "CaravanEmbedding":
+        """
+        Rebuilds an embedding around the arrays of another one without
+        copying them, e.g. views of shared memory in a worker process.
+        """
+        embedding = cls.__new__(cls)
+        embedding.ids = arrays["ids"]
+        embedding.rows = {int(caravan_id): row for row, caravan_id in enumerate(embedding.ids)}
+        embedding.amenities = list(amenities)
+        embedding.amenity_flags = arrays["amenity_flags"]
+        embedding.numeric = arrays["numeric"]
+        embedding.matrix = arrays["matrix"]
+        embedding._amenity_weight = float(arrays["weights"][0])
+        embedding._weights = arrays["weights"][1:]
+        return embedding
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows_of(self, caravan_ids: Iterable[int]) -> List[int]:
+        """
+        The matrix rows of the caravans still in the catalog.
+        """
+        return [row for row in map(self.rows.get, caravan_ids) if row is not None]
+
+    def queries(self, histories: Sequence[Sequence[int]]) -> "np.ndarray":
+        """
+        One query vector per history of matrix rows, averaging the stays;
+        all histories must be non-empty. Repeated stays count repeatedly.
+        """
+        lengths = np.fromiter((len(rows) for rows in histories), dtype=np.int64, count=len(histories))
+        rows = np.fromiter((row for history in histories for row in history), dtype=np.int64, count=int(lengths.sum()))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        counts = lengths[:, None].astype(np.float32)
+
+        preferred = np.add.reduceat(self.amenity_flags[rows], starts, axis=0) / counts
+        norms = np.linalg.norm(preferred, axis=1, keepdims=True)
+        preferred = np.divide(preferred, norms, out=np.zeros_like(preferred), where=norms > 0)
+        centre = np.add.reduceat(self.numeric[rows], starts, axis=0) / counts
+        return np.hstack([
+            self._amenity_weight * preferred,
+            2.0 * centre * self._weights,
+            np.ones((len(histories), 1), dtype=np.float32),
+        ]).astype(np.float32)
+
+    def top_k(
+        self, queries: "np.ndarray", k: int, exclude: Optional[Sequence[Sequence[int]]] = None
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Scores the catalog for a batch of queries with one matrix product and
+        returns the rows and scores of the best `k` per query, best first.
+        Rows in `exclude[i]` are skipped for query i; where fewer than `k`
+        rows remain, the tail is padded with row -1.
+        """
+        k = max(0, min(k, len(self)))
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        scores = queries @ self.matrix.T
+        if exclude is not None:
+            for position, rows in enumerate(exclude):
+                scores[position, rows] = -np.inf
+        if k < len(self):
+            best = np.argpartition(scores, len(self) - k, axis=1)[:, len(self) - k:]
+        else:
+            best = np.broadcast_to(np.arange(len(self)), scores.shape).copy()
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best[np.isneginf(best_scores)] = -1
+        return best, best_scores
+
+class RecommendationEngine:
+    """
+    Ranks the whole catalog for each user by similarity to their past stays,
+    instead of requiring every amenity they ever had and a narrow price band.
+    Users without stays get the top-rated caravans.
+
+    The embedding is rebuilt on first use after the catalog changed, for
+    repositories that expose a version (the in-memory one); otherwise call
+    refresh() after changing caravans.
+    """
+    def __init__(
+        self,
+        caravan_repo: CaravanRepository,
+        reservation_repo: ReservationRepository,
+        exclude_visited: bool = True,
+        batch_size: int = 256,
+        **weights: float,
+    ):
+        self._caravan_repo = caravan_repo
+        self._reservation_repo = reservation_repo
+        self._exclude_visited = exclude_visited
+        self._batch_size = max(1, batch_size)
+        self._weights = weights
+        self._embedding: Optional[CaravanEmbedding] = None
+        self._embedded_version: Optional[int] = None
+
+    def refresh(self) -> CaravanEmbedding:
+        self._embedded_version = getattr(self._caravan_repo, "version", None)
+        self._embedding = CaravanEmbedding(self._caravan_repo.get_all(), **self._weights)
+        return self._embedding
+
+    @property
+    def embedding(self) -> CaravanEmbedding:
+        if self._embedding is None or self._embedded_version != getattr(self._caravan_repo, "version", None):
+            return self.refresh()
+        return self._embedding
+
+    def recommend(self, user_id: int, limit: int = 5) -> List[Caravan]:
+        return self.recommend_many([user_id], limit)[user_id]
+
+    def recommend_many(self, user_ids: Iterable[int], limit: int = 5) -> Dict[int, List[Caravan]]:
+        """
+        Recommendations for several users, scored `batch_size` users per
+        matrix product. Cancelled and rejected reservations are not stays.
+        """
+        embedding = self.embedding
+        histories = {
+            user_id: embedding.rows_of(
+                reservation.caravan_id for reservation in self._reservation_repo.find_by_user_id(user_id)
+                if reservation.status not in INACTIVE_STATUSES
+            )
+            for user_id in dict.fromkeys(user_ids)
+        }
+        with_history = [user_id for user_id, rows in histories.items() if rows]
+        popular = self._caravan_repo.get_popular_caravans(limit) if len(with_history) < len(histories) else []
+        recommendations = {user_id: list(popular) for user_id in histories}
+
+        for start in range(0, len(with_history), self._batch_size):
+            batch = with_history[start:start + self._batch_size]
+            rows = [histories[user_id] for user_id in batch]
+            best, _ = embedding.top_k(embedding.queries(rows), limit, rows if self._exclude_visited else None)
+            for user_id, user_best in zip(batch, best):
+                caravan_ids = [int(embedding.ids[row]) for row in user_best if row >= 0]
+                recommendations[user_id] = [caravan for caravan in self._caravan_repo.get_many(caravan_ids) if caravan]
+        return recommendations
@@ -1,22 +1,32 @@
-from typing import List, Dict
+from typing import List, Optional
 from src.models import Caravan, Reservation
 from src.repositories import CaravanRepository, ReservationRepository
+from .recommendation_engine import RecommendationEngine
 
 class RecommendationService:
     def __init__(
         self,
         caravan_repo: CaravanRepository,
         reservation_repo: ReservationRepository,
+        engine: Optional[RecommendationEngine] = None,
     ):
+        """
+        With an `engine`, personalized recommendations rank the whole catalog
+        by similarity to the user's stays instead of filtering it.
+        """
         self._caravan_repo = caravan_repo
         self._reservation_repo = reservation_repo
+        self._engine = engine
 
     def get_personalized_recommendations(self, user_id: int, limit: int = 5) -> List[Caravan]:
+        if self._engine is not None:
+            return self._engine.recommend(user_id, limit)
+
         user_reservations = self._reservation_repo.find_by_user_id(user_id)
 
         if not user_reservations:
             # If no reservation history, recommend top-rated caravans
-            return self._caravan_repo.search(sort_by_rating=True)[:limit]
+            return self._caravan_repo.get_popular_caravans(limit)
 
         # Analyze user preferences from past reservations
         preferred_amenities = set()
@@ -56,21 +66,4 @@ class RecommendationService:
         """
         Get a list of popular host IDs, sorted by the average rating of their caravans.
         """
-        all_caravans = self._caravan_repo.get_all()
-        
-        host_ratings: Dict[int, List[float]] = {}
-        for caravan in all_caravans:
-            if caravan.host_id not in host_ratings:
-                host_ratings[caravan.host_id] = []
-            host_ratings[caravan.host_id].append(caravan.average_rating)
-        
-        # Calculate average rating for each host
-        average_host_ratings: Dict[int, float] = {
-            host_id: sum(ratings) / len(ratings) 
-            for host_id, ratings in host_ratings.items() if ratings
-        }
-        
-        # Sort hosts by their average rating
-        popular_hosts = sorted(average_host_ratings.items(), key=lambda item: item[1], reverse=True)
-        
-        return [host_id for host_id, _ in popular_hosts[:limit]]
+        return self._caravan_repo.get_popular_host_ids(limit)
@@ -1,13 +1,127 @@
+from dataclasses import dataclass, replace
 from datetime import date
-from typing import Optional
-from src.models import Reservation
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.models import Caravan, Reservation, User
 from src.repositories import ReservationRepository
+from src.repositories.interval_index import IntervalIndex
 from src.validators import ReservationValidator
 from src.strategies import DiscountStrategy, NoDiscount, FeeStrategy
 from src.observers import ReservationPublisher
 from src.factories import ReservationFactory
-from src.exceptions import NotFoundError
+from src.exceptions import (
+    CaravanShareException, ConcurrentUpdateError, DuplicateReservationError, InsufficientFundsError, NotFoundError
+)
 from .payment_service import PaymentService
+from .optimistic import set_status, update_with_retry
+
+@dataclass
+class ReservationRequest:
+    """One booking of a batch passed to ReservationService.create_reservations."""
+    user_id: int
+    caravan_id: int
+    start_date: date
+    end_date: date
+    price: float
+    discount_strategy: Optional[DiscountStrategy] = None
+
+@dataclass
+class ReservationResult:
+    """The outcome of one ReservationRequest: the paid reservation, or why it was refused."""
+    request: ReservationRequest
+    reservation: Optional[Reservation] = None
+    error: Optional[CaravanShareException] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.reservation is not None
+
+def final_price(price: float, discount_strategy: Optional[DiscountStrategy] = None) -> float:
+    """
+    The price after the discount; no strategy means no discount.
+    """
+    return price - (discount_strategy or NoDiscount()).calculate_discount(price)
+
+def group_requests(
+    results: List[ReservationResult], users: Dict[int, User], caravans: Dict[int, Caravan]
+) -> Dict[int, List[Tuple[date, date]]]:
+    """
+    Refuses the requests for unknown users or caravans and groups the date
+    ranges of the others by caravan, so each caravan's bookings are fetched once.
+    """
+    date_ranges: Dict[int, List[Tuple[date, date]]] = {}
+    for result in results:
+        request = result.request
+        if request.user_id not in users:
+            result.error = NotFoundError("User", request.user_id)
+        elif request.caravan_id not in caravans:
+            result.error = NotFoundError("Caravan", request.caravan_id)
+        else:
+            date_ranges.setdefault(request.caravan_id, []).append((request.start_date, request.end_date))
+    return date_ranges
+
+def accept_requests(
+    results: List[ReservationResult],
+    users: Dict[int, User],
+    taken_dates: Dict[int, IntervalIndex],
+    factory: ReservationFactory,
+) -> List[Tuple[ReservationResult, Reservation]]:
+    """
+    Checks the requests in order against the taken dates and remaining
+    balances, recording refusals on the results. Returns the accepted
+    results with their new, not yet stored, reservations.
+    """
+    remaining_balances = {user_id: user.balance for user_id, user in users.items()}
+    accepted: List[Tuple[ReservationResult, Reservation]] = []
+    for position, result in enumerate(results):
+        if result.error is not None:
+            continue
+        request = result.request
+        price = final_price(request.price, request.discount_strategy)
+
+        taken = taken_dates[request.caravan_id]
+        if taken.overlapping(request.start_date, request.end_date):
+            result.error = DuplicateReservationError("Caravan is already reserved for the given dates.")
+            continue
+        if remaining_balances[request.user_id] < price:
+            result.error = InsufficientFundsError("User has insufficient funds.")
+            continue
+        # Negative keys keep the batch's bookings apart from existing reservation ids.
+        taken.insert(-(position + 1), request.start_date, request.end_date)
+        remaining_balances[request.user_id] -= price
+        accepted.append((result, factory.create_reservation(
+            user_id=request.user_id,
+            caravan_id=request.caravan_id,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            price=price,
+        )))
+    return accepted
+
+def bookings_by_user(reservations: List[Reservation]) -> Dict[int, List[Reservation]]:
+    bookings: Dict[int, List[Reservation]] = {}
+    for reservation in reservations:
+        bookings.setdefault(reservation.user_id, []).append(reservation)
+    return bookings
+
+def split_paid(
+    accepted: List[Tuple[ReservationResult, Reservation]],
+    created_reservations: List[Reservation],
+    payment_errors: Dict[int, CaravanShareException],
+) -> Tuple[List[Tuple[ReservationResult, Reservation]], List[int]]:
+    """
+    Records each failed user's payment error on their results. Returns the
+    other results with paid copies of their reservations, and the ids of the
+    unpaid reservations, which must not keep holding their dates.
+    """
+    paid: List[Tuple[ReservationResult, Reservation]] = []
+    unpaid_ids: List[int] = []
+    for (result, _), reservation in zip(accepted, created_reservations):
+        if reservation.user_id in payment_errors:
+            result.error = payment_errors[reservation.user_id]
+            unpaid_ids.append(reservation.id)
+        else:
+            paid.append((result, replace(reservation, status="paid")))
+    return paid, unpaid_ids
 
 class ReservationService:
     def __init__(
@@ -32,75 +146,136 @@ class ReservationService:
         # Validate inputs
         user = self._validator.validate_user_exists(user_id)
         self._validator.validate_caravan_exists(caravan_id)
-        self._validator.validate_no_duplicate_reservations(caravan_id, start_date, end_date)
-
-        if discount_strategy is None:
-            discount_strategy = NoDiscount()
-
-        discount = discount_strategy.calculate_discount(price)
-        final_price = price - discount
-
-        # Create reservation object using the factory
-        new_reservation = self._factory.create_reservation(
-            user_id=user_id,
-            caravan_id=caravan_id,
-            start_date=start_date,
-            end_date=end_date,
-            price=final_price,
-        )
-        
-        # Add reservation to repo to get a real ID
-        created_reservation = self._reservation_repo.add(new_reservation)
-
-        # Process payment
-        self._payment_service.process_payment(
-            user=user,
-            reservation_id=created_reservation.id,
-            amount=final_price,
-            fee_strategy=fee_strategy
-        )
-
-        # Update reservation status
-        created_reservation.status = "paid"
-        self._reservation_repo.update(created_reservation)
+
+        price = final_price(price, discount_strategy)
+
+        # Check the dates and claim them in one step per caravan; once added,
+        # the pending reservation blocks its dates for concurrent bookings.
+        with self._reservation_repo.lock_caravans([caravan_id]):
+            self._validator.validate_no_duplicate_reservations(caravan_id, start_date, end_date)
+
+            # Create reservation object using the factory
+            new_reservation = self._factory.create_reservation(
+                user_id=user_id,
+                caravan_id=caravan_id,
+                start_date=start_date,
+                end_date=end_date,
+                price=price,
+            )
+
+            # Add reservation to repo to get a real ID
+            created_reservation = self._reservation_repo.add(new_reservation)
+
+        # Process payment; if it fails, the pending reservation must not keep blocking its dates.
+        try:
+            self._payment_service.process_payment(
+                user=user,
+                reservation_id=created_reservation.id,
+                amount=price,
+                fee_strategy=fee_strategy
+            )
+        except Exception:
+            self._reservation_repo.delete(created_reservation.id)
+            raise
+
+        # Update reservation status on the stored version, which another
+        # write may have replaced since the add.
+        created_reservation = self._transition(created_reservation.id, "paid")
 
         # Notify observers
         self._publisher.notify("reservation_created", created_reservation)
 
         return created_reservation
 
-    def _get_reservation_or_fail(self, reservation_id: int) -> Reservation:
-        reservation = self._reservation_repo.get_by_id(reservation_id)
-        if not reservation:
-            raise NotFoundError("Reservation", reservation_id)
-        return reservation
+    def create_reservations(
+        self, requests: Iterable[ReservationRequest], fee_strategy: Optional[FeeStrategy] = None
+    ) -> List[ReservationResult]:
+        """
+        Creates a batch of reservations and returns one result per request, in order.
+
+        Users and caravans are looked up once, each caravan's existing bookings
+        are fetched once, and requests are checked in order so an earlier
+        request of the batch wins over a later one for the same dates. Every
+        user is debited once for all their accepted bookings, and the created
+        reservations and payments are announced as batches. A refused request,
+        or a user whose payment fails, does not affect the others.
+        """
+        requests = list(requests)
+        results = [ReservationResult(request) for request in requests]
+        users = self._validator.find_existing_users(request.user_id for request in requests)
+        caravans = self._validator.find_existing_caravans(request.caravan_id for request in requests)
+        date_ranges = group_requests(results, users, caravans)
+
+        # Hold every caravan of the batch from reading its bookings until the new ones are added.
+        with self._reservation_repo.lock_caravans(date_ranges):
+            taken_dates = {
+                caravan_id: self._validator.find_taken_dates(caravan_id, ranges)
+                for caravan_id, ranges in date_ranges.items()
+            }
+            accepted = accept_requests(results, users, taken_dates, self._factory)
+            if not accepted:
+                return results
+            created_reservations = self._reservation_repo.add_many(reservation for _, reservation in accepted)
+
+        # Each user is charged on their own: a balance that fell short since the
+        # check above fails that user's bookings, not the whole batch.
+        payment_errors: Dict[int, CaravanShareException] = {}
+        for user_id, bookings in bookings_by_user(created_reservations).items():
+            try:
+                self._payment_service.process_payments(
+                    [(users[user_id], reservation.id, reservation.price) for reservation in bookings],
+                    fee_strategy=fee_strategy,
+                )
+            except CaravanShareException as error:
+                payment_errors[user_id] = error
+
+        paid, unpaid_ids = split_paid(accepted, created_reservations, payment_errors)
+        if unpaid_ids:
+            self._reservation_repo.delete_many(unpaid_ids)
+        if paid:
+            paid_reservations = self._store_paid([reservation for _, reservation in paid])
+            for (result, _), reservation in zip(paid, paid_reservations):
+                result.reservation = reservation
+            self._publisher.notify_many("reservation_created", paid_reservations)
+        return results
+
+    def _store_paid(self, reservations: List[Reservation]) -> List[Reservation]:
+        """
+        Stores the paid copies in one batch write. If another write changed
+        any of them since they were added, the repository refuses the whole
+        batch, and each one is set to paid with retries instead.
+        """
+        try:
+            self._reservation_repo.update_many(reservations)
+            return reservations
+        except ConcurrentUpdateError:
+            return [self._transition(reservation.id, "paid") for reservation in reservations]
+
+    def _transition(self, reservation_id: int, status: str) -> Reservation:
+        """
+        Sets the reservation's status with compare-and-set retries, so a
+        concurrent write to the same reservation is never silently undone.
+        """
+        return update_with_retry(self._reservation_repo, reservation_id, set_status(status), "Reservation")
 
     def approve_reservation(self, reservation_id: int) -> Reservation:
-        reservation = self._get_reservation_or_fail(reservation_id)
-        reservation.status = "approved"
-        self._reservation_repo.update(reservation)
+        reservation = self._transition(reservation_id, "approved")
         self._publisher.notify("reservation_approved", reservation)
         return reservation
 
     def reject_reservation(self, reservation_id: int) -> Reservation:
-        reservation = self._get_reservation_or_fail(reservation_id)
-        reservation.status = "rejected"
-        self._reservation_repo.update(reservation)
+        reservation = self._transition(reservation_id, "rejected")
         self._publisher.notify("reservation_rejected", reservation)
         return reservation
 
     def cancel_reservation(self, reservation_id: int) -> Reservation:
-        reservation = self._get_reservation_or_fail(reservation_id)
         # In a real app, you might have logic here to check if cancellation is allowed,
         # and to process a refund via the PaymentService.
-        reservation.status = "cancelled"
-        self._reservation_repo.update(reservation)
+        reservation = self._transition(reservation_id, "cancelled")
         self._publisher.notify("reservation_cancelled", reservation)
         return reservation
 
     def complete_reservation(self, reservation_id: int) -> Reservation:
-        reservation = self._get_reservation_or_fail(reservation_id)
-        reservation.status = "completed"
-        self._reservation_repo.update(reservation)
+        reservation = self._transition(reservation_id, "completed")
         self._publisher.notify("review_requested", reservation)
         return reservation
@@ -1,6 +1,7 @@
 from typing import List
 from src.models import Review, User
 from src.repositories import ReviewRepository, UserRepository
+from .optimistic import update_with_retry
 
 class ReviewService:
     def __init__(
@@ -19,13 +20,12 @@ class ReviewService:
         """
         Determines if a user is a trusted reviewer based on review count and average rating.
         """
-        user_reviews = self._review_repo.find_by_author_id(user_id)
+        review_count, total_rating = self._review_repo.get_author_rating_summary(user_id)
 
-        if len(user_reviews) < self._min_reviews_for_badge:
+        if review_count < self._min_reviews_for_badge:
             return False
 
-        total_rating = sum(review.rating for review in user_reviews)
-        average_rating = total_rating / len(user_reviews)
+        average_rating = total_rating / review_count
 
         if average_rating < self._min_average_rating_for_badge:
             return False
@@ -39,9 +39,10 @@ class ReviewService:
         """
         user = self._user_repo.get_by_id(user_id)
         if user:
-            if self.is_trusted_reviewer(user_id):
-                user.is_trusted_reviewer = True
-                self._user_repo.update(user)
-            else:
-                user.is_trusted_reviewer = False
-                self._user_repo.update(user)
\ No newline at end of file
+            is_trusted = self.is_trusted_reviewer(user_id)
+
+            def set_badge(user: User) -> None:
+                user.is_trusted_reviewer = is_trusted
+
+            # Set with compare-and-set, so a concurrent balance change is not overwritten.
+            update_with_retry(self._user_repo, user_id, set_badge, "User")
\ No newline at end of file
@@ -0,0 +1,89 @@
+from datetime import date
+from typing import List, Optional
+from src.models import Caravan
+from src.repositories import CaravanRepository, ReservationRepository, SearchPlan
+
+class SearchService:
+    """
+    One entry point for "near here, in this price range, with these
+    amenities, free on these dates" searches.
+    """
+    def __init__(self, caravan_repo: CaravanRepository, reservation_repo: ReservationRepository):
+        self._caravan_repo = caravan_repo
+        self._reservation_repo = reservation_repo
+
+    def search(
+        self,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius: Optional[float] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        required_amenities: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        sort_by_rating: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Caravan]:
+        """
+        Returns the matching caravans. The location filter needs all of
+        latitude, longitude and radius (km); the availability filter needs
+        both dates and is checked last, only for caravans passing the others.
+        """
+        self._check_arguments(latitude, longitude, radius, start_date, end_date, limit, offset)
+        available = None
+        if start_date is not None:
+            available = lambda caravan_ids: self._reservation_repo.filter_available(caravan_ids, start_date, end_date)
+        return self._caravan_repo.find_matching(
+            latitude=latitude,
+            longitude=longitude,
+            radius=radius,
+            min_price=min_price,
+            max_price=max_price,
+            required_amenities=required_amenities,
+            min_rating=min_rating,
+            sort_by_rating=sort_by_rating,
+            available=available,
+            limit=limit,
+            offset=offset,
+        )
+
+    def explain(
+        self,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius: Optional[float] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        required_amenities: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+    ) -> SearchPlan:
+        """
+        Returns the plan search() would follow for these filters.
+        """
+        self._check_arguments(latitude, longitude, radius)
+        return self._caravan_repo.plan_search(
+            latitude, longitude, radius, min_price, max_price, required_amenities, min_rating
+        )
+
+    @staticmethod
+    def _check_arguments(
+        latitude: Optional[float],
+        longitude: Optional[float],
+        radius: Optional[float],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> None:
+        location = (latitude, longitude, radius)
+        if None in location and any(value is not None for value in location):
+            raise ValueError("A location search needs latitude, longitude and radius together.")
+        if (start_date is None) != (end_date is None):
+            raise ValueError("An availability search needs both a start and an end date.")
+        if start_date is not None and start_date > end_date:
+            raise ValueError("The start date must not be after the end date.")
+        if (limit is not None and limit < 0) or offset < 0:
+            raise ValueError("Limit and offset must not be negative.")
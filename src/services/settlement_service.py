@@ -1,6 +1,9 @@
-from typing import List
-from src.models import Payment, Settlement, User
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, List, Optional
+from src.models import Payment, Settlement
 from src.repositories import PaymentRepository, SettlementRepository, UserRepository
+from src.observers import PayoutLedger
 from src.exceptions import NotFoundError
 
 class SettlementService:
@@ -9,49 +12,110 @@ class SettlementService:
         payment_repo: PaymentRepository,
         settlement_repo: SettlementRepository,
         user_repo: UserRepository,
+        ledger: Optional[PayoutLedger] = None,
     ):
+        """
+        With a `ledger` subscribed to the payment publisher, each host is paid
+        exactly the payments for their own caravans, found without a scan.
+        """
         self._payment_repo = payment_repo
         self._settlement_repo = settlement_repo
         self._user_repo = user_repo
+        self._ledger = ledger
 
     def settle_for_host(self, host_id: int) -> Settlement:
         host = self._user_repo.get_by_id(host_id)
         if not host or not host.is_host:
             raise NotFoundError("Host", host_id)
 
-        # Find all paid and unsettled payments for this host's caravans
-        payments_to_settle: List[Payment] = []
-        total_payout_amount = 0.0
-        payment_ids: List[int] = []
-
-        for payment in self._payment_repo.get_all():
-            if payment.status == "paid" and not payment.settled:
-                # In a real app, we'd need to link payment to reservation, then reservation to caravan, then caravan to host.
-                # For simplicity, let's assume we can directly find payments for a host.
-                # This is a simplification for the demo.
-                # A more robust solution would involve querying reservations by host_id and then finding associated payments.
-                # For now, we'll just mark any paid, unsettled payment as eligible for settlement.
-                # This needs to be improved to correctly link payments to a specific host.
-                # For now, let's assume all payments are for the current host for demo purposes.
-                # This is a major simplification.
-                payments_to_settle.append(payment)
-                total_payout_amount += (payment.amount - payment.platform_fee)
-                payment_ids.append(payment.id)
-        
-        if not payments_to_settle:
+        if self._ledger is not None:
+            payments = self._ledger.take(host_id)
+            settlements = self._settle_partition({host_id: payments}) if payments else []
+        else:
+            # In a real app, we'd need to link payment to reservation, then reservation to caravan, then caravan to host.
+            # For now, any completed, unsettled payment is treated as belonging to this host.
+            # This is a major simplification for the demo.
+            payments = self._payment_repo.find_by_status("completed", settled=False)
+            settlements = self._settle_many({host_id: payments}) if payments else []
+        if not settlements:
             raise ValueError(f"No unsettled payments found for host {host_id}.")
+        return settlements[0]
 
-        new_settlement = Settlement(
-            id=0,
-            host_id=host_id,
-            amount=total_payout_amount,
-            payment_ids=payment_ids,
-        )
-        created_settlement = self._settlement_repo.add(new_settlement)
+    def _settle_many(self, pending: Dict[int, List[Payment]]) -> List[Settlement]:
+        """
+        Stores one settlement per host and marks their payments settled, one
+        batch write each. The payments are read again first, and any refunded
+        or settled since they were found are left out. The settled copies are
+        written with a version check, so if a payment changes in between the
+        batch fails and the settlements just stored are deleted again.
+        """
+        payment_ids = [payment.id for payments in pending.values() for payment in payments]
+        current = {payment.id: payment for payment in self._payment_repo.get_many(payment_ids) if payment is not None}
+        due: Dict[int, List[Payment]] = {}
+        for host_id, payments in pending.items():
+            for payment in payments:
+                stored = current.get(payment.id)
+                if stored is not None and stored.status == "completed" and not stored.settled:
+                    due.setdefault(host_id, []).append(replace(stored, settled=True))
+        if not due:
+            return []
 
-        # Mark payments as settled
-        for payment in payments_to_settle:
-            payment.settled = True
-            self._payment_repo.update(payment)
+        settlements = [
+            Settlement(
+                id=0,
+                host_id=host_id,
+                amount=sum(payment.amount - payment.platform_fee for payment in payments),
+                payment_ids=[payment.id for payment in payments],
+            )
+            for host_id, payments in due.items()
+        ]
+        created = self._settlement_repo.add_many(settlements)
+        try:
+            self._payment_repo.update_many([payment for payments in due.values() for payment in payments])
+        except Exception:
+            self._settlement_repo.delete_many(settlement.id for settlement in created)
+            raise
+        return created
 
-        return created_settlement
+    def settle_all_hosts(self, workers: int = 1, partition_size: int = 1000) -> List[Settlement]:
+        """
+        Settles every host with pending payments in one pass over the ledger.
+        With `workers` > 1, partitions of `partition_size` hosts are written
+        from a thread pool; every repository write is atomic and payments are
+        marked settled with a version check, so partitions cannot clash.
+        """
+        if self._ledger is None:
+            raise RuntimeError("Settling all hosts requires a payout ledger.")
+        pending = self._ledger.take_all()
+        host_ids = list(pending)
+        partition_size = max(1, partition_size)
+        partitions = [
+            {host_id: pending[host_id] for host_id in host_ids[start:start + partition_size]}
+            for start in range(0, len(host_ids), partition_size)
+        ]
+
+        settlements: List[Settlement] = []
+        if workers <= 1:
+            for number, partition in enumerate(partitions):
+                try:
+                    settlements.extend(self._settle_partition(partition))
+                except Exception:
+                    for remaining in partitions[number + 1:]:
+                        self._restore(remaining)
+                    raise
+            return settlements
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="settlement") as executor:
+            for created in executor.map(self._settle_partition, partitions):
+                settlements.extend(created)
+        return settlements
+
+    def _settle_partition(self, partition: Dict[int, List[Payment]]) -> List[Settlement]:
+        try:
+            return self._settle_many(partition)
+        except Exception:
+            self._restore(partition)
+            raise
+
+    def _restore(self, partition: Dict[int, List[Payment]]) -> None:
+        for host_id, payments in partition.items():
+            self._ledger.restore(host_id, payments)
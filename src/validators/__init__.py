@@ -1,3 +1,4 @@
 from .reservation_validator import ReservationValidator
+from .async_reservation_validator import AsyncReservationValidator
 
-__all__ = ["ReservationValidator"]
+__all__ = ["ReservationValidator", "AsyncReservationValidator"]
@@ -0,0 +1,58 @@
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+from src.models import Caravan, User
+from src.repositories import AsyncRepository, AsyncReservationRepository
+from src.repositories.interval_index import IntervalIndex
+from src.exceptions import NotFoundError, DuplicateReservationError
+
+class AsyncReservationValidator:
+    """
+    ReservationValidator for awaitable repositories, applying the same checks.
+    """
+    def __init__(
+        self,
+        user_repo: AsyncRepository,
+        caravan_repo: AsyncRepository,
+        reservation_repo: AsyncReservationRepository,
+    ):
+        self._user_repo = user_repo
+        self._caravan_repo = caravan_repo
+        self._reservation_repo = reservation_repo
+
+    async def validate_user_exists(self, user_id: int):
+        user = await self._user_repo.get_by_id(user_id)
+        if not user:
+            raise NotFoundError("User", user_id)
+        return user
+
+    async def validate_caravan_exists(self, caravan_id: int):
+        caravan = await self._caravan_repo.get_by_id(caravan_id)
+        if not caravan:
+            raise NotFoundError("Caravan", caravan_id)
+        return caravan
+
+    async def validate_no_duplicate_reservations(self, caravan_id: int, start_date: date, end_date: date):
+        existing_reservations = await self._reservation_repo.find_by_caravan_and_dates(
+            caravan_id, start_date, end_date
+        )
+        if existing_reservations:
+            raise DuplicateReservationError("Caravan is already reserved for the given dates.")
+
+    async def find_existing_users(self, user_ids: Iterable[int]) -> Dict[int, User]:
+        user_ids = list(dict.fromkeys(user_ids))
+        return {user.id: user for user in await self._user_repo.get_many(user_ids) if user}
+
+    async def find_existing_caravans(self, caravan_ids: Iterable[int]) -> Dict[int, Caravan]:
+        caravan_ids = list(dict.fromkeys(caravan_ids))
+        return {caravan.id: caravan for caravan in await self._caravan_repo.get_many(caravan_ids) if caravan}
+
+    async def find_taken_dates(self, caravan_id: int, date_ranges: List[Tuple[date, date]]) -> IntervalIndex:
+        taken = IntervalIndex()
+        if date_ranges:
+            existing = await self._reservation_repo.find_by_caravan_and_dates(
+                caravan_id, min(start for start, _ in date_ranges), max(end for _, end in date_ranges)
+            )
+            taken.insert_many(
+                (reservation.id, reservation.start_date, reservation.end_date) for reservation in existing
+            )
+        return taken
@@ -1,5 +1,8 @@
 from datetime import date
+from typing import Dict, Iterable, List, Tuple
+from src.models import Caravan, User
 from src.repositories import UserRepository, CaravanRepository, ReservationRepository
+from src.repositories.interval_index import IntervalIndex
 from src.exceptions import NotFoundError, DuplicateReservationError
 
 class ReservationValidator:
@@ -31,3 +34,30 @@ class ReservationValidator:
         )
         if existing_reservations:
             raise DuplicateReservationError("Caravan is already reserved for the given dates.")
+
+    def find_existing_users(self, user_ids: Iterable[int]) -> Dict[int, User]:
+        """
+        Looks the users up in one call and returns those that exist, by id.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        return {user.id: user for user in self._user_repo.get_many(user_ids) if user}
+
+    def find_existing_caravans(self, caravan_ids: Iterable[int]) -> Dict[int, Caravan]:
+        caravan_ids = list(dict.fromkeys(caravan_ids))
+        return {caravan.id: caravan for caravan in self._caravan_repo.get_many(caravan_ids) if caravan}
+
+    def find_taken_dates(self, caravan_id: int, date_ranges: List[Tuple[date, date]]) -> IntervalIndex:
+        """
+        Fetches, in one query, the caravan's active reservations over the span of
+        the given date ranges and returns them as an interval index, so a batch
+        of requests can be checked against it (and added to it) one by one.
+        """
+        taken = IntervalIndex()
+        if date_ranges:
+            existing = self._reservation_repo.find_by_caravan_and_dates(
+                caravan_id, min(start for start, _ in date_ranges), max(end for _, end in date_ranges)
+            )
+            taken.insert_many(
+                (reservation.id, reservation.start_date, reservation.end_date) for reservation in existing
+            )
+        return taken
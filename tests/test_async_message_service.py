@@ -0,0 +1,48 @@
+import unittest
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import User
+from src.repositories import AsyncRepository, MessageRepository, UserRepository
+from src.services import AsyncMessageService
+from src.observers import AsyncMessagePublisher, Subscriber
+from src.exceptions import NotFoundError
+
+class Inbox(Subscriber):
+    def __init__(self):
+        self.received = []
+
+    def update(self, publisher, event, data):
+        self.received.append((event, data.content))
+
+class TestAsyncMessageService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        users = UserRepository()
+        self.messages = MessageRepository()
+        self.publisher = AsyncMessagePublisher()
+        self.inbox = Inbox()
+        self.publisher.subscribe(self.inbox)
+        self.service = AsyncMessageService(AsyncRepository(self.messages), AsyncRepository(users), self.publisher)
+        self.sender = users.add(User(id=0, name="Guest", contact="", is_host=False))
+        self.recipient = users.add(User(id=0, name="Host", contact="", is_host=True))
+
+    async def test_send_message(self):
+        message = await self.service.send_message(self.sender.id, self.recipient.id, "Hello")
+
+        self.assertEqual(self.messages.get_by_id(message.id), message)
+        self.assertEqual(self.inbox.received, [("message_sent", "Hello")])
+
+    async def test_unknown_sender_or_recipient(self):
+        with self.assertRaises(NotFoundError):
+            await self.service.send_message(999, self.recipient.id, "Hello")
+        with self.assertRaises(NotFoundError):
+            await self.service.send_message(self.sender.id, 999, "Hello")
+        self.assertEqual(self.messages.get_all(), [])
+        self.assertEqual(self.inbox.received, [])
+
+if __name__ == '__main__':
+    unittest.main()
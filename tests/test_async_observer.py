@@ -0,0 +1,65 @@
+import unittest
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.observers import AsyncPublisher, AsyncSubscriber, Subscriber, ThreadPoolDispatcher
+
+class RecordingSubscriber(Subscriber):
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+
+    def update(self, publisher, event, data):
+        self.log.append((self.name, event, data))
+
+class AsyncRecordingSubscriber(AsyncSubscriber):
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+
+    async def update(self, publisher, event, data):
+        self.log.append((self.name, event, data))
+
+class TestAsyncPublisher(unittest.IsolatedAsyncioTestCase):
+
+    async def test_notifies_sync_and_async_subscribers_in_order(self):
+        log = []
+        publisher = AsyncPublisher()
+        publisher.subscribe(AsyncRecordingSubscriber(log, "async"))
+        publisher.subscribe(RecordingSubscriber(log, "sync"))
+
+        await publisher.notify("created", 1)
+        await publisher.notify_many("created", [2, 3])
+        await publisher.notify_many("created", [])
+
+        self.assertEqual(log, [
+            ("async", "created", 1), ("sync", "created", 1),
+            ("async", "created", 2), ("async", "created", 3),
+            ("sync", "created", 2), ("sync", "created", 3),
+        ])
+        self.assertTrue(await publisher.flush())
+
+    async def test_dispatcher_delivers_to_sync_subscribers(self):
+        dispatcher = ThreadPoolDispatcher(workers=2)
+        self.addCleanup(dispatcher.close)
+        log = []
+        publisher = AsyncPublisher(dispatcher=dispatcher)
+        subscriber = RecordingSubscriber(log, "sync")
+        publisher.subscribe(subscriber)
+        publisher.subscribe(subscriber)
+
+        await publisher.notify("created", 1)
+        await publisher.notify_many("created", [2, 3])
+        self.assertTrue(await publisher.flush(timeout=5))
+        self.assertEqual([data for _, _, data in log], [1, 2, 3])
+
+        publisher.unsubscribe(subscriber)
+        await publisher.notify("created", 4)
+        self.assertTrue(await publisher.flush(timeout=5))
+        self.assertEqual(len(log), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import unittest
+from dataclasses import replace
+from datetime import date, timedelta
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Reservation, User
+from src.repositories import AsyncReservationRepository, PaymentRepository, ReservationRepository, UserRepository
+from src.services import AsyncPaymentService
+from src.strategies import PercentageFee
+from src.observers import AsyncPaymentPublisher, AsyncSubscriber
+from src.exceptions import InsufficientFundsError, NotFoundError
+
+class YieldingRepository(AsyncReservationRepository):
+    """Lets other tasks run before every call, as a real network round trip would."""
+
+    async def _call(self, method, *args, **kwargs):
+        await asyncio.sleep(0)
+        return await super()._call(method, *args, **kwargs)
+
+class EventLog(AsyncSubscriber):
+    def __init__(self):
+        self.events = []
+
+    async def update(self, publisher, event, data):
+        self.events.append((event, data.status))
+
+class TestAsyncPaymentService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.users = UserRepository()
+        self.payments = PaymentRepository()
+        self.reservations = ReservationRepository()
+        self.publisher = AsyncPaymentPublisher()
+        self.log = EventLog()
+        self.publisher.subscribe(self.log)
+        self.service = AsyncPaymentService(
+            YieldingRepository(self.users), YieldingRepository(self.payments),
+            YieldingRepository(self.reservations), self.publisher,
+        )
+        self.user = self.users.add(User(id=0, name="Guest", contact="", is_host=False, balance=500.0))
+        self.reservation = self.reservations.add(Reservation(
+            id=0, user_id=self.user.id, caravan_id=1,
+            start_date=date.today() + timedelta(30), end_date=date.today() + timedelta(32), price=200.0,
+        ))
+
+    async def test_process_payment(self):
+        payment = await self.service.process_payment(self.user, self.reservation.id, 200.0, PercentageFee(10))
+
+        self.assertEqual(payment.platform_fee, 20.0)
+        self.assertEqual(self.user.balance, 300.0)
+        self.assertEqual(self.users.get_by_id(self.user.id).balance, 300.0)
+        self.assertEqual(self.log.events, [("payment_completed", "completed")])
+
+        with self.assertRaises(InsufficientFundsError):
+            await self.service.process_payment(self.user, self.reservation.id, 301.0, PercentageFee(10))
+        self.assertEqual(self.users.get_by_id(self.user.id).balance, 300.0)
+
+    async def test_concurrent_debits_are_not_lost(self):
+        declined = []
+
+        async def pay():
+            # Every task holds its own copy of the user, as separate requests would.
+            user = replace(self.user)
+            for _ in range(75):
+                try:
+                    await self.service.process_payment(user, self.reservation.id, 1.0, PercentageFee(0))
+                except InsufficientFundsError:
+                    declined.append(1)
+
+        await asyncio.gather(*(pay() for _ in range(8)))
+
+        self.assertEqual(len(declined), 100)
+        self.assertEqual(self.users.get_by_id(self.user.id).balance, 0.0)
+        self.assertEqual(len(self.payments.get_all()), 500)
+
+    async def test_process_payments(self):
+        other = self.users.add(User(id=0, name="Other", contact="", is_host=False, balance=50.0))
+        created = await self.service.process_payments(
+            [(self.user, 1, 100.0), (self.user, 2, 50.0), (other, 3, 50.0)], PercentageFee(0)
+        )
+        self.assertEqual(len(created), 3)
+        self.assertEqual((self.users.get_by_id(self.user.id).balance, self.users.get_by_id(other.id).balance), (350.0, 0.0))
+
+        with self.assertRaises(InsufficientFundsError):
+            await self.service.process_payments([(self.user, 1, 10.0), (other, 2, 1.0)], PercentageFee(0))
+        self.assertEqual(self.users.get_by_id(self.user.id).balance, 350.0)
+
+    async def test_a_payment_is_refunded_once(self):
+        await self.service.process_payment(self.user, self.reservation.id, 200.0, PercentageFee(0))
+
+        outcomes = await asyncio.gather(
+            self.service.refund_payment(self.reservation.id), self.service.refund_payment(self.reservation.id),
+            return_exceptions=True,
+        )
+
+        self.assertEqual(sum(isinstance(outcome, NotFoundError) for outcome in outcomes), 1)
+        self.assertEqual(self.users.get_by_id(self.user.id).balance, 500.0)
+        self.assertEqual(self.log.events[-1], ("payment_refunded", "refunded"))
+        with self.assertRaises(NotFoundError):
+            await self.service.refund_payment(self.reservation.id)
+
+if __name__ == '__main__':
+    unittest.main()
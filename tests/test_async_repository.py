@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import date
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Reservation, User
+from src.repositories import (
+    AsyncRepository, AsyncReservationRepository, ReservationRepository, SqliteDatabase, SqliteUserRepository, UserRepository
+)
+
+class TestAsyncRepository(unittest.IsolatedAsyncioTestCase):
+
+    def create_repository(self):
+        return AsyncRepository(UserRepository())
+
+    def setUp(self):
+        self.repo = self.create_repository()
+
+    async def test_crud(self):
+        alice = await self.repo.add(User(id=0, name="Alice", contact="", is_host=False))
+        bob, carol = await self.repo.add_many([
+            User(id=0, name="Bob", contact="", is_host=False), User(id=0, name="Carol", contact="", is_host=True)
+        ])
+        self.assertEqual(await self.repo.get_by_id(alice.id), alice)
+        self.assertEqual(await self.repo.get_many([carol.id, 999]), [carol, None])
+
+        bob.balance = 10.0
+        await self.repo.update(bob)
+        self.assertEqual((await self.repo.get_by_id(bob.id)).balance, 10.0)
+
+        await self.repo.delete_many([bob.id, carol.id])
+        self.assertEqual(await self.repo.get_all(), [alice])
+
+    async def test_finders_become_coroutines(self):
+        await self.repo.add(User(id=0, name="Alice", contact="alice@example.com", is_host=False))
+        self.assertEqual((await self.repo.find_by_contact("alice@example.com")).name, "Alice")
+        self.assertIsNone(await self.repo.find_by_name("Nobody"))
+        with self.assertRaises(AttributeError):
+            self.repo._data
+        with self.assertRaises(AttributeError):
+            self.repo.no_such_finder
+
+    async def test_compare_and_set(self):
+        alice = await self.repo.add(User(id=0, name="Alice", contact="", is_host=False))
+        fresh = await self.repo.get_by_id(alice.id)
+        self.assertTrue(await self.repo.compare_and_set(replace(fresh, balance=5.0), 0))
+        self.assertFalse(await self.repo.compare_and_set(replace(fresh, balance=6.0), 0))
+        self.assertEqual((await self.repo.get_by_id(alice.id)).balance, 5.0)
+
+class TestAsyncSqliteRepository(TestAsyncRepository):
+    """Blocking repositories run on an executor, off the event loop."""
+
+    def create_repository(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.executor.shutdown)
+        return AsyncRepository(SqliteUserRepository(SqliteDatabase()), self.executor)
+
+class TestAsyncReservationRepository(unittest.IsolatedAsyncioTestCase):
+
+    async def test_lock_caravans_serializes_tasks_per_caravan(self):
+        repo = AsyncReservationRepository(ReservationRepository(), lock_stripes=8)
+        events = []
+
+        async def book(name, caravan_id):
+            async with repo.lock_caravans([caravan_id]):
+                events.append(f"{name} in")
+                await asyncio.sleep(0.01)
+                events.append(f"{name} out")
+
+        await asyncio.gather(book("a", 1), book("b", 1))
+        self.assertEqual(events, ["a in", "a out", "b in", "b out"])
+
+        # Other stripes are not held up
+        events.clear()
+        await asyncio.gather(book("a", 1), book("b", 2))
+        self.assertEqual(events[:2], ["a in", "b in"])
+
+        added = await repo.add(Reservation(id=0, user_id=1, caravan_id=1, start_date=date(2025, 1, 1), end_date=date(2025, 1, 3), price=10))
+        self.assertEqual(await repo.find_by_caravan_and_dates(1, date(2025, 1, 2), date(2025, 1, 2)), [added])
+
+if __name__ == '__main__':
+    unittest.main()
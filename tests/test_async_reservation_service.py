@@ -0,0 +1,169 @@
+import asyncio
+import unittest
+from datetime import date, timedelta
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan, User
+from src.repositories import (
+    AsyncReservationRepository, CaravanRepository, PaymentRepository, ReservationRepository, UserRepository
+)
+from src.services import AsyncPaymentService, AsyncReservationService, ReservationRequest
+from src.validators import AsyncReservationValidator
+from src.strategies import PercentageDiscount, PercentageFee
+from src.observers import AsyncPaymentPublisher, AsyncReservationPublisher, AsyncSubscriber
+from src.factories import ReservationFactory
+from src.exceptions import DuplicateReservationError, InsufficientFundsError, NotFoundError
+
+class YieldingRepository(AsyncReservationRepository):
+    """Lets other tasks run before every call, as a real network round trip would."""
+
+    async def _call(self, method, *args, **kwargs):
+        await asyncio.sleep(0)
+        return await super()._call(method, *args, **kwargs)
+
+class EventLog(AsyncSubscriber):
+    def __init__(self):
+        self.events = []
+
+    async def update(self, publisher, event, data):
+        self.events.append((event, data.id))
+
+class TestAsyncReservationService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.users = UserRepository()
+        self.caravans = CaravanRepository()
+        self.reservations = ReservationRepository()
+        self.payments = PaymentRepository()
+        user_repo, caravan_repo, payment_repo = (
+            YieldingRepository(self.users), YieldingRepository(self.caravans), YieldingRepository(self.payments)
+        )
+        reservation_repo = YieldingRepository(self.reservations)
+        self.publisher = AsyncReservationPublisher()
+        self.log = EventLog()
+        self.publisher.subscribe(self.log)
+        self.service = AsyncReservationService(
+            reservation_repo,
+            AsyncPaymentService(user_repo, payment_repo, reservation_repo, AsyncPaymentPublisher()),
+            AsyncReservationValidator(user_repo, caravan_repo, reservation_repo),
+            self.publisher,
+            ReservationFactory(),
+        )
+        self.guest = self.users.add(User(id=0, name="Guest", contact="", is_host=False, balance=1000.0))
+        self.caravan = self.caravans.add(Caravan(id=0, host_id=0, name="Van", capacity=2, location=""))
+        self.start_date = date(2025, 7, 1)
+        self.end_date = date(2025, 7, 5)
+
+    async def test_create_reservation(self):
+        reservation = await self.service.create_reservation(
+            self.guest.id, self.caravan.id, self.start_date, self.end_date, 200.0,
+            discount_strategy=PercentageDiscount(10), fee_strategy=PercentageFee(10),
+        )
+
+        self.assertEqual(reservation.status, "paid")
+        self.assertEqual(reservation.price, 180.0)
+        self.assertEqual(self.users.get_by_id(self.guest.id).balance, 820.0)
+        self.assertEqual(self.payments.find_by_reservation_id(reservation.id)[0].platform_fee, 18.0)
+        self.assertEqual(self.log.events, [("reservation_created", reservation.id)])
+
+    async def test_create_reservation_validates(self):
+        with self.assertRaises(NotFoundError):
+            await self.service.create_reservation(999, self.caravan.id, self.start_date, self.end_date, 100.0, fee_strategy=PercentageFee(0))
+        with self.assertRaises(NotFoundError):
+            await self.service.create_reservation(self.guest.id, 999, self.start_date, self.end_date, 100.0, fee_strategy=PercentageFee(0))
+        await self.service.create_reservation(self.guest.id, self.caravan.id, self.start_date, self.end_date, 100.0, fee_strategy=PercentageFee(0))
+        with self.assertRaises(DuplicateReservationError):
+            await self.service.create_reservation(
+                self.guest.id, self.caravan.id, self.start_date + timedelta(1), self.end_date, 100.0, fee_strategy=PercentageFee(0)
+            )
+
+    async def test_a_refused_payment_frees_the_dates(self):
+        poor = self.users.add(User(id=0, name="Poor", contact="", is_host=False, balance=5.0))
+        with self.assertRaises(InsufficientFundsError):
+            await self.service.create_reservation(
+                poor.id, self.caravan.id, self.start_date, self.end_date, 100.0, fee_strategy=PercentageFee(0)
+            )
+        self.assertEqual(self.reservations.get_all(), [])
+        self.assertEqual(self.log.events, [])
+
+        reservation = await self.service.create_reservation(
+            self.guest.id, self.caravan.id, self.start_date, self.end_date, 100.0, fee_strategy=PercentageFee(0)
+        )
+        self.assertEqual(reservation.status, "paid")
+
+    async def test_concurrent_bookings_of_the_same_dates_admit_one(self):
+        outcomes = await asyncio.gather(*(
+            self.service.create_reservation(
+                self.guest.id, self.caravan.id, self.start_date, self.end_date, 10.0, fee_strategy=PercentageFee(0)
+            )
+            for _ in range(20)
+        ), return_exceptions=True)
+
+        booked = [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+        self.assertEqual(len(booked), 1)
+        self.assertTrue(all(isinstance(outcome, DuplicateReservationError) for outcome in outcomes if outcome not in booked))
+        self.assertEqual(len(self.reservations.get_all()), 1)
+        self.assertEqual(self.users.get_by_id(self.guest.id).balance, 990.0)
+
+    async def test_create_reservations(self):
+        poor = self.users.add(User(id=0, name="Poor", contact="", is_host=False, balance=5.0))
+        results = await self.service.create_reservations([
+            ReservationRequest(self.guest.id, self.caravan.id, self.start_date, self.end_date, 100.0),
+            ReservationRequest(self.guest.id, self.caravan.id, self.start_date, self.end_date, 100.0),
+            ReservationRequest(poor.id, self.caravan.id, date(2025, 8, 1), date(2025, 8, 2), 100.0),
+            ReservationRequest(999, self.caravan.id, date(2025, 9, 1), date(2025, 9, 2), 100.0),
+            ReservationRequest(self.guest.id, self.caravan.id, date(2025, 10, 1), date(2025, 10, 2), 50.0),
+        ], fee_strategy=PercentageFee(0))
+
+        self.assertEqual([result.succeeded for result in results], [True, False, False, False, True])
+        self.assertIsInstance(results[1].error, DuplicateReservationError)
+        self.assertIsInstance(results[2].error, InsufficientFundsError)
+        self.assertIsInstance(results[3].error, NotFoundError)
+        self.assertEqual(self.users.get_by_id(self.guest.id).balance, 850.0)
+        self.assertEqual([event for event, _ in self.log.events], ["reservation_created"] * 2)
+
+    async def test_concurrent_batches_overspending_one_user_keep_the_rest(self):
+        self.guest.balance = 150.0
+        self.users.update(self.guest)
+        other = self.users.add(User(id=0, name="Other", contact="", is_host=False, balance=100.0))
+        first, second = await asyncio.gather(
+            self.service.create_reservations([
+                ReservationRequest(self.guest.id, self.caravan.id, date(2025, 8, 1), date(2025, 8, 2), 100.0),
+                ReservationRequest(other.id, self.caravan.id, date(2025, 8, 10), date(2025, 8, 11), 10.0),
+            ], fee_strategy=PercentageFee(0)),
+            self.service.create_reservations([
+                ReservationRequest(self.guest.id, self.caravan.id, date(2025, 9, 1), date(2025, 9, 2), 100.0),
+            ], fee_strategy=PercentageFee(0)),
+        )
+
+        guest_results = [first[0], second[0]]
+        self.assertEqual(sorted(result.succeeded for result in guest_results), [False, True])
+        self.assertIsInstance(next(result for result in guest_results if not result.succeeded).error, InsufficientFundsError)
+        self.assertTrue(first[1].succeeded)
+        self.assertEqual(self.users.get_by_id(self.guest.id).balance, 50.0)
+        self.assertEqual(self.users.get_by_id(other.id).balance, 90.0)
+        self.assertEqual(len(self.reservations.find_by_user_id(self.guest.id)), 1)
+        self.assertEqual(len(self.reservations.get_all()), 2)
+
+    async def test_transitions(self):
+        reservation = await self.service.create_reservation(
+            self.guest.id, self.caravan.id, self.start_date, self.end_date, 100.0, fee_strategy=PercentageFee(0)
+        )
+        self.assertEqual((await self.service.approve_reservation(reservation.id)).status, "approved")
+        self.assertEqual((await self.service.complete_reservation(reservation.id)).status, "completed")
+        self.assertEqual((await self.service.reject_reservation(reservation.id)).status, "rejected")
+        self.assertEqual((await self.service.cancel_reservation(reservation.id)).status, "cancelled")
+        self.assertEqual(self.reservations.get_by_id(reservation.id).status, "cancelled")
+        self.assertEqual(
+            [event for event, _ in self.log.events],
+            ["reservation_created", "reservation_approved", "review_requested", "reservation_rejected", "reservation_cancelled"],
+        )
+        with self.assertRaises(NotFoundError):
+            await self.service.approve_reservation(999)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 
 # Add src to path to allow imports
@@ -6,12 +7,16 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.models import Caravan
-from src.repositories import CaravanRepository
+from src.repositories import CaravanRepository, SqliteCaravanRepository, SqliteDatabase
+from src.repositories.columnar_store import np
 
 class TestCaravanRepository(unittest.TestCase):
 
+    def create_repository(self):
+        return CaravanRepository()
+
     def setUp(self):
-        self.repo = CaravanRepository()
+        self.repo = self.create_repository()
         # Googleplex
         self.caravan1 = Caravan(id=0, name="C1", host_id=1, capacity=1, location="", latitude=37.422, longitude=-122.084)
         # Apple Park
@@ -42,5 +47,299 @@ class TestCaravanRepository(unittest.TestCase):
         nearby_0km = self.repo.find_nearby(search_lat, search_lon, 0)
         self.assertEqual(len(nearby_0km), 0)
 
+    def test_find_nearby_after_update_and_delete(self):
+        search_lat, search_lon = 37.4, -122.1
+
+        # Move caravan3 from New York next to Googleplex
+        self.caravan3.latitude, self.caravan3.longitude = 37.41, -122.09
+        self.repo.update(self.caravan3)
+        nearby = self.repo.find_nearby(search_lat, search_lon, 5)
+        self.assertEqual(nearby, [self.caravan1, self.caravan3])
+
+        self.repo.delete(self.caravan1.id)
+        nearby = self.repo.find_nearby(search_lat, search_lon, 5)
+        self.assertEqual(nearby, [self.caravan3])
+
+    def test_search_required_amenities(self):
+        self.caravan1.amenities = ["wifi", "kitchen"]
+        self.caravan2.amenities = ["wifi"]
+        self.caravan3.amenities = ["kitchen", "wifi", "pets"]
+        for caravan in (self.caravan1, self.caravan2, self.caravan3):
+            self.repo.update(caravan)
+
+        self.assertEqual(self.repo.search(required_amenities=["wifi"]), [self.caravan1, self.caravan2, self.caravan3])
+        self.assertEqual(self.repo.search(required_amenities=["kitchen", "wifi"]), [self.caravan1, self.caravan3])
+        self.assertEqual(self.repo.search(required_amenities=["pets", "sauna"]), [])
+        self.assertEqual(len(self.repo.search(required_amenities=[])), 3)
+
+        self.caravan3.amenities = ["pets"]
+        self.repo.update(self.caravan3)
+        self.assertEqual(self.repo.search(required_amenities=["kitchen"]), [self.caravan1])
+
+        self.repo.delete(self.caravan1.id)
+        self.assertEqual(self.repo.search(required_amenities=["wifi"]), [self.caravan2])
+
+    def test_get_popular_caravans_and_hosts(self):
+        self.caravan1.average_rating = 4.0
+        self.caravan2.average_rating = 5.0
+        self.caravan3.average_rating = 4.0
+        self.caravan3.host_id = 2
+        for caravan in (self.caravan1, self.caravan2, self.caravan3):
+            self.repo.update(caravan)
+
+        self.assertEqual(self.repo.get_popular_caravans(2), [self.caravan2, self.caravan1])
+        self.assertEqual(self.repo.get_popular_caravans(10), [self.caravan2, self.caravan1, self.caravan3])
+        # Host 1 averages 4.5, host 2 averages 4.0
+        self.assertEqual(self.repo.get_popular_host_ids(), [1, 2])
+
+        self.caravan2.average_rating = 3.0
+        self.repo.update(self.caravan2)
+        self.assertEqual(self.repo.get_popular_caravans(1), [self.caravan1])
+        self.assertEqual(self.repo.get_popular_host_ids(), [2, 1])
+
+        self.repo.delete(self.caravan3.id)
+        self.assertEqual(self.repo.get_popular_host_ids(), [1])
+        self.assertEqual(self.repo.get_popular_caravans(5), [self.caravan1, self.caravan2])
+
+    def test_batch_operations_keep_indexes_in_sync(self):
+        self.caravan1.average_rating, self.caravan2.average_rating = 4.0, 5.0
+        self.caravan3.host_id, self.caravan3.average_rating = 2, 4.0
+        self.caravan3.amenities = ["wifi"]
+        self.repo = self.create_repository()
+        added = self.repo.add_many([self.caravan1, self.caravan2, self.caravan3])
+        self.assertEqual([caravan.id for caravan in added], [1, 2, 3])
+        self.assertEqual(self.repo.get_many([2, 99]), [self.caravan2, None])
+        self.assertEqual(self.repo.get_popular_caravans(10), [self.caravan2, self.caravan1, self.caravan3])
+        self.assertEqual(self.repo.get_popular_host_ids(), [1, 2])
+        self.assertEqual(self.repo.search(required_amenities=["wifi"]), [self.caravan3])
+
+        self.caravan2.average_rating = 3.0
+        self.caravan3.host_id = 1
+        self.repo.update_many([self.caravan2, self.caravan3])
+        self.assertEqual(self.repo.get_popular_caravans(1), [self.caravan1])
+        self.assertEqual(self.repo.get_popular_host_ids(), [1])
+
+        self.repo.delete_many([self.caravan1.id, self.caravan2.id])
+        self.assertEqual(self.repo.get_all(), [self.caravan3])
+        self.assertEqual(self.repo.find_nearby(37.4, -122.05, 10), [])
+        self.assertEqual(self.repo.get_popular_host_ids(), [1])
+
+    def test_find_nearby_across_antimeridian(self):
+        east = self.repo.add(Caravan(id=0, name="E", host_id=1, capacity=1, location="", latitude=-17.0, longitude=179.95))
+        west = self.repo.add(Caravan(id=0, name="W", host_id=1, capacity=1, location="", latitude=-17.0, longitude=-179.95))
+
+        nearby = self.repo.find_nearby(-17.0, 180.0, 10)
+        self.assertEqual(nearby, [east, west])
+
+    def test_find_nearby_matches_full_scan(self):
+        rng = random.Random(42)
+        for i in range(500):
+            self.repo.add(Caravan(
+                id=0, name=f"R{i}", host_id=1, capacity=1, location="",
+                latitude=rng.uniform(-89, 89), longitude=rng.uniform(-180, 180),
+            ))
+
+        for lat, lon, radius in [(37.4, -122.1, 800), (0, 0, 3000), (85, 10, 1500), (-60, 170, 2500)]:
+            expected = [
+                caravan for caravan in self.repo.get_all()
+                if self.repo._haversine(lat, lon, caravan.latitude, caravan.longitude) <= radius
+            ]
+            self.assertEqual(self.repo.find_nearby(lat, lon, radius), expected)
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestColumnarCaravanSearch(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        amenities = ["wifi", "kitchen", "shower", "pets"]
+        self.caravans = [
+            Caravan(
+                id=0, name=f"C{i}", host_id=i % 5, capacity=rng.randint(1, 8), location="",
+                amenities=rng.sample(amenities, rng.randint(0, 3)),
+                price_per_day=float(rng.randint(50, 300)),
+                average_rating=rng.choice([3.0, 3.5, 4.0, 4.5, 5.0]),
+            )
+            for i in range(300)
+        ]
+        self.row_repo = CaravanRepository()
+        self.columnar_repo = CaravanRepository(columnar=True)
+        for caravan in self.caravans:
+            self.row_repo.add(caravan)
+            self.columnar_repo.add(caravan)
+
+    def assertSameSearch(self, **filters):
+        self.assertEqual(self.columnar_repo.search(**filters), self.row_repo.search(**filters))
+
+    def test_search_matches_row_store(self):
+        self.assertSameSearch()
+        self.assertSameSearch(min_price=100, max_price=200)
+        self.assertSameSearch(min_rating=4.0, sort_by_rating=True)
+        self.assertSameSearch(required_amenities=["wifi", "pets"], max_price=250, sort_by_rating=True)
+        self.assertSameSearch(min_price=1000)
+        self.assertSameSearch(required_amenities=["kitchen", "shower", "wifi"])
+        self.assertSameSearch(required_amenities=["sauna"])
+
+    def test_search_follows_updates_and_deletes(self):
+        for caravan in self.caravans[:200]:
+            self.row_repo.delete(caravan.id)
+            self.columnar_repo.delete(caravan.id)
+        for caravan in self.caravans[200:220]:
+            caravan.average_rating = 5.0
+            caravan.price_per_day = 75.0
+            self.row_repo.update(caravan)
+            self.columnar_repo.update(caravan)
+
+        self.assertSameSearch(sort_by_rating=True)
+        self.assertSameSearch(max_price=80, min_rating=5.0)
+        self.assertSameSearch(required_amenities=["pets"], sort_by_rating=True)
+        self.assertEqual(self.columnar_repo.get_popular_caravans(3), self.row_repo.get_popular_caravans(3))
+
+class TestCaravanMatching(unittest.TestCase):
+
+    def create_repository(self):
+        return CaravanRepository()
+
+    def setUp(self):
+        rng = random.Random(11)
+        amenities = ["wifi", "kitchen", "shower", "pets", "sauna"]
+        self.repo = self.create_repository()
+        for i in range(500):
+            self.repo.add(Caravan(
+                id=0, name=f"C{i}", host_id=i % 7, capacity=rng.randint(1, 8), location="",
+                latitude=rng.uniform(37.0, 38.0), longitude=rng.uniform(-123.0, -122.0),
+                amenities=rng.sample(amenities[:4], rng.randint(0, 3)) + (["sauna"] if i % 100 == 0 else []),
+                price_per_day=float(rng.randint(50, 300)),
+                average_rating=rng.choice([3.0, 3.5, 4.0, 4.5, 5.0]),
+            ))
+
+    def naive(self, latitude=None, longitude=None, radius=None, sort_by_rating=False, **filters):
+        matches = self.repo.search(sort_by_rating=sort_by_rating, **filters)
+        if radius is not None:
+            nearby = {caravan.id for caravan in self.repo.find_nearby(latitude, longitude, radius)}
+            matches = [caravan for caravan in matches if caravan.id in nearby]
+        return matches
+
+    def assertMatchesNaive(self, **filters):
+        self.assertEqual(self.repo.find_matching(**filters), self.naive(**filters))
+
+    def test_planner_drives_with_the_most_selective_index(self):
+        self.assertEqual(self.repo.plan_search().driver, "scan")
+        self.assertEqual(self.repo.plan_search(min_price=100).filters, ["price"])
+
+        plan = self.repo.plan_search(required_amenities=["sauna"], min_rating=3.0, min_price=100)
+        self.assertEqual(plan.driver, "amenities")
+        self.assertEqual(plan.estimated_candidates, 5)
+        self.assertEqual(plan.filters, ["price", "rating"])
+
+        plan = self.repo.plan_search(latitude=37.5, longitude=-122.5, radius=2, required_amenities=["wifi"])
+        self.assertEqual(plan.driver, "nearby")
+        self.assertEqual(plan.filters, ["amenities"])
+
+        plan = self.repo.plan_search(min_rating=5.0, required_amenities=["wifi"])
+        self.assertEqual(plan.driver, "rating")
+
+    def test_results_match_the_separate_searches(self):
+        self.assertMatchesNaive()
+        self.assertMatchesNaive(min_price=100, max_price=200)
+        self.assertMatchesNaive(min_rating=4.5, sort_by_rating=True)
+        self.assertMatchesNaive(min_rating=5.0, required_amenities=["wifi"])
+        self.assertMatchesNaive(required_amenities=["sauna"], sort_by_rating=True)
+        self.assertMatchesNaive(required_amenities=["jacuzzi"])
+        self.assertMatchesNaive(latitude=37.5, longitude=-122.5, radius=15, max_price=150)
+        self.assertMatchesNaive(
+            latitude=37.5, longitude=-122.5, radius=30, required_amenities=["pets"], min_rating=4.0, sort_by_rating=True
+        )
+
+    def test_limit_offset_and_availability_filter(self):
+        everything = self.repo.find_matching(min_price=100, sort_by_rating=True)
+        self.assertEqual(self.repo.find_matching(min_price=100, sort_by_rating=True, limit=10, offset=5), everything[5:15])
+        self.assertEqual(self.repo.find_matching(min_price=100, limit=0), [])
+
+        even = self.repo.find_matching(min_price=100, available=lambda ids: [i for i in ids if i % 2 == 0])
+        self.assertEqual(even, [caravan for caravan in self.repo.find_matching(min_price=100) if caravan.id % 2 == 0])
+
+    def test_work_stops_once_the_page_is_full(self):
+        checked = []
+
+        def available(caravan_ids):
+            checked.extend(caravan_ids)
+            return caravan_ids
+
+        self.assertEqual(len(self.repo.find_matching(available=available, limit=3)), 3)
+        # Only the first chunk of candidates was ever produced.
+        self.assertLessEqual(len(checked), 256)
+
+class TestCachedCaravanRepository(TestCaravanRepository):
+
+    def create_repository(self):
+        return CaravanRepository(search_cache_size=8)
+
+    def test_equivalent_queries_share_an_entry(self):
+        self.repo.search(required_amenities=["wifi", "pets"])
+        self.repo.search(required_amenities=["pets", "wifi", "pets"])
+        self.repo.find_nearby(37.4, -122.1, 20)
+        self.repo.find_nearby(37.400001, -122.100001, 20)
+        stats = self.repo.search_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (2, 2, 2))
+
+    def test_writes_invalidate_cached_results(self):
+        self.assertEqual(len(self.repo.find_nearby(37.4, -122.1, 20)), 2)
+        result = self.repo.search(sort_by_rating=True)
+        # Changing the returned list does not change the cached one.
+        result.clear()
+        self.assertEqual(len(self.repo.search(sort_by_rating=True)), 3)
+
+        self.caravan3.latitude, self.caravan3.longitude = 37.41, -122.09
+        self.repo.update(self.caravan3)
+        self.assertEqual(len(self.repo.find_nearby(37.4, -122.1, 20)), 3)
+        self.repo.delete_many([self.caravan1.id, self.caravan2.id])
+        self.assertEqual(self.repo.search(sort_by_rating=True), [self.caravan3])
+        self.assertEqual(self.repo.search_cache_stats()["stale"], 2)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for price in range(10):
+            self.repo.search(min_price=price)
+        self.repo.search(min_price=9)
+        self.repo.search(min_price=0)
+        stats = self.repo.search_cache_stats()
+        self.assertEqual((stats["size"], stats["evictions"], stats["hits"]), (8, 3, 1))
+
+    def test_find_matching_caches_only_without_availability(self):
+        self.repo.find_matching(latitude=37.4, longitude=-122.1, radius=20, limit=1)
+        self.repo.find_matching(latitude=37.4, longitude=-122.1, radius=20, limit=1)
+        self.repo.find_matching(available=lambda ids: ids)
+        stats = self.repo.search_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+class TestSqliteCaravanRepository(TestCaravanRepository):
+
+    def create_repository(self):
+        return SqliteCaravanRepository(SqliteDatabase())
+
+class TestSqliteCaravanMatching(TestCaravanMatching):
+
+    def create_repository(self):
+        return SqliteCaravanRepository(SqliteDatabase())
+
+    def test_planner_drives_with_the_most_selective_index(self):
+        # SQLite picks the index; the plan reports its choice.
+        plan = self.repo.plan_search()
+        self.assertEqual((plan.driver, plan.estimated_candidates, plan.filters), ("scan", 500, []))
+        self.assertEqual(self.repo.plan_search(min_price=100).filters, ["price"])
+
+        plan = self.repo.plan_search(required_amenities=["sauna"], min_rating=3.0, min_price=100)
+        self.assertEqual(plan.driver, "amenities")
+        self.assertEqual(plan.estimated_candidates, 5)
+        self.assertEqual(plan.filters, ["price", "rating"])
+
+        plan = self.repo.plan_search(latitude=37.5, longitude=-122.5, radius=2, min_price=100)
+        self.assertEqual(plan.driver, "nearby")
+        self.assertEqual(plan.filters, ["price"])
+
+    def test_pages_ranked_by_rating_keep_ties_in_id_order(self):
+        everything = self.repo.find_matching(sort_by_rating=True)
+        self.assertEqual(everything, self.repo.search(sort_by_rating=True))
+        self.assertEqual(self.repo.find_matching(sort_by_rating=True, limit=20, offset=250), everything[250:270])
+
 if __name__ == '__main__':
     unittest.main()
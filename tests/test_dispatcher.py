@@ -0,0 +1,219 @@
+import threading
+import time
+import unittest
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.observers import Publisher, Subscriber, ThreadPoolDispatcher
+
+class RecordingSubscriber(Subscriber):
+    def __init__(self, gate: threading.Event = None, fail_on=None):
+        self.received = []
+        self.gate = gate
+        self.fail_on = fail_on
+        self.entered = threading.Event()
+        self.calls = 0
+
+    def update(self, publisher, event, data):
+        self.calls += 1
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait()
+        if data == self.fail_on:
+            raise ValueError("boom")
+        self.received.append((event, data))
+
+class TestThreadPoolDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.dispatchers = []
+
+    def tearDown(self):
+        for dispatcher in self.dispatchers:
+            dispatcher.close(timeout=5)
+
+    def create_publisher(self, **options):
+        dispatcher = ThreadPoolDispatcher(**options)
+        self.dispatchers.append(dispatcher)
+        return Publisher(dispatcher), dispatcher
+
+    def wait_until(self, condition, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_each_subscriber_receives_events_in_order(self):
+        publisher, _ = self.create_publisher(workers=4, burst=2)
+        subscribers = [RecordingSubscriber() for _ in range(3)]
+        for subscriber in subscribers:
+            publisher.subscribe(subscriber)
+        for number in range(200):
+            publisher.notify("tick", number)
+        publisher.notify_many("ticks", [200, 201])
+
+        self.assertTrue(publisher.flush(timeout=5))
+        expected = [("tick", number) for number in range(200)] + [("ticks", 200), ("ticks", 201)]
+        for subscriber in subscribers:
+            self.assertEqual(subscriber.received, expected)
+
+    def test_slow_subscriber_does_not_block_others(self):
+        publisher, dispatcher = self.create_publisher(workers=2)
+        gate = threading.Event()
+        slow, fast = RecordingSubscriber(gate=gate), RecordingSubscriber()
+        publisher.subscribe(slow)
+        publisher.subscribe(fast)
+
+        started = time.monotonic()
+        for number in range(5):
+            publisher.notify("tick", number)
+        self.assertLess(time.monotonic() - started, 1.0)
+
+        self.wait_until(lambda: len(fast.received) == 5)
+        self.assertEqual(len(fast.received), 5)
+        self.assertEqual(slow.received, [])
+        self.assertFalse(publisher.flush(timeout=0.05))
+
+        gate.set()
+        self.assertTrue(publisher.flush(timeout=5))
+        self.assertEqual(len(slow.received), 5)
+        self.assertEqual(dispatcher.stats()["delivered"], 10)
+
+    def test_backpressure_drops_after_enqueue_timeout(self):
+        publisher, dispatcher = self.create_publisher(workers=1, max_pending=2, enqueue_timeout=0.05)
+        gate = threading.Event()
+        subscriber = RecordingSubscriber(gate=gate)
+        publisher.subscribe(subscriber)
+
+        for number in range(4):
+            publisher.notify("tick", number)
+        gate.set()
+        self.assertTrue(publisher.flush(timeout=5))
+        self.assertEqual(dispatcher.stats()["dropped"], 2)
+        self.assertEqual(subscriber.received, [("tick", 0), ("tick", 1)])
+
+    def test_per_subscriber_limit_and_expiry_isolate_a_stalled_subscriber(self):
+        publisher, dispatcher = self.create_publisher(
+            workers=2, max_pending_per_subscriber=3, delivery_timeout=0.1
+        )
+        gate = threading.Event()
+        stalled, healthy = RecordingSubscriber(gate=gate), RecordingSubscriber()
+        publisher.subscribe(stalled)
+        publisher.subscribe(healthy)
+
+        for number in range(6):
+            publisher.notify("tick", number)
+            # Let the healthy subscriber keep up, so only the stalled one falls behind.
+            self.wait_until(lambda: len(healthy.received) > number and stalled.entered.is_set())
+        time.sleep(0.2)
+        gate.set()
+        self.assertTrue(publisher.flush(timeout=5))
+
+        self.assertEqual(len(healthy.received), 6)
+        # The first event was already being delivered; the queued ones expired or were dropped.
+        self.assertEqual(stalled.received, [("tick", 0)])
+        stats = dispatcher.stats()
+        self.assertEqual(stats["dropped"], 2)
+        self.assertEqual(stats["expired"], 3)
+
+    def test_failing_subscriber_is_counted_not_raised(self):
+        publisher, dispatcher = self.create_publisher(workers=1)
+        subscriber = RecordingSubscriber(fail_on=1)
+        publisher.subscribe(subscriber)
+        for number in range(3):
+            publisher.notify("tick", number)
+
+        self.assertTrue(publisher.flush(timeout=5))
+        self.assertEqual(subscriber.received, [("tick", 0), ("tick", 2)])
+        self.assertEqual(dispatcher.stats()["failed"], 1)
+
+    def test_lanes_are_forgotten_once_drained(self):
+        publisher, dispatcher = self.create_publisher(workers=2)
+        for number in range(50):
+            subscriber = RecordingSubscriber()
+            publisher.subscribe(subscriber)
+            publisher.notify("tick", number)
+            publisher.unsubscribe(subscriber)
+        short_lived = RecordingSubscriber()
+        publisher.subscribe(short_lived)
+        publisher.notify("tick", 0)
+
+        self.assertTrue(publisher.flush(timeout=5))
+        self.wait_until(lambda: not dispatcher._lanes)
+        self.assertEqual(dispatcher._lanes, {})
+        self.assertEqual(short_lived.received, [("tick", 0)])
+
+    def test_unsubscribing_a_hung_subscriber_releases_its_lane(self):
+        publisher, dispatcher = self.create_publisher(workers=2)
+        gate = threading.Event()
+        hung, healthy = RecordingSubscriber(gate=gate), RecordingSubscriber()
+        publisher.subscribe(hung)
+        publisher.subscribe(healthy)
+        for number in range(3):
+            publisher.notify("tick", number)
+        self.wait_until(hung.entered.is_set)
+
+        publisher.unsubscribe(hung)
+        self.assertEqual(dispatcher.stats()["dropped"], 2)
+        publisher.notify("tick", 3)
+        self.wait_until(lambda: len(healthy.received) == 4)
+        self.assertEqual(len(healthy.received), 4)
+
+        gate.set()
+        self.assertTrue(publisher.flush(timeout=5))
+        self.assertEqual(hung.received, [("tick", 0)])
+        self.wait_until(lambda: not dispatcher._lanes)
+        self.assertEqual(dispatcher._lanes, {})
+
+    def test_resubscribing_waits_for_the_event_in_flight(self):
+        publisher, _ = self.create_publisher(workers=2)
+        gate = threading.Event()
+        subscriber = RecordingSubscriber(gate=gate)
+        publisher.subscribe(subscriber)
+        publisher.notify("tick", 0)
+        self.wait_until(subscriber.entered.is_set)
+
+        publisher.unsubscribe(subscriber)
+        publisher.subscribe(subscriber)
+        publisher.notify("tick", 1)
+        time.sleep(0.05)
+        # The new event waits behind the one still being delivered, not on a second worker.
+        self.assertEqual(subscriber.calls, 1)
+
+        gate.set()
+        self.assertTrue(publisher.flush(timeout=5))
+        self.assertEqual(subscriber.received, [("tick", 0), ("tick", 1)])
+
+    def test_unsubscribing_keeps_other_publishers_events(self):
+        first, dispatcher = self.create_publisher(workers=1)
+        second = Publisher(dispatcher)
+        gate = threading.Event()
+        blocker, subscriber = RecordingSubscriber(gate=gate), RecordingSubscriber()
+        first.subscribe(blocker)
+        first.notify("block", 0)
+        self.wait_until(blocker.entered.is_set)
+        for publisher in (first, second):
+            publisher.subscribe(subscriber)
+            publisher.notify("tick", publisher is second)
+
+        first.unsubscribe(subscriber)
+        gate.set()
+        self.assertTrue(dispatcher.flush(timeout=5))
+        self.assertEqual(subscriber.received, [("tick", True)])
+        self.assertEqual(dispatcher.stats()["dropped"], 1)
+
+    def test_close_drains_and_rejects_new_events(self):
+        publisher, dispatcher = self.create_publisher(workers=2)
+        subscriber = RecordingSubscriber()
+        publisher.subscribe(subscriber)
+        publisher.notify("tick", 0)
+
+        self.assertTrue(dispatcher.close(timeout=5))
+        self.assertEqual(subscriber.received, [("tick", 0)])
+        with self.assertRaises(RuntimeError):
+            publisher.notify("tick", 1)
+
+if __name__ == '__main__':
+    unittest.main()
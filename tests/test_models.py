@@ -0,0 +1,34 @@
+import os
+import pickle
+import unittest
+from datetime import date
+
+# Add src to path to allow imports
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan, Message, Payment, Reservation, Review, Settlement, User
+
+class TestModels(unittest.TestCase):
+
+    def test_models_have_no_instance_dict(self):
+        records = [
+            User(id=1, name="Alice", contact="alice@example.com", is_host=False),
+            Caravan(id=1, host_id=1, name="C1", capacity=2, location=""),
+            Reservation(id=1, user_id=1, caravan_id=1, start_date=date(2024, 1, 1), end_date=date(2024, 1, 3), price=300),
+            Payment(id=1, reservation_id=1, amount=300, payment_method="card"),
+            Review(id=1, reservation_id=1, rating=5, comment="", author_id=1, subject_id=2),
+            Message(id=1, sender_id=1, recipient_id=2, content="hi"),
+            Settlement(id=1, host_id=1, amount=270, payment_ids=[1]),
+        ]
+        for record in records:
+            self.assertFalse(hasattr(record, "__dict__"), type(record).__name__)
+            with self.assertRaises(AttributeError):
+                record.unknown_field = 1
+
+    def test_models_round_trip_through_pickle(self):
+        reservation = Reservation(id=7, user_id=1, caravan_id=2, start_date=date(2024, 1, 1), end_date=date(2024, 1, 3), price=300)
+        self.assertEqual(pickle.loads(pickle.dumps(reservation)), reservation)
+
+if __name__ == '__main__':
+    unittest.main()
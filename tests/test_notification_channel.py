@@ -0,0 +1,110 @@
+import time
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan, Reservation, User
+from src.observers import CoalescingChannel, HostNotifier, NotificationChannel
+
+class RecordingChannel(NotificationChannel):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, recipient, subject, body, event=""):
+        self.sent.append((recipient, subject, body, event))
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCoalescingChannel(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.delivered = RecordingChannel()
+        self.channel = CoalescingChannel(self.delivered, window=60, max_items=3, clock=self.clock, background=False)
+
+    def test_notifications_are_coalesced_per_recipient(self):
+        self.channel.send("host@example.com", "Reservation", "first", "reservation_created")
+        self.clock.now = 30
+        self.channel.send("host@example.com", "Payment", "second", "payment_completed")
+        self.channel.send("other@example.com", "Review", "only", "review_created")
+
+        self.assertEqual(self.channel.flush_due(), 0)
+        self.assertEqual(self.delivered.sent, [])
+
+        self.clock.now = 60
+        self.assertEqual(self.channel.flush_due(), 1)
+        self.assertEqual(self.delivered.sent, [(
+            "host@example.com", "You have 2 new updates", "- Reservation: first\n- Payment: second", "digest",
+        )])
+
+        self.clock.now = 90
+        self.assertEqual(self.channel.flush_due(), 1)
+        # A lone notification is sent unchanged.
+        self.assertEqual(self.delivered.sent[-1], ("other@example.com", "Review", "only", "review_created"))
+        self.assertEqual(self.channel.stats(), {"immediate": 0, "digests": 2, "coalesced": 3})
+
+    def test_urgent_events_skip_the_buffer(self):
+        self.channel.send("guest@example.com", "Payment", "refund", "payment_refunded")
+        self.assertEqual(self.delivered.sent, [("guest@example.com", "Payment", "refund", "payment_refunded")])
+        self.assertEqual(self.channel.flush(), 0)
+
+    def test_full_buffer_is_sent_early_and_opens_a_new_window(self):
+        for number in range(3):
+            self.channel.send("host@example.com", "Reservation", str(number), "reservation_created")
+        self.assertEqual(len(self.delivered.sent), 1)
+        self.assertEqual(self.delivered.sent[0][1], "You have 3 new updates")
+
+        # The early digest's deadline is stale; later notifications wait for their own window.
+        self.clock.now = 10
+        self.channel.send("host@example.com", "Reservation", "3", "reservation_created")
+        self.channel.send("host@example.com", "Reservation", "4", "reservation_created")
+        self.clock.now = 60
+        self.assertEqual(self.channel.flush_due(), 0)
+        self.clock.now = 70
+        self.assertEqual(self.channel.flush_due(), 1)
+        self.assertEqual(self.delivered.sent[-1][2], "- Reservation: 3\n- Reservation: 4")
+
+    def test_flush_sends_everything(self):
+        self.channel.send("a@example.com", "A", "a", "reservation_created")
+        self.channel.send("b@example.com", "B", "b", "reservation_created")
+        self.assertEqual(self.channel.flush(), 2)
+        self.assertEqual(self.channel.flush_due(), 0)
+        self.assertEqual(len(self.delivered.sent), 2)
+
+    def test_background_flusher_sends_due_digests(self):
+        delivered = RecordingChannel()
+        channel = CoalescingChannel(delivered, window=0.05)
+        channel.send("a@example.com", "A", "a", "reservation_created")
+        channel.send("a@example.com", "B", "b", "reservation_created")
+        deadline = time.monotonic() + 5
+        while not delivered.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        channel.close()
+        self.assertEqual([subject for _, subject, _, _ in delivered.sent], ["You have 2 new updates"])
+
+class TestNotifierChannel(unittest.TestCase):
+
+    def test_host_notifier_sends_through_its_channel(self):
+        user_repo, caravan_repo, channel = MagicMock(), MagicMock(), MagicMock()
+        caravan_repo.get_by_id.return_value = Caravan(id=1, host_id=2, name="C1", capacity=2, location="")
+        user_repo.get_by_id.return_value = User(id=2, name="Host", contact="host@example.com", is_host=True)
+        reservation = Reservation(id=5, user_id=1, caravan_id=1, start_date=date(2025, 1, 1), end_date=date(2025, 1, 2), price=10)
+
+        HostNotifier(user_repo, caravan_repo, channel).update(None, "reservation_cancelled", reservation)
+        channel.send.assert_called_once_with(
+            "host@example.com", "Reservation Status Update",
+            "The reservation (ID: 5) for 'C1' has been cancelled.", "reservation_cancelled",
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import random
+import unittest
+from datetime import date, timedelta
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Reservation
+from src.repositories import OccupancyCalendar, ReservationRepository
+from src.repositories.occupancy_calendar import np
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestOccupancyCalendar(unittest.TestCase):
+
+    def setUp(self):
+        self.origin = date(2025, 1, 1)
+        self.repo = ReservationRepository(occupancy_calendar=OccupancyCalendar(self.origin, horizon_days=60))
+
+    def book(self, caravan_id, start_day, end_day, status="paid"):
+        return self.repo.add(Reservation(
+            id=0, user_id=1, caravan_id=caravan_id, price=0, status=status,
+            start_date=self.origin + timedelta(start_day), end_date=self.origin + timedelta(end_day),
+        ))
+
+    def day(self, offset):
+        return self.origin + timedelta(offset)
+
+    def test_find_free_caravans_follows_adds_updates_and_cancellations(self):
+        self.book(1, 3, 5)
+        self.book(2, 10, 12)
+        reservation = self.book(3, 4, 4)
+        self.book(4, 0, 1, status="cancelled")
+
+        self.assertEqual(self.repo.find_free_caravans([1, 2, 3, 4, 5], self.day(4), self.day(9)), [2, 4, 5])
+        self.assertEqual(self.repo.find_free_caravans([5, 1], self.day(6), self.day(9)), [5, 1])
+
+        reservation.status = "cancelled"
+        self.repo.update(reservation)
+        self.assertEqual(self.repo.find_free_caravans([1, 3], self.day(4), self.day(4)), [3])
+
+        reservation.status = "paid"
+        reservation.caravan_id = 2
+        self.repo.update(reservation)
+        self.assertEqual(self.repo.find_free_caravans([2, 3], self.day(4), self.day(4)), [3])
+
+        self.repo.delete(reservation.id)
+        self.assertEqual(self.repo.find_free_caravans([2], self.day(4), self.day(4)), [2])
+
+    def test_overlapping_reservations_keep_days_booked(self):
+        first = self.book(1, 3, 8)
+        self.book(1, 6, 10)
+        self.repo.delete(first.id)
+        self.assertEqual(self.repo.find_free_caravans([1], self.day(6), self.day(6)), [])
+        self.assertEqual(self.repo.find_free_caravans([1], self.day(3), self.day(5)), [1])
+
+    def test_find_free_windows(self):
+        self.book(1, 2, 3)
+        self.book(1, 9, 9)
+        windows = self.repo.find_free_windows(1, length_days=3, count=3)
+        self.assertEqual(windows, [
+            (self.day(4), self.day(6)),
+            (self.day(10), self.day(12)),
+            (self.day(13), self.day(15)),
+        ])
+        self.assertEqual(self.repo.find_free_windows(1, 2, 2, start_date=self.day(5)), [
+            (self.day(5), self.day(6)), (self.day(7), self.day(8)),
+        ])
+        # Windows never run past the horizon.
+        self.assertEqual(self.repo.find_free_windows(1, 30, 5, start_date=self.day(20)), [(self.day(20), self.day(49))])
+        self.assertEqual(self.repo.find_free_windows(2, 61, 1), [])
+
+    def test_batch_writes_and_rolling_the_horizon(self):
+        self.repo.add_many([
+            Reservation(id=0, user_id=1, caravan_id=1, start_date=self.day(70), end_date=self.day(72), price=0),
+            Reservation(id=0, user_id=1, caravan_id=2, start_date=self.day(0), end_date=self.day(1), price=0),
+        ])
+        with self.assertRaises(ValueError):
+            self.repo.find_free_caravans([1], self.day(70), self.day(72))
+
+        self.repo.advance_occupancy(self.day(30))
+        self.assertEqual(self.repo.find_free_caravans([1, 2], self.day(70), self.day(72)), [2])
+
+    def test_matches_interval_index(self):
+        rng = random.Random(3)
+        for _ in range(300):
+            start = rng.randint(-5, 58)
+            self.book(rng.randint(1, 20), start, start + rng.randint(0, 6), status=rng.choice(["paid", "cancelled"]))
+        caravan_ids = list(range(1, 22))
+        for _ in range(50):
+            start = rng.randint(0, 55)
+            end = start + rng.randint(0, 4)
+            expected = [
+                caravan_id for caravan_id in caravan_ids
+                if not self.repo.find_by_caravan_and_dates(caravan_id, self.day(start), self.day(end))
+            ]
+            self.assertEqual(self.repo.find_free_caravans(caravan_ids, self.day(start), self.day(end)), expected)
+
+    def test_incremental_updates_match_a_full_rebuild(self):
+        calendar = OccupancyCalendar(self.origin, horizon_days=60)
+        self.repo = ReservationRepository(occupancy_calendar=calendar)
+        rng = random.Random(5)
+        reservations = []
+        for _ in range(400):
+            action = rng.random()
+            if action < 0.4 or not reservations:
+                start = rng.randint(-10, 65)
+                reservations.append(self.book(rng.randint(1, 8), start, start + rng.randint(0, 20)))
+            elif action < 0.7:
+                reservation = rng.choice(reservations)
+                start = rng.randint(-10, 65)
+                reservation.caravan_id = rng.randint(1, 8)
+                reservation.start_date, reservation.end_date = self.day(start), self.day(start + rng.randint(0, 20))
+                reservation.status = rng.choice(["paid", "paid", "cancelled"])
+                self.repo.update(reservation)
+            elif action < 0.8:
+                batch = rng.sample(reservations, min(3, len(reservations)))
+                for reservation in batch:
+                    reservation.status = rng.choice(["paid", "rejected"])
+                self.repo.update_many(batch)
+            else:
+                reservation = reservations.pop(rng.randrange(len(reservations)))
+                self.repo.delete(reservation.id)
+
+        incremental = calendar._bits.copy(), dict(calendar._rows)
+        self.repo.advance_occupancy(self.origin)
+        rebuilt = calendar._bits, calendar._rows
+        self.assertEqual(set(incremental[1]), set(rebuilt[1]))
+        for caravan_id in rebuilt[1]:
+            self.assertEqual(
+                incremental[0][incremental[1][caravan_id]].tolist(), rebuilt[0][rebuilt[1][caravan_id]].tolist()
+            )
+
+    def test_requires_a_calendar(self):
+        with self.assertRaises(RuntimeError):
+            ReservationRepository().find_free_caravans([1], self.day(0), self.day(1))
+
+if __name__ == '__main__':
+    unittest.main()
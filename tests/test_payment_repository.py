@@ -0,0 +1,78 @@
+import unittest
+from dataclasses import replace
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Payment
+from src.repositories import PaymentRepository, SqlitePaymentRepository, SqliteDatabase
+from src.exceptions import ConcurrentUpdateError
+
+class TestPaymentRepository(unittest.TestCase):
+
+    def create_repository(self):
+        return PaymentRepository()
+
+    def setUp(self):
+        self.repo = self.create_repository()
+        self.payment1 = self.repo.add(Payment(id=0, reservation_id=1, amount=100.0, payment_method="balance"))
+        self.payment2 = self.repo.add(Payment(id=0, reservation_id=1, amount=50.0, payment_method="balance", status="refunded"))
+        self.payment3 = self.repo.add(Payment(id=0, reservation_id=2, amount=80.0, payment_method="balance", status="paid"))
+
+    def test_find_by_reservation_id(self):
+        self.assertEqual(self.repo.find_by_reservation_id(1), [self.payment1, self.payment2])
+        self.assertEqual(self.repo.find_by_reservation_id(1, status="completed"), [self.payment1])
+        self.assertEqual(self.repo.find_by_reservation_id(999), [])
+
+    def test_find_by_status(self):
+        self.assertEqual(self.repo.find_by_status("paid"), [self.payment3])
+        self.assertEqual(self.repo.find_by_status("paid", settled=False), [self.payment3])
+        self.assertEqual(self.repo.find_by_status("paid", settled=True), [])
+
+    def test_indexes_follow_state_changes(self):
+        self.payment1.status = "refunded"
+        self.repo.update(self.payment1)
+        self.assertEqual(self.repo.find_by_reservation_id(1, status="completed"), [])
+        self.assertCountEqual(self.repo.find_by_status("refunded"), [self.payment1, self.payment2])
+
+        self.payment3.settled = True
+        self.repo.update(self.payment3)
+        self.assertEqual(self.repo.find_by_status("paid", settled=False), [])
+        self.assertEqual(self.repo.find_by_status("paid", settled=True), [self.payment3])
+
+        self.repo.delete(self.payment3.id)
+        self.assertEqual(self.repo.find_by_status("paid"), [])
+        self.assertEqual(self.repo.find_by_reservation_id(2), [])
+
+    def test_compare_and_set(self):
+        refunded = replace(self.repo.get_by_id(self.payment1.id), status="refunded")
+        self.assertTrue(self.repo.compare_and_set(refunded, 0))
+        self.assertFalse(self.repo.compare_and_set(replace(refunded, status="paid"), 0))
+        self.assertEqual(self.repo.find_by_reservation_id(1, status="completed"), [])
+        self.assertEqual(self.repo.get_by_id(self.payment1.id).version, 1)
+        self.assertFalse(self.repo.compare_and_set(Payment(id=42, reservation_id=1, amount=1.0, payment_method="balance"), 0))
+
+    def test_update_rejects_a_stale_copy(self):
+        stale = replace(self.repo.get_by_id(self.payment1.id))
+        self.assertTrue(self.repo.compare_and_set(replace(stale, status="refunded"), 0))
+
+        with self.assertRaises(ConcurrentUpdateError):
+            self.repo.update(replace(stale, settled=True))
+        with self.assertRaises(ConcurrentUpdateError):
+            self.repo.update_many([replace(self.repo.get_by_id(self.payment3.id), settled=True), replace(stale, settled=True)])
+        self.assertEqual(stale.version, 0)
+        self.assertIn(self.payment1.id, [payment.id for payment in self.repo.find_by_status("refunded", settled=False)])
+        self.assertEqual(self.repo.find_by_status("paid", settled=True), [])
+
+        self.repo.update(replace(self.repo.get_by_id(self.payment1.id), settled=True))
+        self.assertEqual(self.repo.get_by_id(self.payment1.id).version, 2)
+
+class TestSqlitePaymentRepository(TestPaymentRepository):
+
+    def create_repository(self):
+        return SqlitePaymentRepository(SqliteDatabase())
+
+if __name__ == '__main__':
+    unittest.main()
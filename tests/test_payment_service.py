@@ -1,5 +1,7 @@
+import threading
 import unittest
 from unittest.mock import MagicMock
+from dataclasses import replace
 from datetime import date
 
 # Add src to path to allow imports
@@ -8,10 +10,14 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.models import User, Payment, Reservation
+from src.repositories import (
+    PaymentRepository, ReservationRepository, UserRepository,
+    SqliteDatabase, SqlitePaymentRepository, SqliteReservationRepository, SqliteUserRepository,
+)
 from src.services import PaymentService
 from src.observers import PaymentPublisher
-from src.strategies import FeeStrategy, RefundPolicy, FlexibleRefundPolicy
-from src.exceptions import InsufficientFundsError, NotFoundError
+from src.strategies import FeeStrategy, RefundPolicy, FlexibleRefundPolicy, PercentageFee
+from src.exceptions import ConcurrentUpdateError, InsufficientFundsError, NotFoundError
 
 class TestPaymentService(unittest.TestCase):
 
@@ -29,6 +35,7 @@ class TestPaymentService(unittest.TestCase):
         self.reservation_id = 101
         self.fee_strategy = MagicMock(spec=FeeStrategy)
         self.fee_strategy.calculate_fee.return_value = 20.0 # 10% fee
+        self.user_repo.get_by_id.return_value = self.user
 
     def test_process_payment_success(self):
         # Arrange
@@ -48,7 +55,7 @@ class TestPaymentService(unittest.TestCase):
 
         # Assert
         self.assertEqual(self.user.balance, 300.0)
-        self.user_repo.update.assert_called_once_with(self.user)
+        self.user_repo.compare_and_set.assert_called_once_with(self.user, 0)
         self.fee_strategy.calculate_fee.assert_called_once_with(self.amount)
         self.payment_repo.add.assert_called_once()
         self.publisher.notify.assert_called_once_with("payment_completed", new_payment)
@@ -67,7 +74,7 @@ class TestPaymentService(unittest.TestCase):
                 fee_strategy=self.fee_strategy
             )
         
-        self.user_repo.update.assert_not_called()
+        self.user_repo.compare_and_set.assert_not_called()
         self.payment_repo.add.assert_not_called()
         self.publisher.notify.assert_not_called()
 
@@ -76,7 +83,8 @@ class TestPaymentService(unittest.TestCase):
         payment_to_refund = Payment(id=1, reservation_id=self.reservation_id, amount=self.amount, payment_method="balance", status="completed")
         reservation = Reservation(id=self.reservation_id, user_id=self.user.id, caravan_id=1, start_date=date.today(), end_date=date.today(), price=self.amount)
         
-        self.payment_repo.get_all.return_value = [payment_to_refund]
+        self.payment_repo.find_by_reservation_id.return_value = [payment_to_refund]
+        self.payment_repo.get_by_id.return_value = payment_to_refund
         self.reservation_repo.get_by_id.return_value = reservation
         self.user_repo.get_by_id.return_value = self.user
         initial_balance = self.user.balance
@@ -89,21 +97,94 @@ class TestPaymentService(unittest.TestCase):
 
         # Assert
         self.assertEqual(self.user.balance, initial_balance + self.amount)
-        self.user_repo.update.assert_called_once_with(self.user)
-        self.assertEqual(payment_to_refund.status, "refunded")
-        self.payment_repo.update.assert_called_once_with(payment_to_refund)
-        self.publisher.notify.assert_called_once_with("payment_refunded", payment_to_refund)
+        self.user_repo.compare_and_set.assert_called_once_with(self.user, 0)
+        refunded_payment, expected_version = self.payment_repo.compare_and_set.call_args.args
+        self.assertEqual(refunded_payment.status, "refunded")
+        self.assertEqual(expected_version, 0)
+        self.publisher.notify.assert_called_once_with("payment_refunded", refunded_payment)
         refund_policy.calculate_refund_amount.assert_called_once()
+        self.payment_repo.find_by_reservation_id.assert_called_once_with(self.reservation_id, status="completed")
 
     def test_refund_payment_not_found(self):
         # Arrange
-        self.payment_repo.get_all.return_value = []
+        self.payment_repo.find_by_reservation_id.return_value = []
 
         # Act & Assert
         with self.assertRaises(NotFoundError):
             self.payment_service.refund_payment(self.reservation_id)
         self.publisher.notify.assert_not_called()
 
+    def test_refund_payment_already_refunded_concurrently(self):
+        # Arrange
+        payment_to_refund = Payment(id=1, reservation_id=self.reservation_id, amount=self.amount, payment_method="balance", status="completed")
+        reservation = Reservation(id=self.reservation_id, user_id=self.user.id, caravan_id=1, start_date=date.today(), end_date=date.today(), price=self.amount)
+        self.payment_repo.find_by_reservation_id.return_value = [payment_to_refund]
+        self.payment_repo.get_by_id.return_value = Payment(
+            id=1, reservation_id=self.reservation_id, amount=self.amount, payment_method="balance", status="refunded", version=1
+        )
+        self.reservation_repo.get_by_id.return_value = reservation
+
+        # Act & Assert
+        with self.assertRaises(NotFoundError):
+            self.payment_service.refund_payment(self.reservation_id)
+        self.assertEqual(self.user.balance, 500.0)
+        self.user_repo.compare_and_set.assert_not_called()
+        self.publisher.notify.assert_not_called()
+
+    def test_process_payment_gives_up_on_a_balance_that_keeps_changing(self):
+        # Arrange
+        self.user_repo.compare_and_set.return_value = False
+
+        # Act & Assert
+        with self.assertRaises(ConcurrentUpdateError):
+            self.payment_service.process_payment(self.user, self.reservation_id, self.amount, self.fee_strategy)
+        self.assertEqual(self.user.balance, 500.0)
+        self.payment_repo.add.assert_not_called()
+        self.publisher.notify.assert_not_called()
+
+class TestConcurrentPayments(unittest.TestCase):
+
+    def create_repositories(self):
+        return UserRepository(), PaymentRepository(), ReservationRepository()
+
+    def setUp(self):
+        self.user_repo, self.payment_repo, reservation_repo = self.create_repositories()
+        self.payment_service = PaymentService(self.user_repo, self.payment_repo, reservation_repo, PaymentPublisher())
+        self.old_interval = sys.getswitchinterval()
+        # Switch threads as often as possible so that read-modify-write races show up.
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.old_interval)
+
+    def test_concurrent_debits_of_one_account_are_not_lost(self):
+        account = self.user_repo.add(User(id=0, name="Hot", contact="", is_host=False, balance=300.0))
+        declined = []
+
+        def pay():
+            # Every thread holds its own copy of the user, as separate requests would.
+            user = replace(self.user_repo.get_by_id(account.id))
+            for _ in range(50):
+                try:
+                    self.payment_service.process_payment(user, 1, 1.0, PercentageFee(0))
+                except InsufficientFundsError:
+                    declined.append(1)
+
+        threads = [threading.Thread(target=pay) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.user_repo.get_by_id(account.id).balance, 0.0)
+        self.assertEqual(len(self.payment_repo.get_all()), 300)
+        self.assertEqual(len(declined), 100)
+
+class TestSqliteConcurrentPayments(TestConcurrentPayments):
+
+    def create_repositories(self):
+        db = SqliteDatabase()
+        return SqliteUserRepository(db), SqlitePaymentRepository(db), SqliteReservationRepository(db)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,169 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import date
+
+# Add src to path to allow imports
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan, Reservation
+from src.repositories import CaravanRepository, ReservationRepository, RepositoryPersistence
+
+class TestRepositoryPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def open_caravans(self):
+        repo = CaravanRepository()
+        persistence = RepositoryPersistence(repo, self.directory, group_interval=0)
+        persistence.recover()
+        return repo, persistence
+
+    def test_recover_replays_log(self):
+        repo, persistence = self.open_caravans()
+        c1 = repo.add(Caravan(id=0, host_id=1, name="C1", capacity=2, location="", latitude=37.42, longitude=-122.08))
+        c2 = repo.add(Caravan(id=0, host_id=1, name="C2", capacity=2, location="", latitude=37.33, longitude=-122.0))
+        c1.average_rating = 4.5
+        repo.update(c1)
+        repo.delete(c2.id)
+        persistence.close()
+
+        recovered, persistence = self.open_caravans()
+        self.assertEqual(recovered.get_all(), [c1])
+        self.assertEqual(recovered.find_nearby(37.4, -122.1, 5), [c1])
+        self.assertEqual(recovered.get_popular_caravans(1), [c1])
+        # New ids continue after the recovered ones
+        c3 = recovered.add(Caravan(id=0, host_id=1, name="C3", capacity=2, location=""))
+        self.assertEqual(c3.id, 3)
+        persistence.close()
+
+    def test_recover_replays_batches(self):
+        repo, persistence = self.open_caravans()
+        added = repo.add_many(Caravan(id=0, host_id=1, name=f"C{i}", capacity=2, location="") for i in range(3))
+        added[0].average_rating = 5.0
+        repo.update_many([added[0]])
+        repo.delete_many([added[1].id])
+        persistence.close()
+
+        recovered, persistence = self.open_caravans()
+        self.assertEqual(recovered.get_all(), [added[0], added[2]])
+        self.assertEqual(recovered.get_popular_caravans(1), [added[0]])
+        self.assertEqual(recovered.add(Caravan(id=0, host_id=1, name="next", capacity=2, location="")).id, 4)
+        persistence.close()
+
+    def test_writes_are_logged_while_holding_the_repository_lock(self):
+        repo = CaravanRepository()
+        held = []
+
+        class LockProbe:
+            def append(self, operation, payload):
+                # Another thread must not get in between the write and its log record.
+                acquired = []
+                probe = threading.Thread(target=lambda: acquired.append(repo._lock.acquire(blocking=False)))
+                probe.start()
+                probe.join()
+                if acquired[0]:
+                    repo._lock.release()
+                held.append((operation, not acquired[0]))
+
+        repo.attach_change_log(LockProbe())
+        caravan = repo.add(Caravan(id=0, host_id=1, name="C1", capacity=2, location=""))
+        repo.update(caravan)
+        added = repo.add_many([Caravan(id=0, host_id=1, name="C2", capacity=2, location="")])
+        repo.update_many(added)
+        repo.delete(caravan.id)
+        repo.delete_many([added[0].id])
+        self.assertEqual(held, [
+            ("add", True), ("update", True), ("add_many", True),
+            ("update_many", True), ("delete", True), ("delete_many", True),
+        ])
+
+    def test_snapshot_then_tail(self):
+        repo, persistence = self.open_caravans()
+        for i in range(10):
+            repo.add(Caravan(id=0, host_id=1, name=f"C{i}", capacity=2, location=""))
+        persistence.snapshot()
+        tail = repo.add(Caravan(id=0, host_id=1, name="tail", capacity=2, location=""))
+        persistence.close()
+
+        recovered = CaravanRepository()
+        persistence = RepositoryPersistence(recovered, self.directory, group_interval=0)
+        self.assertEqual(persistence.recover(), 1)
+        self.assertEqual(len(recovered.get_all()), 11)
+        self.assertEqual(recovered.get_by_id(tail.id), tail)
+        persistence.close()
+
+    def test_snapshot_while_another_thread_writes(self):
+        repo, persistence = self.open_caravans()
+        stop = threading.Event()
+
+        def write():
+            number = 0
+            while not stop.is_set():
+                caravan = repo.add(Caravan(id=0, host_id=1, name=f"C{number}", capacity=2, location=""))
+                caravan.average_rating = float(number % 5)
+                repo.update(caravan)
+                if number % 3 == 0:
+                    repo.delete(caravan.id)
+                number += 1
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for _ in range(20):
+                persistence.snapshot()
+        finally:
+            stop.set()
+            writer.join()
+        persistence.close()
+
+        recovered, persistence = self.open_caravans()
+        self.assertEqual(
+            sorted((caravan.id, caravan.average_rating) for caravan in recovered.get_all()),
+            sorted((caravan.id, caravan.average_rating) for caravan in repo.get_all()),
+        )
+        persistence.close()
+
+    def test_torn_tail_is_ignored(self):
+        repo, persistence = self.open_caravans()
+        kept = repo.add(Caravan(id=0, host_id=1, name="kept", capacity=2, location=""))
+        persistence.close()
+        with open(os.path.join(self.directory, "changes.log"), "ab") as log_file:
+            log_file.write(b"\x40\x00\x00\x00garbage")
+
+        recovered, persistence = self.open_caravans()
+        self.assertEqual(recovered.get_all(), [kept])
+        after = recovered.add(Caravan(id=0, host_id=1, name="after", capacity=2, location=""))
+        persistence.close()
+
+        recovered, persistence = self.open_caravans()
+        self.assertEqual(recovered.get_all(), [kept, after])
+        persistence.close()
+
+    def test_reservation_repository_recovery(self):
+        repo = ReservationRepository()
+        persistence = RepositoryPersistence(repo, self.directory, group_interval=0)
+        persistence.recover()
+        res = repo.add(Reservation(id=0, user_id=1, caravan_id=1, start_date=date(2025, 1, 1), end_date=date(2025, 1, 5), price=100))
+        persistence.snapshot()
+        res.status = "cancelled"
+        repo.update(res)
+        persistence.close()
+
+        recovered = ReservationRepository()
+        persistence = RepositoryPersistence(recovered, self.directory, group_interval=0)
+        persistence.recover()
+        self.assertEqual(recovered.get_by_id(res.id).status, "cancelled")
+        self.assertEqual(recovered.find_by_caravan_and_dates(1, date(2025, 1, 1), date(2025, 1, 5)), [])
+        self.assertEqual(recovered.find_by_user_id(1), [res])
+        persistence.close()
+
+if __name__ == '__main__':
+    unittest.main()
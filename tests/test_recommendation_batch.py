@@ -0,0 +1,166 @@
+import os
+import random
+import tempfile
+import unittest
+from datetime import date
+
+# Add src to path to allow imports
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan, Reservation, User
+from src.repositories import CaravanRepository, ReservationRepository, UserRepository
+from src.services.recommendation_batch import PrecomputedRecommendations, RecommendationBatchJob, np
+from src.services.recommendation_engine import RecommendationEngine
+
+AMENITIES = ["wifi", "kitchen", "shower", "pets", "solar"]
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestRecommendationBatchJob(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "recommendations.npz")
+        self.rng = random.Random(11)
+        self.user_repo = UserRepository()
+        self.caravan_repo = CaravanRepository()
+        self.reservation_repo = ReservationRepository()
+        self.caravans = [self.add_caravan(f"C{number}") for number in range(120)]
+        self.users = [
+            self.user_repo.add(User(id=0, name=f"U{number}", contact="", is_host=False)) for number in range(60)
+        ]
+        for user in self.users:
+            for caravan in self.rng.sample(self.caravans, self.rng.randint(0, 4)):
+                self.stay(user, caravan)
+
+    def add_caravan(self, name):
+        return self.caravan_repo.add(Caravan(
+            id=0, host_id=1, name=name, capacity=self.rng.randint(1, 8), location="",
+            latitude=self.rng.uniform(33, 38), longitude=self.rng.uniform(126, 130),
+            amenities=self.rng.sample(AMENITIES, self.rng.randint(0, 3)),
+            price_per_day=self.rng.uniform(30, 400), average_rating=self.rng.uniform(1, 5),
+        ))
+
+    def stay(self, user, caravan, status="pending"):
+        return self.reservation_repo.add(Reservation(
+            id=0, user_id=user.id, caravan_id=caravan.id, start_date=date(2025, 1, 1), end_date=date(2025, 1, 3), price=0,
+            status=status,
+        ))
+
+    def create_job(self, **options):
+        return RecommendationBatchJob(self.user_repo, self.caravan_repo, self.reservation_repo, limit=5, **options)
+
+    def assert_matches_engine(self):
+        written = PrecomputedRecommendations.load(self.path)
+        expected = RecommendationEngine(self.caravan_repo, self.reservation_repo).recommend_many(
+            [user.id for user in self.user_repo.get_all()], limit=5
+        )
+        self.assertEqual(len(written), len(expected))
+        for user_id, caravans in expected.items():
+            self.assertEqual(written.for_user(user_id), [caravan.id for caravan in caravans])
+
+    def test_writes_what_the_engine_recommends(self):
+        stats = self.create_job(partition_size=16).run(self.path)
+
+        self.assertEqual(stats["users"], 60)
+        self.assertEqual(stats["reused"], 0)
+        self.assertEqual(stats["scored"], sum(bool(self.reservation_repo.find_by_user_id(user.id)) for user in self.users))
+        self.assert_matches_engine()
+        written = PrecomputedRecommendations.load(self.path)
+        self.assertEqual(written.caravan_ids.dtype, np.int32)
+        self.assertEqual(written.for_user(999), [])
+
+    def test_process_pool_gives_the_same_file(self):
+        self.create_job().run(self.path)
+        single = PrecomputedRecommendations.load(self.path)
+        self.create_job(workers=2, partition_size=10).run(self.path)
+        pooled = PrecomputedRecommendations.load(self.path)
+
+        self.assertTrue(np.array_equal(single.user_ids, pooled.user_ids))
+        self.assertTrue(np.array_equal(single.caravan_ids, pooled.caravan_ids))
+
+    def users_with_stays(self):
+        return sum(
+            any(reservation.status == "pending" for reservation in self.reservation_repo.find_by_user_id(user.id))
+            for user in self.user_repo.get_all()
+        )
+
+    def test_refresh_rescores_only_users_whose_stays_changed(self):
+        job = self.create_job(partition_size=16)
+        job.run(self.path)
+
+        self.stay(self.users[0], self.caravans[0])
+        newcomer = self.user_repo.add(User(id=0, name="New", contact="", is_host=False))
+        self.stay(newcomer, self.caravans[1])
+        self.user_repo.delete(self.users[1].id)
+
+        stats = job.run(self.path, previous_path=self.path)
+        self.assertEqual(stats, {"users": 60, "scored": 2, "reused": self.users_with_stays() - 2})
+        self.assert_matches_engine()
+
+        self.assertEqual(job.run(self.path, previous_path=self.path)["scored"], 0)
+
+    def test_cancelled_and_rejected_reservations_are_not_stays(self):
+        only_cancelled = self.user_repo.add(User(id=0, name="Cancelled", contact="", is_host=False))
+        self.stay(only_cancelled, self.caravans[0], status="cancelled")
+        self.stay(self.users[0], self.caravans[1], status="rejected")
+        job = self.create_job(partition_size=16)
+
+        stats = job.run(self.path)
+        self.assertEqual(stats["scored"], self.users_with_stays())
+        self.assert_matches_engine()
+        popular = [caravan.id for caravan in self.caravan_repo.get_popular_caravans(5)]
+        self.assertEqual(PrecomputedRecommendations.load(self.path).for_user(only_cancelled.id), popular)
+
+        stay = next(reservation for reservation in self.reservation_repo.get_all() if reservation.status == "pending")
+        stay.status = "cancelled"
+        self.reservation_repo.update(stay)
+        self.assertEqual(job.run(self.path, previous_path=self.path)["scored"], 1)
+        self.assert_matches_engine()
+
+    def test_catalog_change_rescores_only_affected_users(self):
+        job = self.create_job()
+        job.run(self.path)
+
+        # Within the catalog's price, position and capacity range, so no other row moves.
+        twin = self.caravans[7]
+        self.caravan_repo.add(Caravan(
+            id=0, host_id=1, name="Twin", capacity=twin.capacity, location="", latitude=twin.latitude,
+            longitude=twin.longitude, amenities=list(twin.amenities), price_per_day=twin.price_per_day, average_rating=5.0,
+        ))
+        stats = job.run(self.path, previous_path=self.path)
+        self.assertGreater(stats["reused"], 0)
+        self.assertEqual(stats["scored"] + stats["reused"], self.users_with_stays())
+        self.assert_matches_engine()
+
+        for caravan in self.rng.sample(self.caravans, 5):
+            caravan.average_rating = self.rng.uniform(1, 5)
+            caravan.amenities = self.rng.sample(AMENITIES, self.rng.randint(0, 3))
+            self.caravan_repo.update(caravan)
+        self.caravan_repo.delete(self.caravans[3].id)
+        stats = job.run(self.path, previous_path=self.path)
+        self.assertGreater(stats["reused"], 0)
+        self.assert_matches_engine()
+        self.assertEqual(job.run(self.path, previous_path=self.path)["scored"], 0)
+
+    def test_rescaling_the_catalog_rescores_everyone(self):
+        job = self.create_job()
+        job.run(self.path)
+
+        pricey = self.add_caravan("Pricey")
+        pricey.price_per_day = 10_000
+        self.caravan_repo.update(pricey)
+        stats = job.run(self.path, previous_path=self.path)
+        self.assertEqual(stats["reused"], 0)
+        self.assert_matches_engine()
+
+        # A different limit cannot reuse the old rows either
+        stats = RecommendationBatchJob(self.user_repo, self.caravan_repo, self.reservation_repo, limit=3).run(
+            self.path, previous_path=self.path
+        )
+        self.assertEqual(stats["reused"], 0)
+        self.assertEqual(PrecomputedRecommendations.load(self.path).limit, 3)
+
+if __name__ == '__main__':
+    unittest.main()
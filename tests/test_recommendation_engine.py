@@ -0,0 +1,146 @@
+import random
+import unittest
+from datetime import date
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan, Reservation
+from src.repositories import CaravanRepository, ReservationRepository
+from src.services.recommendation_engine import CaravanEmbedding, RecommendationEngine, np
+from src.services.recommendation_service import RecommendationService
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestRecommendationEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.caravan_repo = CaravanRepository()
+        self.reservation_repo = ReservationRepository()
+        self.engine = RecommendationEngine(self.caravan_repo, self.reservation_repo)
+
+    def add_caravan(self, name, price, latitude, longitude, amenities, capacity=4, rating=4.0):
+        return self.caravan_repo.add(Caravan(
+            id=0, host_id=1, name=name, capacity=capacity, location="", latitude=latitude, longitude=longitude,
+            amenities=amenities, price_per_day=price, average_rating=rating,
+        ))
+
+    def stay(self, user_id, caravan, status="pending"):
+        self.reservation_repo.add(Reservation(
+            id=0, user_id=user_id, caravan_id=caravan.id, start_date=date(2025, 1, 1), end_date=date(2025, 1, 3), price=0,
+            status=status,
+        ))
+
+    def test_recommends_what_is_like_past_stays(self):
+        visited = self.add_caravan("Visited", 100, 37.5, 127.0, ["wifi", "kitchen"])
+        twin = self.add_caravan("Twin", 105, 37.52, 127.02, ["wifi", "kitchen"])
+        far = self.add_caravan("Far", 100, 33.5, 126.5, ["wifi", "kitchen"])
+        pricey = self.add_caravan("Pricey", 400, 37.5, 127.0, ["wifi", "kitchen"])
+        bare = self.add_caravan("Bare", 100, 37.5, 127.0, [], rating=5.0)
+        self.stay(1, visited)
+
+        self.assertEqual(self.engine.recommend(1, limit=2), [twin, bare])
+        self.assertEqual(self.engine.recommend(1, limit=10), [twin, bare, pricey, far])
+        # Unlike the filtering search, nothing needs to match every amenity.
+        self.assertEqual(len(RecommendationService(self.caravan_repo, self.reservation_repo, self.engine)
+                             .get_personalized_recommendations(1, 3)), 3)
+
+    def test_users_without_stays_get_popular_caravans(self):
+        low = self.add_caravan("Low", 100, 37.5, 127.0, [], rating=3.0)
+        high = self.add_caravan("High", 100, 37.5, 127.0, [], rating=4.5)
+        self.assertEqual(self.engine.recommend(7, limit=1), [high])
+        self.assertEqual(self.engine.recommend_many([7, 8], limit=2), {7: [high, low], 8: [high, low]})
+
+    def test_cancelled_and_rejected_reservations_are_not_stays(self):
+        visited = self.add_caravan("Visited", 100, 37.5, 127.0, ["wifi"], rating=3.0)
+        self.add_caravan("Twin", 100, 37.5, 127.0, ["wifi"], rating=3.5)
+        popular = self.add_caravan("Popular", 300, 35.0, 129.0, [], rating=5.0)
+        self.stay(1, visited, status="cancelled")
+        self.stay(2, visited, status="rejected")
+        self.stay(3, visited)
+
+        recommended = self.engine.recommend_many([1, 2, 3], limit=1)
+        self.assertEqual(recommended[1], [popular])
+        self.assertEqual(recommended[2], [popular])
+        self.assertEqual([caravan.name for caravan in recommended[3]], ["Twin"])
+
+    def test_embedding_follows_catalog_changes(self):
+        visited = self.add_caravan("Visited", 100, 37.5, 127.0, ["wifi"])
+        self.add_caravan("Other", 300, 35.0, 129.0, [])
+        self.stay(1, visited)
+        self.assertEqual([caravan.name for caravan in self.engine.recommend(1)], ["Other"])
+
+        self.add_caravan("Newcomer", 100, 37.5, 127.0, ["wifi"])
+        self.assertEqual([caravan.name for caravan in self.engine.recommend(1)], ["Newcomer", "Other"])
+
+    def test_recommend_many_matches_single_recommendations(self):
+        rng = random.Random(3)
+        amenities = ["wifi", "kitchen", "shower", "pets", "solar"]
+        caravans = [
+            self.add_caravan(f"C{number}", rng.uniform(30, 400), rng.uniform(33, 38), rng.uniform(126, 130),
+                             rng.sample(amenities, rng.randint(0, 3)), capacity=rng.randint(1, 8), rating=rng.uniform(1, 5))
+            for number in range(200)
+        ]
+        for user_id in range(1, 40):
+            for caravan in rng.sample(caravans, rng.randint(0, 4)):
+                self.stay(user_id, caravan)
+
+        engine = RecommendationEngine(self.caravan_repo, self.reservation_repo, batch_size=7)
+        together = engine.recommend_many(range(1, 40), limit=5)
+        self.assertEqual(list(together), list(range(1, 40)))
+        for user_id, recommended in together.items():
+            self.assertEqual(recommended, self.engine.recommend(user_id, limit=5))
+            visited = {reservation.caravan_id for reservation in self.reservation_repo.find_by_user_id(user_id)}
+            self.assertFalse(visited & {caravan.id for caravan in recommended})
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestCaravanEmbedding(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(5)
+        self.caravans = [
+            Caravan(
+                id=number + 1, host_id=1, name=f"C{number}", capacity=rng.randint(1, 8), location="",
+                latitude=rng.uniform(33, 38), longitude=rng.uniform(126, 130),
+                amenities=rng.sample(["wifi", "kitchen", "shower", "pets"], rng.randint(0, 3)),
+                price_per_day=rng.uniform(30, 400), average_rating=rng.uniform(1, 5),
+            )
+            for number in range(50)
+        ]
+        self.embedding = CaravanEmbedding(self.caravans)
+
+    def expected_score(self, history, caravan):
+        """The scoring formula from the CaravanEmbedding docstring, computed directly."""
+        features = self.embedding.numeric
+        rows = [self.embedding.rows[visited.id] for visited in history]
+        centre = features[rows].mean(axis=0)
+        preferred = np.mean([[amenity in visited.amenities for amenity in self.embedding.amenities] for visited in history], axis=0)
+        own = np.array([amenity in caravan.amenities for amenity in self.embedding.amenities], dtype=float)
+        norms = np.linalg.norm(preferred) * np.linalg.norm(own)
+        cosine = preferred @ own / norms if norms else 0.0
+        difference = features[self.embedding.rows[caravan.id]] - centre
+        squared = difference[0] ** 2 + difference[1] ** 2 + difference[2] ** 2 + 0.5 * difference[3] ** 2
+        return cosine - squared + 0.1 * caravan.average_rating / 5
+
+    def test_scores_follow_the_formula(self):
+        history = [self.caravans[3], self.caravans[8], self.caravans[8]]
+        query = self.embedding.queries([[self.embedding.rows[caravan.id] for caravan in history]])
+        best, scores = self.embedding.top_k(query, len(self.caravans))
+
+        expected = {caravan.id: self.expected_score(history, caravan) for caravan in self.caravans}
+        offset = scores[0][0] - expected[int(self.embedding.ids[best[0][0]])]
+        for row, score in zip(best[0], scores[0]):
+            self.assertAlmostEqual(score - offset, expected[int(self.embedding.ids[row])], places=4)
+        self.assertTrue(all(np.diff(scores[0]) <= 0))
+
+    def test_top_k_excludes_and_pads(self):
+        queries = self.embedding.queries([[0], [1, 2]])
+        best, scores = self.embedding.top_k(queries, 3, exclude=[[0], list(range(1, 50))])
+        self.assertEqual(best.shape, (2, 3))
+        self.assertNotIn(0, best[0])
+        self.assertEqual(best[1].tolist(), [0, -1, -1])
+        self.assertEqual(self.embedding.top_k(queries, 0)[0].shape, (2, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
-from datetime import date
+from dataclasses import replace
+from datetime import date, timedelta
 
 # Add src to path to allow imports
 import sys
@@ -7,12 +8,17 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.models import Reservation
-from src.repositories import ReservationRepository
+from src.repositories import ReservationRepository, SqliteReservationRepository, SqliteDatabase
+from src.repositories.interval_index import IntervalIndex
+from src.exceptions import ConcurrentUpdateError
 
 class TestReservationRepository(unittest.TestCase):
 
+    def create_repository(self):
+        return ReservationRepository()
+
     def setUp(self):
-        self.repo = ReservationRepository()
+        self.repo = self.create_repository()
         self.res1 = Reservation(id=0, user_id=1, caravan_id=1, start_date=date(2025, 1, 1), end_date=date(2025, 1, 5), price=100)
         self.res2 = Reservation(id=0, user_id=2, caravan_id=1, start_date=date(2025, 1, 10), end_date=date(2025, 1, 15), price=100)
         self.res3 = Reservation(id=0, user_id=3, caravan_id=2, start_date=date(2025, 1, 1), end_date=date(2025, 1, 5), price=100)
@@ -64,5 +70,196 @@ class TestReservationRepository(unittest.TestCase):
         self.assertEqual(len(other_caravan), 1)
         self.assertEqual(other_caravan[0], self.res3)
 
+    def test_find_by_caravan_and_dates_ignores_cancelled_and_rejected(self):
+        self.repo.add(self.res1)
+        self.repo.add(self.res2)
+
+        self.res1.status = "cancelled"
+        self.repo.update(self.res1)
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 1, 3), date(2025, 1, 7)), [])
+
+        self.res2.status = "rejected"
+        self.repo.update(self.res2)
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 1, 1), date(2025, 1, 31)), [])
+
+    def test_find_by_caravan_and_dates_after_date_change(self):
+        self.repo.add(self.res1)
+
+        self.res1.start_date, self.res1.end_date = date(2025, 2, 1), date(2025, 2, 3)
+        self.repo.update(self.res1)
+
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 1, 1), date(2025, 1, 5)), [])
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 2, 3), date(2025, 2, 9)), [self.res1])
+
+    def test_find_by_caravan_and_dates_with_long_history(self):
+        # One-night stays every other day plus a long stay starting well before the query.
+        start = date(2020, 1, 1).toordinal()
+        for offset in range(0, 2000, 2):
+            self.repo.add(Reservation(
+                id=0, user_id=1, caravan_id=3,
+                start_date=date.fromordinal(start + offset), end_date=date.fromordinal(start + offset + 1), price=10,
+            ))
+        long_stay = self.repo.add(Reservation(
+            id=0, user_id=1, caravan_id=4,
+            start_date=date(2019, 1, 1), end_date=date(2021, 1, 1), price=10,
+        ))
+
+        query_start, query_end = date.fromordinal(start + 101), date.fromordinal(start + 104)
+        overlapping = self.repo.find_by_caravan_and_dates(3, query_start, query_end)
+        self.assertEqual(
+            [(r.start_date, r.end_date) for r in overlapping],
+            [(date.fromordinal(start + d), date.fromordinal(start + d + 1)) for d in (100, 102, 104)],
+        )
+        self.assertEqual(self.repo.find_by_caravan_and_dates(4, query_start, query_end), [long_stay])
+
+    def test_filter_available(self):
+        self.repo.add(self.res1)
+        self.repo.add(self.res2)
+        self.repo.add(self.res3)
+        self.res3.status = "cancelled"
+        self.repo.update(self.res3)
+
+        self.assertEqual(self.repo.filter_available([3, 2, 1], date(2025, 1, 4), date(2025, 1, 6)), [3, 2])
+        self.assertEqual(self.repo.filter_available([1, 2], date(2025, 1, 6), date(2025, 1, 9)), [1, 2])
+
+    def test_find_by_user_id(self):
+        self.repo.add(self.res1)
+        self.repo.add(self.res2)
+        res4 = self.repo.add(Reservation(id=0, user_id=1, caravan_id=2, start_date=date(2025, 2, 1), end_date=date(2025, 2, 5), price=100))
+
+        self.assertEqual(self.repo.find_by_user_id(1), [self.res1, res4])
+        self.assertEqual(self.repo.find_by_user_id(2), [self.res2])
+        self.assertEqual(self.repo.find_by_user_id(999), [])
+
+    def test_find_by_status_follows_updates(self):
+        self.repo.add(self.res1)
+        self.repo.add(self.res2)
+        self.assertEqual(self.repo.find_by_status("pending"), [self.res1, self.res2])
+
+        self.res1.status = "paid"
+        self.repo.update(self.res1)
+        self.assertEqual(self.repo.find_by_status("pending"), [self.res2])
+        self.assertEqual(self.repo.find_by_status("paid"), [self.res1])
+        self.assertEqual(self.repo.find_by_status("cancelled"), [])
+
+    def test_update_moves_reservation_to_another_caravan(self):
+        self.repo.add(self.res1)
+
+        self.res1.caravan_id = 2
+        self.repo.update(self.res1)
+
+        self.assertEqual(self.repo.get_by_id(self.res1.id), self.res1)
+        self.assertEqual(self.repo.get_all(), [self.res1])
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 1, 1), date(2025, 1, 5)), [])
+        self.assertEqual(self.repo.find_by_caravan_and_dates(2, date(2025, 1, 1), date(2025, 1, 5)), [self.res1])
+
+    def test_update_unknown_reservation_is_ignored(self):
+        self.res1.id = 42
+        self.repo.update(self.res1)
+        self.assertIsNone(self.repo.get_by_id(42))
+        self.assertEqual(self.res1.version, 0)
+
+        added = self.repo.add(self.res2)
+        self.res3.id = 43
+        self.repo.update_many([added, self.res3])
+        self.assertEqual((added.version, self.res3.version), (1, 0))
+
+    def test_add_many_and_get_many(self):
+        self.repo.add(self.res1)
+        added = self.repo.add_many([self.res2, self.res3])
+        self.assertEqual([reservation.id for reservation in added], [2, 3])
+        self.assertEqual(self.repo.get_many([3, 999, 1]), [self.res3, None, self.res1])
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 1, 1), date(2025, 1, 31)), [self.res1, self.res2])
+        self.assertEqual(self.repo.find_by_user_id(3), [self.res3])
+
+    def test_update_many_and_delete_many(self):
+        self.repo.add_many([self.res1, self.res2, self.res3])
+        self.res1.status = "cancelled"
+        self.res3.caravan_id = 1
+        self.res3.start_date, self.res3.end_date = date(2025, 1, 20), date(2025, 1, 22)
+        unknown = Reservation(id=42, user_id=9, caravan_id=1, start_date=date(2025, 1, 1), end_date=date(2025, 1, 2), price=1)
+        self.repo.update_many([self.res1, self.res3, unknown])
+
+        self.assertIsNone(self.repo.get_by_id(42))
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 1, 1), date(2025, 1, 31)), [self.res2, self.res3])
+        self.assertEqual(self.repo.find_by_caravan_and_dates(2, date(2025, 1, 1), date(2025, 1, 31)), [])
+        self.assertEqual(self.repo.find_by_status("cancelled"), [self.res1])
+
+        self.repo.delete_many([self.res2.id, self.res3.id, 999])
+        self.assertEqual(self.repo.get_all(), [self.res1])
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 1, 1), date(2025, 1, 31)), [])
+        self.assertEqual(self.repo.find_by_user_id(2), [])
+
+    def test_compare_and_set(self):
+        added = self.repo.add(self.res1)
+        moved = replace(self.repo.get_by_id(added.id), caravan_id=2, status="approved")
+        self.assertTrue(self.repo.compare_and_set(moved, 0))
+        self.assertFalse(self.repo.compare_and_set(replace(moved, status="cancelled"), 0))
+
+        self.assertEqual(self.repo.get_by_id(added.id).version, 1)
+        self.assertEqual(self.repo.find_by_status("approved"), [moved])
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 1, 1), date(2025, 1, 5)), [])
+        self.assertEqual(self.repo.find_by_caravan_and_dates(2, date(2025, 1, 1), date(2025, 1, 5)), [moved])
+
+    def test_update_rejects_a_stale_copy(self):
+        added = self.repo.add(self.res1)
+        other = self.repo.add(self.res2)
+        stale = replace(self.repo.get_by_id(added.id))
+        self.assertTrue(self.repo.compare_and_set(replace(stale, status="cancelled"), 0))
+
+        with self.assertRaises(ConcurrentUpdateError):
+            self.repo.update(replace(stale, status="paid"))
+        with self.assertRaises(ConcurrentUpdateError):
+            self.repo.update_many([replace(self.repo.get_by_id(other.id), status="paid"), replace(stale, status="paid")])
+        self.assertEqual(self.repo.get_by_id(added.id).status, "cancelled")
+        self.assertEqual(self.repo.get_by_id(other.id).version, 0)
+        self.assertEqual(self.repo.find_by_caravan_and_dates(1, date(2025, 1, 1), date(2025, 1, 5)), [])
+
+        fresh = replace(self.repo.get_by_id(added.id), status="paid")
+        self.repo.update(fresh)
+        self.assertEqual(self.repo.get_by_id(added.id).version, 2)
+
+class TestIntervalIndex(unittest.TestCase):
+
+    def test_max_span_shrinks_when_long_intervals_go(self):
+        index = IntervalIndex()
+        index.insert_many([(1, date(2025, 1, 1), date(2025, 1, 3)), (2, date(2025, 1, 5), date(2025, 1, 7))])
+        index.insert(3, date(2024, 1, 1), date(2025, 12, 31))
+        self.assertEqual(index.max_span, date(2025, 12, 31).toordinal() - date(2024, 1, 1).toordinal())
+
+        index.remove(3)
+        self.assertEqual(index.max_span, 2)
+        index.insert(1, date(2025, 1, 1), date(2025, 1, 2))
+        self.assertEqual(index.max_span, 2)
+        index.remove(2)
+        self.assertEqual(index.max_span, 1)
+        self.assertEqual(index.overlapping(date(2025, 1, 2), date(2025, 1, 6)), [1])
+        index.remove(1)
+        self.assertEqual(index.max_span, 0)
+
+class TestSqliteReservationRepository(TestReservationRepository):
+
+    def create_repository(self):
+        return SqliteReservationRepository(SqliteDatabase())
+
+    def test_free_caravans_and_windows_without_a_calendar(self):
+        day = date(2025, 1, 1)
+        for caravan_id, start, end, status in [(1, 2, 3, "paid"), (1, 9, 9, "pending"), (1, 5, 6, "cancelled"), (2, 0, 1, "paid")]:
+            self.repo.add(Reservation(
+                id=0, user_id=1, caravan_id=caravan_id, price=0, status=status,
+                start_date=day + timedelta(start), end_date=day + timedelta(end),
+            ))
+
+        self.assertEqual(self.repo.find_free_caravans([3, 2, 1], day + timedelta(1), day + timedelta(2)), [3])
+        self.assertEqual(self.repo.find_free_windows(1, 3, 3, start_date=day), [
+            (day + timedelta(4), day + timedelta(6)),
+            (day + timedelta(10), day + timedelta(12)),
+            (day + timedelta(13), day + timedelta(15)),
+        ])
+        self.assertEqual(self.repo.find_free_windows(1, 2, 2, start_date=day + timedelta(5)), [
+            (day + timedelta(5), day + timedelta(6)), (day + timedelta(7), day + timedelta(8)),
+        ])
+        self.assertEqual(self.repo.find_free_windows(1, 0, 1, start_date=day), [])
+
 if __name__ == '__main__':
     unittest.main()
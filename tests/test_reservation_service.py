@@ -1,6 +1,9 @@
+import random
+import threading
 import unittest
-from datetime import date
-from unittest.mock import MagicMock, call
+from dataclasses import replace
+from datetime import date, timedelta
+from unittest.mock import MagicMock, call, patch
 
 # Add src to path to allow imports
 import sys
@@ -9,10 +12,14 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 
 from src.models import User, Caravan, Reservation
-from src.services import ReservationService, PaymentService
+from src.repositories import (
+    CaravanRepository, PaymentRepository, ReservationRepository, UserRepository,
+    SqliteDatabase, SqliteCaravanRepository, SqlitePaymentRepository, SqliteReservationRepository, SqliteUserRepository,
+)
+from src.services import ReservationService, PaymentService, ReservationRequest
 from src.validators import ReservationValidator
-from src.strategies import PercentageDiscount, FeeStrategy
-from src.observers import ReservationPublisher
+from src.strategies import PercentageDiscount, PercentageFee, FeeStrategy
+from src.observers import ReservationPublisher, PaymentPublisher, Subscriber
 from src.factories import ReservationFactory
 from src.exceptions import DuplicateReservationError, InsufficientFundsError, NotFoundError
 
@@ -57,6 +64,7 @@ class TestReservationService(unittest.TestCase):
             price=self.price, status="pending"
         )
         self.reservation_repo.add.return_value = added_res
+        self.reservation_repo.get_by_id.return_value = added_res
 
         # Act
         reservation = self.reservation_service.create_reservation(
@@ -86,8 +94,8 @@ class TestReservationService(unittest.TestCase):
             amount=self.price,
             fee_strategy=self.fee_strategy # Assert fee strategy is passed
         )
-        self.reservation_repo.update.assert_called_once_with(added_res)
-        self.publisher.notify.assert_called_once_with("reservation_created", added_res)
+        self.reservation_repo.compare_and_set.assert_called_once_with(reservation, added_res.version)
+        self.publisher.notify.assert_called_once_with("reservation_created", reservation)
         self.assertEqual(reservation.status, "paid")
         self.assertEqual(reservation.price, self.price)
 
@@ -110,6 +118,7 @@ class TestReservationService(unittest.TestCase):
             price=discounted_price, status="pending"
         )
         self.reservation_repo.add.return_value = added_res
+        self.reservation_repo.get_by_id.return_value = added_res
 
         # Act
         reservation = self.reservation_service.create_reservation(
@@ -135,7 +144,7 @@ class TestReservationService(unittest.TestCase):
             amount=discounted_price,
             fee_strategy=self.fee_strategy # Assert fee strategy is passed
         )
-        self.publisher.notify.assert_called_once_with("reservation_created", added_res)
+        self.publisher.notify.assert_called_once_with("reservation_created", reservation)
         self.assertEqual(reservation.price, discounted_price)
         self.assertEqual(reservation.status, "paid")
 
@@ -181,6 +190,7 @@ class TestReservationService(unittest.TestCase):
                 price=self.price,
                 fee_strategy=self.fee_strategy # Pass mock fee strategy
             )
+        self.reservation_repo.delete.assert_called_once_with(self.reservation_repo.add.return_value.id)
         self.publisher.notify.assert_not_called()
 
 
@@ -213,7 +223,7 @@ class TestReservationService(unittest.TestCase):
         # Assert
         self.reservation_repo.get_by_id.assert_called_once_with(1)
         self.assertEqual(result.status, "approved")
-        self.reservation_repo.update.assert_called_once_with(result)
+        self.reservation_repo.compare_and_set.assert_called_once_with(result, 0)
         self.publisher.notify.assert_called_once_with("reservation_approved", result)
 
     def test_reject_reservation(self):
@@ -227,7 +237,7 @@ class TestReservationService(unittest.TestCase):
         # Assert
         self.reservation_repo.get_by_id.assert_called_once_with(1)
         self.assertEqual(result.status, "rejected")
-        self.reservation_repo.update.assert_called_once_with(result)
+        self.reservation_repo.compare_and_set.assert_called_once_with(result, 0)
         self.publisher.notify.assert_called_once_with("reservation_rejected", result)
 
     def test_cancel_reservation(self):
@@ -241,16 +251,32 @@ class TestReservationService(unittest.TestCase):
         # Assert
         self.reservation_repo.get_by_id.assert_called_once_with(1)
         self.assertEqual(result.status, "cancelled")
-        self.reservation_repo.update.assert_called_once_with(result)
+        self.reservation_repo.compare_and_set.assert_called_once_with(result, 0)
         self.publisher.notify.assert_called_once_with("reservation_cancelled", result)
 
-    def test_get_reservation_or_fail_not_found(self):
+    def test_transition_not_found(self):
         # Arrange
         self.reservation_repo.get_by_id.return_value = None
         
         # Act & Assert
         with self.assertRaises(NotFoundError):
-            self.reservation_service._get_reservation_or_fail(999)
+            self.reservation_service.approve_reservation(999)
+        self.publisher.notify.assert_not_called()
+
+    def test_transition_retries_after_a_concurrent_write(self):
+        # Arrange
+        stale = Reservation(id=1, user_id=1, caravan_id=1, start_date=self.start_date, end_date=self.end_date, price=100, version=3)
+        fresh = Reservation(id=1, user_id=1, caravan_id=1, start_date=self.start_date, end_date=self.end_date, price=100, version=4)
+        self.reservation_repo.get_by_id.side_effect = [stale, fresh]
+        self.reservation_repo.compare_and_set.side_effect = [False, True]
+
+        # Act
+        result = self.reservation_service.cancel_reservation(1)
+
+        # Assert
+        self.assertEqual([args[1] for args, _ in self.reservation_repo.compare_and_set.call_args_list], [3, 4])
+        self.assertEqual(result.version, 4)
+        self.assertEqual(result.status, "cancelled")
 
     def test_complete_reservation(self):
         # Arrange
@@ -263,9 +289,244 @@ class TestReservationService(unittest.TestCase):
         # Assert
         self.reservation_repo.get_by_id.assert_called_once_with(1)
         self.assertEqual(result.status, "completed")
-        self.reservation_repo.update.assert_called_once_with(result)
+        self.reservation_repo.compare_and_set.assert_called_once_with(result, 0)
         self.publisher.notify.assert_called_once_with("review_requested", result)
 
 
+class RecordingSubscriber(Subscriber):
+    def __init__(self):
+        self.batches = []
+
+    def update(self, publisher, event, data):
+        self.batches.append((event, [data]))
+
+    def update_many(self, publisher, event, items):
+        self.batches.append((event, list(items)))
+
+def in_memory_repositories():
+    return UserRepository(), CaravanRepository(), ReservationRepository(), PaymentRepository()
+
+def sqlite_repositories():
+    db = SqliteDatabase()
+    return SqliteUserRepository(db), SqliteCaravanRepository(db), SqliteReservationRepository(db), SqlitePaymentRepository(db)
+
+class TestReservationServiceBatch(unittest.TestCase):
+
+    def create_repositories(self):
+        return in_memory_repositories()
+
+    def setUp(self):
+        self.user_repo, self.caravan_repo, self.reservation_repo, self.payment_repo = self.create_repositories()
+        self.reservation_events = RecordingSubscriber()
+        self.payment_events = RecordingSubscriber()
+        reservation_publisher = ReservationPublisher()
+        reservation_publisher.subscribe(self.reservation_events)
+        payment_publisher = PaymentPublisher()
+        payment_publisher.subscribe(self.payment_events)
+
+        payment_service = PaymentService(self.user_repo, self.payment_repo, self.reservation_repo, payment_publisher)
+        self.validator = ReservationValidator(self.user_repo, self.caravan_repo, self.reservation_repo)
+        self.service = ReservationService(
+            self.reservation_repo, payment_service, self.validator, reservation_publisher, ReservationFactory()
+        )
+
+        self.guest = self.user_repo.add(User(id=0, name="Guest", contact="", is_host=False, balance=1000.0))
+        self.other = self.user_repo.add(User(id=0, name="Other", contact="", is_host=False, balance=100.0))
+        self.caravan1 = self.caravan_repo.add(Caravan(id=0, host_id=9, name="C1", capacity=4, location=""))
+        self.caravan2 = self.caravan_repo.add(Caravan(id=0, host_id=9, name="C2", capacity=4, location=""))
+        self.reservation_repo.add(Reservation(
+            id=0, user_id=self.other.id, caravan_id=self.caravan1.id,
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 3), price=0, status="paid",
+        ))
+
+    def test_create_reservations_reports_each_item(self):
+        requests = [
+            # Clashes with the existing booking
+            ReservationRequest(self.guest.id, self.caravan1.id, date(2025, 1, 2), date(2025, 1, 4), 100),
+            ReservationRequest(self.guest.id, self.caravan1.id, date(2025, 1, 10), date(2025, 1, 12), 300),
+            # Clashes with the request just accepted
+            ReservationRequest(self.guest.id, self.caravan1.id, date(2025, 1, 12), date(2025, 1, 14), 100),
+            ReservationRequest(self.guest.id, self.caravan2.id, date(2025, 1, 10), date(2025, 1, 12), 500, PercentageDiscount(20)),
+            ReservationRequest(self.other.id, self.caravan2.id, date(2025, 2, 1), date(2025, 2, 2), 150),
+            ReservationRequest(999, self.caravan2.id, date(2025, 3, 1), date(2025, 3, 2), 10),
+            ReservationRequest(self.guest.id, 999, date(2025, 3, 1), date(2025, 3, 2), 10),
+        ]
+        results = self.service.create_reservations(requests, fee_strategy=PercentageFee(10))
+
+        self.assertEqual([result.succeeded for result in results], [False, True, False, True, False, False, False])
+        self.assertEqual(
+            [type(result.error).__name__ for result in results],
+            ["DuplicateReservationError", "NoneType", "DuplicateReservationError", "NoneType",
+             "InsufficientFundsError", "NotFoundError", "NotFoundError"],
+        )
+        self.assertEqual([result.reservation.price for result in results if result.succeeded], [300, 400])
+        self.assertTrue(all(result.reservation.status == "paid" for result in results if result.succeeded))
+        self.assertEqual(self.user_repo.get_by_id(self.guest.id).balance, 300.0)
+        self.assertEqual(self.user_repo.get_by_id(self.other.id).balance, 100.0)
+        self.assertEqual([payment.platform_fee for payment in self.payment_repo.get_all()], [30.0, 40.0])
+
+        self.assertEqual(len(self.reservation_events.batches), 1)
+        event, reservations = self.reservation_events.batches[0]
+        self.assertEqual(event, "reservation_created")
+        self.assertEqual(reservations, [results[1].reservation, results[3].reservation])
+        self.assertEqual([(event, len(items)) for event, items in self.payment_events.batches], [("payment_completed", 2)])
+
+    def test_create_reservations_with_nothing_accepted(self):
+        results = self.service.create_reservations(
+            [ReservationRequest(self.other.id, self.caravan2.id, date(2025, 2, 1), date(2025, 2, 2), 1000)],
+            fee_strategy=PercentageFee(10),
+        )
+        self.assertIsInstance(results[0].error, InsufficientFundsError)
+        self.assertEqual(self.reservation_events.batches, [])
+        self.assertEqual(len(self.reservation_repo.get_all()), 1)
+
+    def test_a_failed_payment_only_refuses_that_users_bookings(self):
+        find_taken_dates = self.validator.find_taken_dates
+
+        def spend_meanwhile(caravan_id, date_ranges):
+            # Another request empties Other's account after the batch read the balances.
+            other = self.user_repo.get_by_id(self.other.id)
+            self.user_repo.compare_and_set(replace(other, balance=0.0), other.version)
+            return find_taken_dates(caravan_id, date_ranges)
+
+        requests = [
+            ReservationRequest(self.guest.id, self.caravan2.id, date(2025, 1, 1), date(2025, 1, 2), 100),
+            ReservationRequest(self.other.id, self.caravan2.id, date(2025, 2, 1), date(2025, 2, 2), 50),
+            ReservationRequest(self.guest.id, self.caravan1.id, date(2025, 2, 1), date(2025, 2, 2), 200),
+        ]
+        with patch.object(self.validator, "find_taken_dates", side_effect=spend_meanwhile):
+            results = self.service.create_reservations(requests, fee_strategy=PercentageFee(10))
+
+        self.assertEqual([result.succeeded for result in results], [True, False, True])
+        self.assertIsInstance(results[1].error, InsufficientFundsError)
+        self.assertEqual(self.user_repo.get_by_id(self.guest.id).balance, 700.0)
+        self.assertEqual(self.reservation_repo.find_by_caravan_and_dates(self.caravan2.id, date(2025, 2, 1), date(2025, 2, 2)), [])
+        self.assertEqual(self.reservation_repo.find_by_user_id(self.other.id)[0].caravan_id, self.caravan1.id)
+        self.assertEqual(
+            sorted(payment.reservation_id for payment in self.payment_repo.get_all()),
+            [results[0].reservation.id, results[2].reservation.id],
+        )
+        self.assertEqual(self.reservation_events.batches, [("reservation_created", [results[0].reservation, results[2].reservation])])
+
+
+    def test_a_refused_payment_frees_the_dates(self):
+        with self.assertRaises(InsufficientFundsError):
+            self.service.create_reservation(
+                self.other.id, self.caravan2.id, date(2025, 2, 1), date(2025, 2, 2), 1000, fee_strategy=PercentageFee(10)
+            )
+        self.assertEqual(self.reservation_repo.find_by_caravan_and_dates(self.caravan2.id, date(2025, 2, 1), date(2025, 2, 2)), [])
+        self.assertEqual(self.reservation_repo.find_by_user_id(self.other.id)[0].caravan_id, self.caravan1.id)
+        self.assertEqual(self.user_repo.get_by_id(self.other.id).balance, 100.0)
+
+        booked = self.service.create_reservation(
+            self.guest.id, self.caravan2.id, date(2025, 2, 1), date(2025, 2, 2), 100, fee_strategy=PercentageFee(10)
+        )
+        self.assertEqual(booked.status, "paid")
+        self.assertEqual(self.reservation_events.batches, [("reservation_created", [booked])])
+
+
+class TestSqliteReservationServiceBatch(TestReservationServiceBatch):
+
+    def create_repositories(self):
+        return sqlite_repositories()
+
+class TestConcurrentBookings(unittest.TestCase):
+
+    def create_repositories(self):
+        return in_memory_repositories()
+
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        # Switch threads often so that unprotected check-then-insert sequences would interleave.
+        sys.setswitchinterval(1e-6)
+        self.user_repo, self.caravan_repo, self.reservation_repo, self.payment_repo = self.create_repositories()
+        payment_service = PaymentService(self.user_repo, self.payment_repo, self.reservation_repo, PaymentPublisher())
+        validator = ReservationValidator(self.user_repo, self.caravan_repo, self.reservation_repo)
+        self.service = ReservationService(
+            self.reservation_repo, payment_service, validator, ReservationPublisher(), ReservationFactory()
+        )
+        self.caravans = [
+            self.caravan_repo.add(Caravan(id=0, host_id=99, name=f"C{number}", capacity=2, location=""))
+            for number in range(4)
+        ]
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_concurrent_bookings_never_overlap(self):
+        threads, attempts = 8, 60
+        users = [
+            self.user_repo.add(User(id=0, name=f"U{number}", contact="", is_host=False, balance=1e9))
+            for number in range(threads)
+        ]
+        outcomes = {"booked": 0, "refused": 0}
+        outcomes_lock = threading.Lock()
+        start = threading.Barrier(threads)
+
+        def book(user, seed):
+            rng = random.Random(seed)
+            start.wait()
+            for _ in range(attempts):
+                first_day = date(2025, 1, 1) + timedelta(rng.randrange(60))
+                caravan = rng.choice(self.caravans)
+                try:
+                    self.service.create_reservation(
+                        user.id, caravan.id, first_day, first_day + timedelta(rng.randrange(4)), 10, fee_strategy=PercentageFee(10)
+                    )
+                    outcome = "booked"
+                except DuplicateReservationError:
+                    outcome = "refused"
+                with outcomes_lock:
+                    outcomes[outcome] += 1
+
+        workers = [threading.Thread(target=book, args=(user, seed)) for seed, user in enumerate(users)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        reservations = self.reservation_repo.get_all()
+        self.assertEqual(outcomes["booked"] + outcomes["refused"], threads * attempts)
+        self.assertEqual(len(reservations), outcomes["booked"])
+        self.assertEqual(len({reservation.id for reservation in reservations}), len(reservations))
+        self.assertEqual(len({payment.id for payment in self.payment_repo.get_all()}), len(reservations))
+        for caravan in self.caravans:
+            booked = sorted(
+                (reservation.start_date, reservation.end_date)
+                for reservation in reservations if reservation.caravan_id == caravan.id
+            )
+            for (_, previous_end), (next_start, _) in zip(booked, booked[1:]):
+                self.assertLess(previous_end, next_start)
+
+    def test_batches_and_single_bookings_share_the_caravan_locks(self):
+        user = self.user_repo.add(User(id=0, name="U", contact="", is_host=False, balance=1e9))
+        requests = [
+            ReservationRequest(user.id, caravan.id, date(2025, 1, day), date(2025, 1, day), 10)
+            for caravan in self.caravans for day in range(1, 11)
+        ]
+
+        def book_singles():
+            for caravan in self.caravans:
+                try:
+                    self.service.create_reservation(
+                        user.id, caravan.id, date(2025, 1, 5), date(2025, 1, 5), 10, fee_strategy=PercentageFee(10)
+                    )
+                except DuplicateReservationError:
+                    pass
+
+        singles = threading.Thread(target=book_singles)
+        singles.start()
+        self.service.create_reservations(requests, fee_strategy=PercentageFee(10))
+        singles.join()
+
+        for caravan in self.caravans:
+            booked = self.reservation_repo.find_by_caravan_and_dates(caravan.id, date(2025, 1, 5), date(2025, 1, 5))
+            self.assertEqual(len(booked), 1)
+
+class TestSqliteConcurrentBookings(TestConcurrentBookings):
+
+    def create_repositories(self):
+        return sqlite_repositories()
+
 if __name__ == '__main__':
     unittest.main()
@@ -7,7 +7,11 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.models import User, Caravan
+from src.models import User, Caravan, Reservation
+from src.repositories import (
+    CaravanRepository, ReservationRepository, UserRepository,
+    SqliteDatabase, SqliteCaravanRepository, SqliteReservationRepository, SqliteUserRepository,
+)
 from src.validators import ReservationValidator
 from src.exceptions import NotFoundError, DuplicateReservationError
 
@@ -60,6 +64,69 @@ class TestReservationValidator(unittest.TestCase):
         self.reservation_repo.find_by_caravan_and_dates.return_value = [MagicMock()]
         with self.assertRaises(DuplicateReservationError):
             self.validator.validate_no_duplicate_reservations(1, self.start_date, self.end_date)
+    def test_find_existing_users_and_caravans(self):
+        self.user_repo.get_many.return_value = [self.user, None]
+        self.assertEqual(self.validator.find_existing_users([1, 999, 1]), {1: self.user})
+        self.user_repo.get_many.assert_called_once_with([1, 999])
+
+        self.caravan_repo.get_many.return_value = [self.caravan]
+        self.assertEqual(self.validator.find_existing_caravans([1]), {1: self.caravan})
+
+    def test_find_taken_dates_queries_once_for_the_batch(self):
+        existing = Reservation(id=7, user_id=1, caravan_id=1, start_date=date(2025, 1, 3), end_date=date(2025, 1, 4), price=0)
+        self.reservation_repo.find_by_caravan_and_dates.return_value = [existing]
+        taken = self.validator.find_taken_dates(1, [(date(2025, 1, 10), date(2025, 1, 12)), (self.start_date, self.end_date)])
+
+        self.reservation_repo.find_by_caravan_and_dates.assert_called_once_with(1, self.start_date, date(2025, 1, 12))
+        self.assertEqual(taken.overlapping(self.start_date, self.end_date), [7])
+        self.assertEqual(taken.overlapping(date(2025, 1, 10), date(2025, 1, 12)), [])
+
+class TestReservationValidatorWithRepositories(unittest.TestCase):
+
+    def create_repositories(self):
+        return UserRepository(), CaravanRepository(), ReservationRepository()
+
+    def setUp(self):
+        self.user_repo, self.caravan_repo, self.reservation_repo = self.create_repositories()
+        self.validator = ReservationValidator(self.user_repo, self.caravan_repo, self.reservation_repo)
+        self.user = self.user_repo.add(User(id=0, name="Guest", contact="", is_host=False))
+        self.caravan = self.caravan_repo.add(Caravan(id=0, host_id=2, name="C1", capacity=4, location=""))
+        self.booked = self.reservation_repo.add(Reservation(
+            id=0, user_id=self.user.id, caravan_id=self.caravan.id,
+            start_date=date(2025, 1, 3), end_date=date(2025, 1, 4), price=0,
+        ))
+
+    def test_validate_existence(self):
+        self.assertEqual(self.validator.validate_user_exists(self.user.id).name, "Guest")
+        self.assertEqual(self.validator.validate_caravan_exists(self.caravan.id).name, "C1")
+        with self.assertRaises(NotFoundError):
+            self.validator.validate_user_exists(999)
+        with self.assertRaises(NotFoundError):
+            self.validator.validate_caravan_exists(999)
+        self.assertEqual(list(self.validator.find_existing_users([self.user.id, 999])), [self.user.id])
+        self.assertEqual(list(self.validator.find_existing_caravans([999, self.caravan.id])), [self.caravan.id])
+
+    def test_validate_no_duplicate_reservations(self):
+        with self.assertRaises(DuplicateReservationError):
+            self.validator.validate_no_duplicate_reservations(self.caravan.id, date(2025, 1, 1), date(2025, 1, 3))
+        self.validator.validate_no_duplicate_reservations(self.caravan.id, date(2025, 1, 5), date(2025, 1, 9))
+
+        self.booked.status = "cancelled"
+        self.reservation_repo.update(self.booked)
+        self.validator.validate_no_duplicate_reservations(self.caravan.id, date(2025, 1, 1), date(2025, 1, 3))
+
+    def test_find_taken_dates(self):
+        taken = self.validator.find_taken_dates(
+            self.caravan.id, [(date(2025, 1, 10), date(2025, 1, 12)), (date(2025, 1, 1), date(2025, 1, 3))]
+        )
+        self.assertEqual(taken.overlapping(date(2025, 1, 1), date(2025, 1, 3)), [self.booked.id])
+        self.assertEqual(taken.overlapping(date(2025, 1, 10), date(2025, 1, 12)), [])
+
+class TestSqliteReservationValidator(TestReservationValidatorWithRepositories):
+
+    def create_repositories(self):
+        db = SqliteDatabase()
+        return SqliteUserRepository(db), SqliteCaravanRepository(db), SqliteReservationRepository(db)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Review
+from src.repositories import ReviewRepository, SqliteReviewRepository, SqliteDatabase
+
+class TestReviewRepository(unittest.TestCase):
+
+    def create_repository(self):
+        return ReviewRepository()
+
+    def setUp(self):
+        self.repo = self.create_repository()
+        self.review1 = self.repo.add(Review(id=0, reservation_id=1, rating=5, comment="", author_id=1, subject_id=10))
+        self.review2 = self.repo.add(Review(id=0, reservation_id=2, rating=3, comment="", author_id=1, subject_id=11))
+        self.review3 = self.repo.add(Review(id=0, reservation_id=3, rating=4, comment="", author_id=2, subject_id=10))
+
+    def test_find_by_author_and_subject(self):
+        self.assertEqual(self.repo.find_by_author_id(1), [self.review1, self.review2])
+        self.assertEqual(self.repo.find_by_subject_id(10), [self.review1, self.review3])
+        self.assertEqual(self.repo.find_by_author_id(999), [])
+
+    def test_rating_summaries(self):
+        self.assertEqual(self.repo.get_author_rating_summary(1), (2, 8))
+        self.assertEqual(self.repo.get_subject_rating_summary(10), (2, 9))
+        self.assertEqual(self.repo.get_author_rating_summary(999), (0, 0))
+        self.assertEqual(self.repo.get_average_rating_for_subject(10), 4.5)
+        self.assertEqual(self.repo.get_average_rating_for_subject(999), 0.0)
+
+    def test_summaries_follow_update_and_delete(self):
+        self.review2.rating = 1
+        self.review2.subject_id = 10
+        self.repo.update(self.review2)
+        self.assertEqual(self.repo.get_author_rating_summary(1), (2, 6))
+        self.assertEqual(self.repo.get_subject_rating_summary(10), (3, 10))
+        self.assertEqual(self.repo.find_by_subject_id(11), [])
+
+        self.repo.delete(self.review1.id)
+        self.assertEqual(self.repo.get_author_rating_summary(1), (1, 1))
+        self.assertEqual(self.repo.find_by_author_id(1), [self.review2])
+        self.assertEqual(self.repo.get_subject_rating_summary(10), (2, 5))
+
+class TestSqliteReviewRepository(TestReviewRepository):
+
+    def create_repository(self):
+        return SqliteReviewRepository(SqliteDatabase())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -34,5 +34,19 @@ class TestReviewService(unittest.TestCase):
         self.publisher.notify.assert_called_once_with("review_created", new_review)
         self.assertEqual(review, new_review)
 
+    def test_is_trusted_reviewer(self):
+        self.review_repo.get_author_rating_summary.return_value = (5, 22)
+        self.assertTrue(self.review_service.is_trusted_reviewer(1))
+        self.review_repo.get_author_rating_summary.assert_called_once_with(1)
+
+    def test_is_not_trusted_reviewer(self):
+        # Too few reviews
+        self.review_repo.get_author_rating_summary.return_value = (4, 20)
+        self.assertFalse(self.review_service.is_trusted_reviewer(1))
+
+        # Average below 4.0
+        self.review_repo.get_author_rating_summary.return_value = (5, 19)
+        self.assertFalse(self.review_service.is_trusted_reviewer(1))
+
 if __name__ == '__main__':
     unittest.main()
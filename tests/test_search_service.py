@@ -0,0 +1,92 @@
+import unittest
+from datetime import date
+
+# Add src to path to allow imports
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import Caravan, Reservation
+from src.repositories import (
+    CaravanRepository, OccupancyCalendar, ReservationRepository, SqliteCaravanRepository, SqliteDatabase,
+    SqliteReservationRepository,
+)
+from src.repositories.occupancy_calendar import np
+from src.services import SearchService
+
+class TestSearchService(unittest.TestCase):
+
+    def create_repositories(self):
+        return CaravanRepository(), self.create_reservation_repository()
+
+    def create_reservation_repository(self):
+        return ReservationRepository()
+
+    def setUp(self):
+        self.caravan_repo, self.reservation_repo = self.create_repositories()
+        self.service = SearchService(self.caravan_repo, self.reservation_repo)
+        # Googleplex, Apple Park, New York
+        for name, latitude, longitude, price, amenities in [
+            ("C1", 37.422, -122.084, 100.0, ["wifi"]),
+            ("C2", 37.334, -122.009, 150.0, ["wifi", "pets"]),
+            ("C3", 37.41, -122.09, 250.0, ["pets"]),
+            ("C4", 40.7128, -74.0060, 100.0, ["wifi"]),
+        ]:
+            self.caravan_repo.add(Caravan(
+                id=0, name=name, host_id=1, capacity=2, location="", latitude=latitude, longitude=longitude,
+                price_per_day=price, amenities=amenities,
+            ))
+        self.reservation_repo.add(Reservation(
+            id=0, user_id=1, caravan_id=1, start_date=date(2025, 1, 10), end_date=date(2025, 1, 12), price=300,
+        ))
+
+    def names(self, caravans):
+        return [caravan.name for caravan in caravans]
+
+    def test_combines_location_filters_and_availability(self):
+        nearby = dict(latitude=37.4, longitude=-122.1, radius=20)
+        self.assertEqual(self.names(self.service.search(**nearby)), ["C1", "C2", "C3"])
+        self.assertEqual(self.names(self.service.search(**nearby, max_price=200, required_amenities=["wifi"])), ["C1", "C2"])
+        self.assertEqual(
+            self.names(self.service.search(**nearby, start_date=date(2025, 1, 11), end_date=date(2025, 1, 14))),
+            ["C2", "C3"],
+        )
+        self.assertEqual(
+            self.names(self.service.search(start_date=date(2025, 1, 11), end_date=date(2025, 1, 14), limit=2, offset=1)),
+            ["C3", "C4"],
+        )
+
+    def test_explain_reports_the_plan(self):
+        plan = self.service.explain(latitude=37.4, longitude=-122.1, radius=5, min_price=50)
+        self.assertEqual(plan.driver, "nearby")
+        self.assertEqual(plan.filters, ["price"])
+
+    def test_rejects_incomplete_arguments(self):
+        with self.assertRaises(ValueError):
+            self.service.search(latitude=37.4, longitude=-122.1)
+        with self.assertRaises(ValueError):
+            self.service.search(start_date=date(2025, 1, 1))
+        with self.assertRaises(ValueError):
+            self.service.search(start_date=date(2025, 1, 2), end_date=date(2025, 1, 1))
+        with self.assertRaises(ValueError):
+            self.service.search(limit=-1)
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestSearchServiceWithOccupancyCalendar(TestSearchService):
+
+    def create_reservation_repository(self):
+        return ReservationRepository(OccupancyCalendar(date(2025, 1, 1), horizon_days=60))
+
+class TestSearchServiceWithSqliteReservations(TestSearchService):
+
+    def create_reservation_repository(self):
+        return SqliteReservationRepository(SqliteDatabase())
+
+class TestSqliteSearchService(TestSearchService):
+
+    def create_repositories(self):
+        db = SqliteDatabase()
+        return SqliteCaravanRepository(db), SqliteReservationRepository(db)
+
+if __name__ == '__main__':
+    unittest.main()
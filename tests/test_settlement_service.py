@@ -1,4 +1,5 @@
 import unittest
+from dataclasses import replace
 from unittest.mock import MagicMock
 from datetime import datetime
 
@@ -7,9 +8,18 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.models import Payment, Settlement, User, Caravan
-from src.services import SettlementService
-from src.exceptions import NotFoundError
+from datetime import date
+from src.models import Payment, Settlement, User, Caravan, Reservation
+from src.observers import PaymentPublisher, PayoutLedger
+from src.repositories import (
+    CaravanRepository, PaymentRepository, ReservationRepository, SettlementRepository, UserRepository,
+    SqliteDatabase, SqliteCaravanRepository, SqlitePaymentRepository, SqliteReservationRepository,
+    SqliteSettlementRepository, SqliteUserRepository,
+)
+from src.services import PaymentService, SettlementService
+from src.services.optimistic import update_with_retry
+from src.strategies import PercentageFee
+from src.exceptions import ConcurrentUpdateError, NotFoundError
 
 class TestSettlementService(unittest.TestCase):
 
@@ -27,40 +37,54 @@ class TestSettlementService(unittest.TestCase):
 
     def test_settle_for_host_success(self):
         # Arrange
-        payment1 = Payment(id=1, reservation_id=1, amount=100.0, payment_method="balance", platform_fee=10.0, settled=False, status="paid")
-        payment2 = Payment(id=2, reservation_id=2, amount=200.0, payment_method="balance", platform_fee=20.0, settled=False, status="paid")
+        payment1 = Payment(id=1, reservation_id=1, amount=100.0, payment_method="balance", platform_fee=10.0, settled=False, status="completed")
+        payment2 = Payment(id=2, reservation_id=2, amount=200.0, payment_method="balance", platform_fee=20.0, settled=False, status="completed")
         
         self.user_repo.get_by_id.return_value = self.host
-        self.payment_repo.get_all.return_value = [payment1, payment2]
+        self.payment_repo.find_by_status.return_value = [payment1, payment2]
+        self.payment_repo.get_many.return_value = [payment1, payment2]
         
         expected_settlement_amount = (100.0 - 10.0) + (200.0 - 20.0) # 90 + 180 = 270
         
         new_settlement = Settlement(id=1, host_id=self.host.id, amount=expected_settlement_amount, payment_ids=[payment1.id, payment2.id])
-        self.settlement_repo.add.return_value = new_settlement
+        self.settlement_repo.add_many.return_value = [new_settlement]
 
         # Act
         settlement = self.settlement_service.settle_for_host(self.host.id)
 
         # Assert
         self.user_repo.get_by_id.assert_called_once_with(self.host.id)
-        self.payment_repo.get_all.assert_called_once()
-        self.settlement_repo.add.assert_called_once()
-        self.payment_repo.update.assert_any_call(payment1)
-        self.payment_repo.update.assert_any_call(payment2)
-        self.assertTrue(payment1.settled)
-        self.assertTrue(payment2.settled)
+        self.payment_repo.find_by_status.assert_called_once_with("completed", settled=False)
+        self.payment_repo.get_many.assert_called_once_with([payment1.id, payment2.id])
+        self.settlement_repo.add_many.assert_called_once()
+        (settled_payments,), _ = self.payment_repo.update_many.call_args
+        self.assertEqual([payment.id for payment in settled_payments], [payment1.id, payment2.id])
+        self.assertTrue(all(payment.settled for payment in settled_payments))
+        # The payments read from the repository are left as they were; the settled copies are written.
+        self.assertFalse(payment1.settled)
         self.assertEqual(settlement.amount, expected_settlement_amount)
         self.assertEqual(settlement.host_id, self.host.id)
 
+    def test_settle_for_host_skips_payments_changed_since_found(self):
+        payment = Payment(id=1, reservation_id=1, amount=100.0, payment_method="balance", platform_fee=10.0, status="completed")
+        self.user_repo.get_by_id.return_value = self.host
+        self.payment_repo.find_by_status.return_value = [payment]
+        self.payment_repo.get_many.return_value = [replace(payment, status="refunded", version=1)]
+
+        with self.assertRaises(ValueError):
+            self.settlement_service.settle_for_host(self.host.id)
+        self.settlement_repo.add_many.assert_not_called()
+        self.payment_repo.update_many.assert_not_called()
+
     def test_settle_for_host_no_unsettled_payments(self):
         # Arrange
         self.user_repo.get_by_id.return_value = self.host
-        self.payment_repo.get_all.return_value = []
+        self.payment_repo.find_by_status.return_value = []
 
         # Act & Assert
         with self.assertRaises(ValueError):
             self.settlement_service.settle_for_host(self.host.id)
-        self.settlement_repo.add.assert_not_called()
+        self.settlement_repo.add_many.assert_not_called()
 
     def test_settle_for_host_not_host(self):
         # Arrange
@@ -69,7 +93,110 @@ class TestSettlementService(unittest.TestCase):
         # Act & Assert
         with self.assertRaises(NotFoundError):
             self.settlement_service.settle_for_host(self.guest.id)
-        self.settlement_repo.add.assert_not_called()
+        self.settlement_repo.add_many.assert_not_called()
+
+class TestSettlementServiceWithLedger(unittest.TestCase):
+
+    workers = 1
+
+    def create_repositories(self):
+        return UserRepository(), CaravanRepository(), ReservationRepository(), PaymentRepository(), SettlementRepository()
+
+    def setUp(self):
+        (
+            self.user_repo, self.caravan_repo, self.reservation_repo, self.payment_repo, self.settlement_repo,
+        ) = self.create_repositories()
+        publisher = PaymentPublisher()
+        self.ledger = PayoutLedger(self.reservation_repo, self.caravan_repo)
+        publisher.subscribe(self.ledger)
+        self.payment_service = PaymentService(self.user_repo, self.payment_repo, self.reservation_repo, publisher)
+        self.settlement_service = SettlementService(
+            self.payment_repo, self.settlement_repo, self.user_repo, self.ledger
+        )
+
+        self.hosts = [
+            self.user_repo.add(User(id=0, name=f"Host {number}", contact=f"host{number}@example.com", is_host=True))
+            for number in range(3)
+        ]
+        self.guest = self.user_repo.add(User(id=0, name="Guest", contact="guest@example.com", is_host=False, balance=10_000.0))
+        self.caravans = [
+            self.caravan_repo.add(Caravan(id=0, host_id=host.id, name=f"C{host.id}", capacity=2, location=""))
+            for host in self.hosts
+        ]
+
+    def pay(self, caravan: Caravan, amount: float, day: int) -> Payment:
+        reservation = self.reservation_repo.add(Reservation(
+            id=0, user_id=self.guest.id, caravan_id=caravan.id,
+            start_date=date(2025, 3, day), end_date=date(2025, 3, day), price=amount,
+        ))
+        guest = self.user_repo.get_by_id(self.guest.id)
+        return self.payment_service.process_payment(guest, reservation.id, amount, PercentageFee(10))
+
+    def test_each_host_is_paid_for_their_own_caravans(self):
+        first = self.pay(self.caravans[0], 100.0, 1)
+        second = self.pay(self.caravans[0], 200.0, 2)
+        self.pay(self.caravans[1], 50.0, 3)
+        self.assertAlmostEqual(self.ledger.total(self.hosts[0].id), 270.0)
+
+        settlement = self.settlement_service.settle_for_host(self.hosts[0].id)
+        self.assertEqual(settlement.payment_ids, [first.id, second.id])
+        self.assertAlmostEqual(settlement.amount, 270.0)
+        self.assertTrue(all(self.payment_repo.get_by_id(payment_id).settled for payment_id in settlement.payment_ids))
+        self.assertEqual(self.ledger.pending_hosts(), [self.hosts[1].id])
+
+        with self.assertRaises(ValueError):
+            self.settlement_service.settle_for_host(self.hosts[0].id)
+        with self.assertRaises(NotFoundError):
+            self.settlement_service.settle_for_host(self.guest.id)
+
+    def test_refunded_payments_are_not_paid_out(self):
+        self.pay(self.caravans[2], 100.0, 1)
+        refunded = self.pay(self.caravans[2], 300.0, 2)
+        self.payment_service.refund_payment(refunded.reservation_id)
+
+        settlement = self.settlement_service.settle_for_host(self.hosts[2].id)
+        self.assertAlmostEqual(settlement.amount, 90.0)
+
+    def test_without_a_ledger_completed_payments_are_settled(self):
+        self.pay(self.caravans[0], 100.0, 1)
+        service = SettlementService(self.payment_repo, self.settlement_repo, self.user_repo)
+
+        settlement = service.settle_for_host(self.hosts[0].id)
+        self.assertAlmostEqual(settlement.amount, 90.0)
+        self.assertEqual(self.payment_repo.find_by_status("completed", settled=False), [])
+
+    def test_settle_all_hosts(self):
+        for day, caravan in enumerate(self.caravans * 3, 1):
+            self.pay(caravan, 10.0 * day, day)
+
+        settlements = self.settlement_service.settle_all_hosts(workers=self.workers, partition_size=2)
+        self.assertEqual(sorted(settlement.host_id for settlement in settlements), [host.id for host in self.hosts])
+        self.assertAlmostEqual(sum(settlement.amount for settlement in settlements), 0.9 * 10.0 * sum(range(1, 10)))
+        self.assertEqual(len(self.settlement_repo.get_all()), 3)
+        self.assertEqual(self.payment_repo.find_by_status("completed", settled=False), [])
+        self.assertEqual(self.settlement_service.settle_all_hosts(), [])
+
+    def test_failed_settlement_keeps_payments_pending(self):
+        self.pay(self.caravans[0], 100.0, 1)
+        self.settlement_repo.add_many = MagicMock(side_effect=RuntimeError("disk full"))
+        with self.assertRaises(RuntimeError):
+            self.settlement_service.settle_all_hosts()
+        self.assertEqual([payment.settled for payment in self.ledger.pending(self.hosts[0].id)], [False])
+
+class TestParallelSettlementServiceWithLedger(TestSettlementServiceWithLedger):
+
+    workers = 2
+
+class TestSqliteSettlementServiceWithLedger(TestSettlementServiceWithLedger):
+
+    workers = 2
+
+    def create_repositories(self):
+        db = SqliteDatabase()
+        return (
+            SqliteUserRepository(db), SqliteCaravanRepository(db), SqliteReservationRepository(db),
+            SqlitePaymentRepository(db), SqliteSettlementRepository(db),
+        )
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+# Add src to path to allow imports
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import User
+from src.repositories import SqliteDatabase, SqliteUserRepository
+
+class TestSqliteDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = SqliteDatabase(os.path.join(self.tmp_dir.name, "caravanshare.db"), pool_size=4)
+        self.repo = SqliteUserRepository(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_transaction_commits_all_writes_together(self):
+        with self.db.transaction():
+            self.repo.add(User(id=0, name="Alice", contact="", is_host=False))
+            self.repo.add(User(id=0, name="Bob", contact="", is_host=False))
+        self.assertEqual([user.name for user in self.repo.get_all()], ["Alice", "Bob"])
+
+    def test_transaction_rolls_back_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.repo.add(User(id=0, name="Alice", contact="", is_host=False))
+                raise RuntimeError("abort")
+        self.assertEqual(self.repo.get_all(), [])
+
+    def test_pooled_connections_across_threads(self):
+        def add_users(prefix):
+            for i in range(20):
+                self.repo.add(User(id=0, name=f"{prefix}-{i}", contact="", is_host=False))
+
+        threads = [threading.Thread(target=add_users, args=(f"t{n}",)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.repo.get_all()), 80)
+
+    def test_data_survives_reopening(self):
+        user = self.repo.add(User(id=0, name="Alice", contact="alice@example.com", is_host=True, balance=12.5))
+        self.db.close()
+
+        reopened = SqliteDatabase(os.path.join(self.tmp_dir.name, "caravanshare.db"))
+        self.assertEqual(SqliteUserRepository(reopened).get_by_id(user.id), user)
+        reopened.close()
+
+    def test_adds_missing_version_columns(self):
+        path = os.path.join(self.tmp_dir.name, "old.db")
+        connection = sqlite3.connect(path)
+        connection.execute(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, contact TEXT NOT NULL,"
+            " is_host INTEGER NOT NULL, balance REAL NOT NULL, is_trusted_reviewer INTEGER NOT NULL, password_hash TEXT)"
+        )
+        connection.execute("INSERT INTO users VALUES (1, 'Alice', '', 0, 5.0, 0, NULL)")
+        connection.commit()
+        connection.close()
+
+        upgraded = SqliteDatabase(path)
+        user = SqliteUserRepository(upgraded).get_by_id(1)
+        self.assertEqual((user.name, user.version), ("Alice", 0))
+        upgraded.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from dataclasses import replace
 
 # Add src to path to allow imports
 import sys
@@ -6,12 +7,16 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.models import User
-from src.repositories import UserRepository
+from src.repositories import UserRepository, SqliteUserRepository, SqliteDatabase
+from src.exceptions import DuplicateUserError
 
 class TestUserRepository(unittest.TestCase):
 
+    def create_repository(self):
+        return UserRepository()
+
     def setUp(self):
-        self.repo = UserRepository()
+        self.repo = self.create_repository()
         self.user1 = User(id=0, name="Alice", contact="", is_host=False)
         self.user2 = User(id=0, name="Bob", contact="", is_host=False)
 
@@ -26,5 +31,91 @@ class TestUserRepository(unittest.TestCase):
         not_found_user = self.repo.find_by_name("Charlie")
         self.assertIsNone(not_found_user)
 
+    def test_find_by_contact(self):
+        self.user1.contact = "alice@example.com"
+        self.repo.add(self.user1)
+        self.repo.add(self.user2)
+
+        self.assertEqual(self.repo.find_by_contact("alice@example.com"), self.user1)
+        self.assertIsNone(self.repo.find_by_contact("bob@example.com"))
+        # Empty contacts are not indexed
+        self.assertIsNone(self.repo.find_by_contact(""))
+
+    def test_indexes_follow_update_and_delete(self):
+        self.repo.add(self.user1)
+
+        self.user1.name = "Alicia"
+        self.user1.contact = "alicia@example.com"
+        self.repo.update(self.user1)
+        self.assertIsNone(self.repo.find_by_name("Alice"))
+        self.assertEqual(self.repo.find_by_name("Alicia"), self.user1)
+        self.assertEqual(self.repo.find_by_contact("alicia@example.com"), self.user1)
+
+        self.repo.delete(self.user1.id)
+        self.assertIsNone(self.repo.find_by_name("Alicia"))
+        self.assertIsNone(self.repo.find_by_contact("alicia@example.com"))
+
+    def test_duplicate_name_or_contact_is_rejected(self):
+        self.user1.contact = "alice@example.com"
+        self.repo.add(self.user1)
+
+        with self.assertRaises(DuplicateUserError):
+            self.repo.add(User(id=0, name="Alice", contact="other@example.com", is_host=False))
+        with self.assertRaises(DuplicateUserError):
+            self.repo.add(User(id=0, name="Other", contact="alice@example.com", is_host=False))
+        self.assertEqual(self.repo.get_all(), [self.user1])
+
+        self.repo.add(self.user2)
+        self.user2.name = "Alice"
+        with self.assertRaises(DuplicateUserError):
+            self.repo.update(self.user2)
+        self.assertEqual(self.repo.find_by_name("Alice"), self.user1)
+
+        # Re-saving a user with its own name and contact is fine
+        self.repo.update(self.user1)
+
+    def test_add_many_rejects_duplicates_as_a_whole(self):
+        self.repo.add(self.user1)
+        with self.assertRaises(DuplicateUserError):
+            self.repo.add_many([self.user2, User(id=0, name="Alice", contact="", is_host=False)])
+        with self.assertRaises(DuplicateUserError):
+            self.repo.add_many([self.user2, User(id=0, name=self.user2.name, contact="", is_host=False)])
+        self.assertEqual(self.repo.get_all(), [self.user1])
+
+        added = self.repo.add_many([self.user2])
+        self.assertEqual(self.repo.find_by_name(self.user2.name), added[0])
+
+    def test_compare_and_set(self):
+        stored = self.repo.add(self.user1)
+        self.assertEqual(stored.version, 0)
+
+        fresh = self.repo.get_by_id(stored.id)
+        first, second = replace(fresh, balance=10.0), replace(fresh, balance=20.0)
+        self.assertTrue(self.repo.compare_and_set(first, fresh.version))
+        self.assertEqual(first.version, 1)
+        # The second writer read the same version and loses
+        self.assertFalse(self.repo.compare_and_set(second, fresh.version))
+        self.assertEqual(second.version, 0)
+        self.assertEqual(self.repo.get_by_id(stored.id).balance, 10.0)
+        self.assertEqual(self.repo.get_by_id(stored.id).version, 1)
+
+        # A plain update also moves the version on
+        latest = self.repo.get_by_id(stored.id)
+        self.repo.update(latest)
+        self.assertEqual(self.repo.get_by_id(stored.id).version, 2)
+        self.assertFalse(self.repo.compare_and_set(replace(first), 1))
+
+    def test_compare_and_set_keeps_names_unique(self):
+        self.repo.add(self.user1)
+        bob = self.repo.add(self.user2)
+        with self.assertRaises(DuplicateUserError):
+            self.repo.compare_and_set(replace(bob, name="Alice"), bob.version)
+        self.assertEqual(self.repo.find_by_name("Bob").version, 0)
+
+class TestSqliteUserRepository(TestUserRepository):
+
+    def create_repository(self):
+        return SqliteUserRepository(SqliteDatabase())
+
 if __name__ == '__main__':
     unittest.main()